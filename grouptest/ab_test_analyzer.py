@@ -6,7 +6,6 @@ Compares opt_seg=5 vs opt_seg=6 ranking algorithms
 import os
 import sys
 import json
-import time
 import base64
 import logging
 from pathlib import Path
@@ -22,13 +21,14 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
-from bs4 import BeautifulSoup
+import lxml.html
 import dotenv
 
 # Add parent directory to path to import existing modules
 sys.path.append(str(Path(__file__).parent.parent))
 
 import config
+import json_io
 
 # Load environment variables
 dotenv.load_dotenv()
@@ -45,6 +45,11 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _text(element):
+    """Text of an element with each string stripped, like BeautifulSoup's get_text(strip=True)"""
+    return "".join(s.strip() for s in element.itertext())
+
+
 class ABTestAnalyzer:
     """Main class for A/B test analysis of product rankings"""
     
@@ -77,10 +82,13 @@ class ABTestAnalyzer:
         options.add_argument('--disable-blink-features=AutomationControlled')
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
         options.add_experimental_option('useAutomationExtension', False)
+        options.add_experimental_option("prefs", {"profile.default_content_setting_values.notifications": 2})
         
         try:
             self.driver = webdriver.Chrome(options=options)
             self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": config.BLOCKED_URL_PATTERNS})
             logger.info("WebDriver initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize WebDriver: {e}")
@@ -116,18 +124,25 @@ class ABTestAnalyzer:
         
         return urlunparse(new_parsed)
     
+    def wait_for_page(self):
+        """Wait until the page has loaded and shows its H1, instead of sleeping a fixed time"""
+        try:
+            WebDriverWait(self.driver, config.SELENIUM_TIMEOUT).until(
+                lambda driver: driver.execute_script("return document.readyState") == "complete"
+            )
+            WebDriverWait(self.driver, config.SELENIUM_WAIT_TIME).until(
+                EC.presence_of_element_located((By.TAG_NAME, "h1"))
+            )
+        except TimeoutException:
+            logger.warning("Timed out waiting for page content, continuing with what has loaded")
+    
     def capture_screenshot(self, url, variant_name, url_index):
         """Capture screenshot of a URL and extract page data"""
         try:
             logger.info(f"Capturing {variant_name} for URL {url_index}: {url}")
             
             self.driver.get(url)
-            time.sleep(config.SELENIUM_WAIT_TIME)
-            
-            # Wait for content to load
-            WebDriverWait(self.driver, config.SELENIUM_TIMEOUT).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
+            self.wait_for_page()
             
             # Extract page data
             page_data = self.extract_page_data()
@@ -161,11 +176,11 @@ class ABTestAnalyzer:
         try:
             # Get page source for parsing
             page_source = self.driver.page_source
-            soup = BeautifulSoup(page_source, 'html.parser')
+            tree = lxml.html.fromstring(page_source)
             
             # Extract H1 title (search query)
-            h1_element = soup.find('h1')
-            h1_text = h1_element.get_text(strip=True) if h1_element else "No H1 found"
+            h1_elements = tree.cssselect('h1')
+            h1_text = _text(h1_elements[0]) if h1_elements else "No H1 found"
             
             # Extract product titles (first 10)
             product_titles = []
@@ -181,15 +196,15 @@ class ABTestAnalyzer:
             ]
             
             for selector in product_selectors:
-                products = soup.select(selector)
+                products = tree.cssselect(selector)
                 if products:
-                    product_titles = [p.get_text(strip=True) for p in products[:10]]
+                    product_titles = [_text(p) for p in products[:10]]
                     break
             
             # If no products found with specific selectors, try generic approach
             if not product_titles:
-                all_h2_h3 = soup.find_all(['h2', 'h3'])
-                product_titles = [h.get_text(strip=True) for h in all_h2_h3[:10] if len(h.get_text(strip=True)) > 10]
+                all_h2_h3 = tree.cssselect('h2, h3')
+                product_titles = [_text(h) for h in all_h2_h3[:10] if len(_text(h)) > 10]
             
             return {
                 'h1_title': h1_text,
@@ -368,8 +383,7 @@ class ABTestAnalyzer:
         
         # Save individual result
         result_file = config.RESULTS_DIR / f"result_{url_index:03d}.json"
-        with open(result_file, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        json_io.dump_json_atomic(result_file, result)
         
         return result
     
@@ -14,7 +14,6 @@ from datetime import datetime
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 import hashlib
 
-import pandas as pd
 import requests
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -22,13 +21,17 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
-from bs4 import BeautifulSoup
+import lxml.html
+from pydantic import BaseModel, TypeAdapter
 import dotenv
 
 # Add parent directory to path to import existing modules
 sys.path.append(str(Path(__file__).parent.parent))
 
 import config
+import json_io
+from url_loader import load_url_rows
+from llm_cache import DiskCache, cache_key
 
 # Load environment variables
 dotenv.load_dotenv()
@@ -44,6 +47,53 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = "You are an e-commerce ranking expert. Carefully analyze both screenshots for duplicate products - these are products with the EXACT SAME product image appearing multiple times (same item from different sellers). Look for identical product photos, not just similar names. Count duplicates accurately and evaluate how they impact user experience."
+
+
+class Verdict(BaseModel):
+    """One URL's verdict in a batched GPT response"""
+    url_index: int
+    winner: str
+    confidence: float = 0.5
+    score_a: float = 0
+    score_b: float = 0
+    reasoning: str = ''
+    key_differences: str = ''
+    duplicates_in_a: int = -1
+    duplicates_in_b: int = -1
+    unique_products_a: int = -1
+    unique_products_b: int = -1
+    duplicate_notes: str = ''
+
+
+_VERDICT_LIST = TypeAdapter(list[Verdict])
+
+# Verdict for variants listing the same products in the same order; duplicate counts are left unknown
+# and, as GPT never scored the pages, the shortcut flag keeps these rows out of the score averages
+IDENTICAL_RANKING_VERDICT = {
+    "winner": "Tie",
+    "confidence": 1.0,
+    "shortcut": True,
+    "reasoning": "Both variants list every product in the same order",
+    "key_differences": "None - identical rankings",
+    "duplicates_in_a": -1,
+    "duplicates_in_b": -1,
+    "unique_products_a": -1,
+    "unique_products_b": -1,
+    "duplicate_notes": "Not analyzed; identical rankings"
+}
+
+OPENAI_API_BASE = "https://api.openai.com/v1"
+
+# Per-file limits of the OpenAI Batch API (200 MB, kept with some headroom)
+BATCH_MAX_REQUESTS = 50000
+BATCH_MAX_BYTES = 190 * 1024 * 1024
+
+
+def _text(element):
+    """Text of an element with each string stripped, like BeautifulSoup's get_text(strip=True)"""
+    return "".join(s.strip() for s in element.itertext())
+
 
 class EnhancedABTestAnalyzer:
     """Enhanced analyzer with duplicate detection"""
@@ -51,7 +101,9 @@ class EnhancedABTestAnalyzer:
     def __init__(self):
         self.driver = None
         self.results = []
+        self.last_done = None  # Last URL index handled by run_analysis
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
+        self.response_cache = DiskCache(config.RESULTS_DIR / "llm_cache") if config.LLM_CACHE_ENABLED else None
         
         if not self.openai_api_key:
             logger.error("OPENAI_API_KEY not found in environment variables")
@@ -68,6 +120,15 @@ class EnhancedABTestAnalyzer:
         """Initialize Selenium WebDriver with optimal settings"""
         if self.driver:
             return
+        
+        if config.CHROME_ATTACH:
+            options = Options()
+            options.add_experimental_option("debuggerAddress", config.CHROME_DEBUGGER_ADDRESS)
+            self.driver = webdriver.Chrome(options=options)
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": config.BLOCKED_URL_PATTERNS})
+            logger.info(f"WebDriver attached to Chrome at {config.CHROME_DEBUGGER_ADDRESS}")
+            return
             
         options = Options()
         options.add_argument('--headless')
@@ -77,10 +138,13 @@ class EnhancedABTestAnalyzer:
         options.add_argument('--disable-blink-features=AutomationControlled')
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
         options.add_experimental_option('useAutomationExtension', False)
+        options.add_experimental_option("prefs", {"profile.default_content_setting_values.notifications": 2})
         
         try:
             self.driver = webdriver.Chrome(options=options)
             self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": config.BLOCKED_URL_PATTERNS})
             logger.info("WebDriver initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize WebDriver: {e}")
@@ -90,7 +154,11 @@ class EnhancedABTestAnalyzer:
         """Close the WebDriver"""
         if self.driver:
             try:
-                self.driver.quit()
+                if config.CHROME_ATTACH:
+                    # Only release the session; the shared browser keeps running
+                    self.driver.service.stop()
+                else:
+                    self.driver.quit()
                 logger.info("WebDriver closed")
             except Exception as e:
                 logger.warning(f"Error closing WebDriver: {e}")
@@ -105,6 +173,18 @@ class EnhancedABTestAnalyzer:
         new_query = urlencode(query_params, doseq=True)
         return urlunparse(parsed._replace(query=new_query))
     
+    def wait_for_page(self):
+        """Wait until the page has loaded and shows its H1, instead of sleeping a fixed time"""
+        try:
+            WebDriverWait(self.driver, config.SELENIUM_TIMEOUT).until(
+                lambda driver: driver.execute_script("return document.readyState") == "complete"
+            )
+            WebDriverWait(self.driver, config.SELENIUM_WAIT_TIME).until(
+                EC.presence_of_element_located((By.TAG_NAME, "h1"))
+            )
+        except TimeoutException:
+            logger.warning("Timed out waiting for page content, continuing with what has loaded")
+    
     def capture_screenshot(self, url, variant_name, url_index):
         """Capture screenshot and extract page data"""
         max_retries = 3
@@ -114,13 +194,13 @@ class EnhancedABTestAnalyzer:
                 logger.info(f"Capturing {variant_name} for URL {url_index}: {url[:80]}...")
                 
                 self.driver.get(url)
-                time.sleep(3)  # Wait for page to load
+                self.wait_for_page()
                 
                 # Try to close cookie banner
                 try:
                     cookie_button = self.driver.find_element(By.XPATH, "//button[contains(text(), 'Accepteren') or contains(text(), 'Accept')]")
                     cookie_button.click()
-                    time.sleep(1)
+                    WebDriverWait(self.driver, 1).until(EC.invisibility_of_element(cookie_button))
                 except:
                     pass
                 
@@ -140,7 +220,8 @@ class EnhancedABTestAnalyzer:
                     'screenshot_path': screenshot_path,
                     'h1_title': page_data.get('h1_title'),
                     'product_count': page_data.get('product_count'),
-                    'product_titles': page_data.get('product_titles', [])
+                    'product_titles': page_data.get('product_titles', []),
+                    'ranking': page_data.get('ranking', [])
                 }
                 
             except Exception as e:
@@ -153,11 +234,11 @@ class EnhancedABTestAnalyzer:
     def extract_page_data(self):
         """Extract product data from the current page"""
         try:
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+            tree = lxml.html.fromstring(self.driver.page_source)
             
             # Extract H1 title
-            h1_element = soup.find('h1')
-            h1_title = h1_element.get_text(strip=True) if h1_element else "No H1 found"
+            h1_elements = tree.cssselect('h1')
+            h1_title = _text(h1_elements[0]) if h1_elements else "No H1 found"
             
             # Extract product titles (first 8-10 products)
             product_titles = []
@@ -169,15 +250,17 @@ class EnhancedABTestAnalyzer:
             ]
             
             for selector in product_selectors:
-                products = soup.select(selector)
+                products = tree.cssselect(selector)
                 if products:
-                    product_titles = [p.get_text(strip=True) for p in products[:10]]
+                    product_titles = [_text(p) for p in products]
                     break
             
+            # The prompt only lists the first 10; the full list is kept for the identity shortcut
             return {
                 'h1_title': h1_title,
-                'product_count': len(product_titles),
-                'product_titles': product_titles
+                'product_count': len(product_titles[:10]),
+                'product_titles': product_titles[:10],
+                'ranking': product_titles
             }
             
         except Exception as e:
@@ -185,16 +268,31 @@ class EnhancedABTestAnalyzer:
             return {
                 'h1_title': "Error extracting",
                 'product_count': 0,
-                'product_titles': []
+                'product_titles': [],
+                'ranking': []
             }
     
-    def analyze_with_enhanced_gpt(self, variant_a_data, variant_b_data):
-        """Enhanced GPT analysis with duplicate detection"""
+    def image_parts(self, variant_a_data, variant_b_data):
+        """Encode both screenshots as image content parts for the chat completion request"""
+        parts = []
+        for variant_data in (variant_a_data, variant_b_data):
+            with open(variant_data['screenshot_path'], "rb") as image_file:
+                image_base64 = base64.b64encode(image_file.read()).decode('utf-8')
+            parts.append({
+                "type": "image_url",
+                "image_url": {
+                    "url": f"data:image/png;base64,{image_base64}",
+                    "detail": "high"  # Use high detail for better duplicate detection
+                }
+            })
+        return parts
+    
+    def build_gpt_payload(self, variant_a_data, variant_b_data, images=None, model=None):
+        """Build the chat completion request body comparing both variants
         
-        # Prepare images for GPT
-        def encode_image(image_path):
-            with open(image_path, "rb") as image_file:
-                return base64.b64encode(image_file.read()).decode('utf-8')
+        images: optional content parts from image_parts, to avoid encoding the screenshots again
+        model: defaults to config.OPENAI_MODEL
+        """
         
         # Enhanced prompt with duplicate detection
         prompt = f"""
@@ -228,46 +326,147 @@ class EnhancedABTestAnalyzer:
         }}
         """
         
+        if images is None:
+            images = self.image_parts(variant_a_data, variant_b_data)
+        
+        return {
+            "model": model or config.OPENAI_MODEL,  # GPT-5-mini for duplicate detection analysis
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {
+                    "role": "user",
+                    "content": [{"type": "text", "text": prompt}, *images]
+                }
+            ],
+            "max_completion_tokens": 4000  # Further increased for complex pages
+        }
+    
+    def build_batch_payload(self, cases):
+        """Build one chat completion request body judging several URLs at once
+        
+        cases: (url_index, h1_title, images) tuples, images being the parts from image_parts
+        """
+        prompt = f"""
+        You are an expert in e-commerce product ranking algorithms. Below are {len(cases)} independent
+        cases, each showing the ranking of algorithm A followed by algorithm B for one search page.
+        Judge every case on its own. For each case your task has TWO INDEPENDENT parts:
+        
+        PART 1 - RANKING QUALITY (determines winner):
+        Evaluate which algorithm (A or B) produces better product rankings based on:
+        - Relevance to the case's search query
+        - Product diversity and variety
+        - Quality of top results
+        - User value (better deals, ratings, popular items first)
+        
+        PART 2 - DUPLICATE DETECTION (supplementary information only):
+        Count duplicate products - these are items with the EXACT SAME product image appearing multiple times.
+        A duplicate = identical product photo from different sellers (same item, different shops).
+        Do NOT count different colors, sizes, or models as duplicates.
+        
+        Return ONLY a valid JSON array with one object per case:
+        [
+            {{
+                "url_index": <the case's url_index>,
+                "winner": "A", "B", or "Tie" (based on ranking quality, NOT duplicates),
+                "confidence": <number 0.5-1.0>,
+                "score_a": <number 1-10> (ranking quality score),
+                "score_b": <number 1-10> (ranking quality score),
+                "reasoning": "Why this version has better rankings (ignore duplicates here)",
+                "key_differences": "Main ranking quality difference",
+                "duplicates_in_a": <count of products with identical images in first 8 of A>,
+                "duplicates_in_b": <count of products with identical images in first 8 of B>,
+                "unique_products_a": <count of products with unique images in first 8 of A>,
+                "unique_products_b": <count of products with unique images in first 8 of B>,
+                "duplicate_notes": "Brief note about duplicate patterns observed"
+            }}
+        ]
+        """
+        
+        content = [{"type": "text", "text": prompt}]
+        for url_index, h1_title, images in cases:
+            content.append({
+                "type": "text",
+                "text": f"CASE url_index={url_index} - search query: {h1_title or 'Unknown'} "
+                        f"(first image: A, second image: B)"
+            })
+            content.extend(images)
+        
+        return {
+            "model": config.OPENAI_MODEL,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": content}
+            ],
+            "max_completion_tokens": 4000 * len(cases)
+        }
+    
+    def parse_batch_verdicts(self, content, url_indices):
+        """Validate a batched response and return the verdicts keyed by url_index
+        
+        Verdicts for URLs that were not part of the request are dropped
+        """
+        verdicts = _VERDICT_LIST.validate_json(content)
+        wanted = set(url_indices)
+        return {
+            verdict.url_index: verdict.model_dump(exclude={'url_index'})
+            for verdict in verdicts
+            if verdict.url_index in wanted
+        }
+    
+    def analyze_with_enhanced_gpt(self, variant_a_data, variant_b_data):
+        """Enhanced GPT analysis with duplicate detection, escalating unsure verdicts to the strong model"""
+        shortcut = self.shortcut_verdict(variant_a_data, variant_b_data)
+        if shortcut:
+            logger.info("Identical product rankings, skipping GPT analysis: Winner=Tie")
+            return shortcut
+        
+        analysis = self.request_verdict(self.build_gpt_payload(variant_a_data, variant_b_data))
+        if self.needs_escalation(analysis):
+            analysis = self.escalate(variant_a_data, variant_b_data, analysis)
+        return analysis
+    
+    def shortcut_verdict(self, variant_a_data, variant_b_data):
+        """Tie verdict when both variants list all product titles in the same order, else None"""
+        if not config.ENABLE_IDENTITY_SHORTCUT:
+            return None
+        ranking_a = variant_a_data.get('ranking')
+        if ranking_a and ranking_a == variant_b_data.get('ranking'):
+            return dict(IDENTICAL_RANKING_VERDICT)
+        return None
+    
+    def needs_escalation(self, analysis):
+        """Whether a verdict is unsure enough to be re-judged by config.OPENAI_MODEL_STRONG"""
+        if not analysis or config.OPENAI_MODEL_STRONG == config.OPENAI_MODEL:
+            return False
+        return (analysis.get('confidence') or 0) < config.ESCALATION_CONFIDENCE
+    
+    def escalate(self, variant_a_data, variant_b_data, analysis, images=None):
+        """Re-judge a verdict with the strong model, keeping the original if that request fails"""
+        payload = self.build_gpt_payload(variant_a_data, variant_b_data, images,
+                                         model=config.OPENAI_MODEL_STRONG)
+        strong = self.request_verdict(payload)
+        if strong is None:
+            return analysis
+        logger.info(f"Escalated verdict (confidence {analysis.get('confidence')}) to "
+                    f"{config.OPENAI_MODEL_STRONG}: Winner={strong.get('winner')}")
+        return {**strong, "escalated": True}
+    
+    def request_verdict(self, payload):
+        """Send one chat completion request and parse its JSON verdict"""
         try:
             headers = {
                 "Content-Type": "application/json",
                 "Authorization": f"Bearer {self.openai_api_key}"
             }
             
-            # Encode images
-            image_a_base64 = encode_image(variant_a_data['screenshot_path'])
-            image_b_base64 = encode_image(variant_b_data['screenshot_path'])
-            
-            payload = {
-                "model": "gpt-5-mini",  # Using GPT-5-mini for duplicate detection analysis
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You are an e-commerce ranking expert. Carefully analyze both screenshots for duplicate products - these are products with the EXACT SAME product image appearing multiple times (same item from different sellers). Look for identical product photos, not just similar names. Count duplicates accurately and evaluate how they impact user experience."
-                    },
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/png;base64,{image_a_base64}",
-                                    "detail": "high"  # Use high detail for better duplicate detection
-                                }
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/png;base64,{image_b_base64}",
-                                    "detail": "high"  # Use high detail for better duplicate detection
-                                }
-                            }
-                        ]
-                    }
-                ],
-                "max_completion_tokens": 4000  # Further increased for complex pages
-            }
+            # Identical requests from earlier runs are answered from the cache
+            key = None
+            if self.response_cache is not None:
+                key = cache_key(payload['model'], payload['messages'])
+                cached = self.response_cache.get(key)
+                if cached is not None:
+                    logger.info(f"Using cached GPT analysis: Winner={cached.get('winner')}")
+                    return cached
             
             response = requests.post(
                 "https://api.openai.com/v1/chat/completions",
@@ -279,9 +478,11 @@ class EnhancedABTestAnalyzer:
             if response.status_code == 200:
                 try:
                     result = response.json()
-                    analysis = json.loads(result['choices'][0]['message']['content'])
+                    analysis = json_io.loads(result['choices'][0]['message']['content'])
                     logger.info(f"Enhanced GPT analysis completed: Winner={analysis.get('winner')}, "
                               f"Duplicates A={analysis.get('duplicates_in_a')}, B={analysis.get('duplicates_in_b')}")
+                    if key:
+                        self.response_cache.set(key, analysis)
                     return analysis
                 except (json.JSONDecodeError, KeyError) as parse_error:
                     logger.error(f"Failed to parse API response: {parse_error}")
@@ -313,6 +514,12 @@ class EnhancedABTestAnalyzer:
         # Analyze with enhanced GPT
         analysis = self.analyze_with_enhanced_gpt(variant_a_data, variant_b_data)
         
+        return self.build_result(url, url_index, visits, url_a, url_b,
+                                 variant_a_data, variant_b_data, analysis)
+    
+    def build_result(self, url, url_index, visits, url_a, url_b, variant_a_data, variant_b_data, analysis,
+                     save=True):
+        """Compile the result record for one URL, saving it to its own file unless save is False"""
         if not analysis:
             logger.warning(f"Enhanced GPT analysis failed for URL {url_index}")
             analysis = {
@@ -358,55 +565,69 @@ class EnhancedABTestAnalyzer:
                 "reasoning": analysis.get('reasoning'),
                 "key_differences": analysis.get('key_differences'),
                 "duplicate_notes": analysis.get('duplicate_notes', ''),
+                "escalated": analysis.get('escalated', False),
+                "shortcut": analysis.get('shortcut', False),
                 "duplicates_comparison": f"A has {analysis.get('duplicates_in_a', -1)} duplicates, B has {analysis.get('duplicates_in_b', -1)} duplicates"
             }
         }
         
-        # Save individual result
-        result_file = config.RESULTS_DIR / f"enhanced_result_{url_index:03d}.json"
-        with open(result_file, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        # Save individual result; compact, since only the scripts read these files
+        if save:
+            result_file = config.RESULTS_DIR / f"enhanced_result_{url_index:03d}.json"
+            json_io.dump_json_atomic(result_file, result)
         
         return result
     
-    def run_analysis(self, limit=10, start_from=None):
-        """Run the enhanced analysis"""
+    def load_urls(self, limit, start_from=None, skip=None):
+        """Load the slice of (url_index, url, visits) rows to process from the Excel file
         
-        logger.info("Starting enhanced A/B test analysis with duplicate detection")
-        
-        # Load URLs from Excel
+        URL indices in skip, such as those with a result already, are left out before the limit applies
+        """
         try:
-            df = pd.read_excel(config.INPUT_FILE)
-            logger.info(f"Loaded {len(df)} URLs from Excel")
+            rows = load_url_rows(config.INPUT_FILE)
+            logger.info(f"Loaded {len(rows)} URLs from Excel")
         except Exception as e:
             logger.error(f"Failed to load Excel file: {e}")
             raise
         
-        # Apply start_from if specified
+        # Apply start_from if specified; rows with a blank URL are already dropped,
+        # so filter on url_index rather than slicing by position
         if start_from and start_from > 1:
-            df = df.iloc[start_from-1:]
+            rows = [row for row in rows if row[0] >= start_from]
             logger.info(f"Starting from URL {start_from}")
         
+        if skip:
+            rows = [row for row in rows if row[0] not in skip]
+        
         # Limit processing
-        df = df.head(limit)
+        rows = rows[:limit]
         logger.info(f"Processing limited to {limit} URLs for enhanced analysis")
+        return rows
+    
+    def run_analysis(self, limit=10, start_from=None):
+        """Run the enhanced analysis"""
+        
+        logger.info("Starting enhanced A/B test analysis with duplicate detection")
+        
+        rows = self.load_urls(limit, start_from)
+        checkpoint_file = config.RESULTS_DIR / config.CHECKPOINT_FILENAME
         
         # Setup WebDriver
         self.setup_driver()
         
         try:
             # Process each URL
-            for index, row in df.iterrows():
-                url = row['url']
-                visits = row.get('visits', 0)
-                url_index = index + 1
-                
-                logger.info(f"Processing URL {url_index}/{len(df)}")
+            for url_index, url, visits in rows:
+                logger.info(f"Processing URL {url_index}/{len(rows)}")
                 
                 result = self.process_url(url, url_index, visits)
                 if result:
                     self.results.append(result)
                 
+                # The per-URL result file is already written, so a restart can continue after this URL
+                self.last_done = url_index
+                json_io.dump_json_atomic(checkpoint_file, {"last_done": url_index})
+                
                 # Save intermediate results
                 if url_index % 5 == 0:
                     self.save_results()
@@ -416,6 +637,9 @@ class EnhancedABTestAnalyzer:
             self.save_results()
             logger.info(f"Enhanced analysis complete: {len(self.results)} URLs processed")
             
+            # Only an interrupted run leaves a checkpoint, so a later run never resumes from a stale one
+            checkpoint_file.unlink(missing_ok=True)
+            
             # Calculate enhanced statistics
             self.calculate_enhanced_statistics()
             
@@ -424,11 +648,186 @@ class EnhancedABTestAnalyzer:
         
         return self.results
     
+    def capture_for_batch(self, rows, pending, analyses):
+        """Capture both variants of every URL and yield (url_index, request body) pairs
+        
+        The URL metadata and captured page data are stored in pending, keyed by url_index.
+        URLs with identical rankings get their verdict in analyses instead of a request.
+        """
+        for url_index, url, visits in rows:
+            logger.info(f"Capturing URL {url_index}/{len(rows)} for batch submission")
+            
+            url_a = self.modify_url_with_param(url, config.VARIANT_A_PARAM)
+            url_b = self.modify_url_with_param(url, config.VARIANT_B_PARAM)
+            variant_a_data = self.capture_screenshot(url_a, "variant_A", url_index)
+            variant_b_data = self.capture_screenshot(url_b, "variant_B", url_index)
+            
+            if not variant_a_data or not variant_b_data:
+                logger.warning(f"Skipping URL {url_index} due to capture failure")
+                continue
+            
+            pending[url_index] = (url, visits, url_a, url_b, variant_a_data, variant_b_data)
+            
+            shortcut = self.shortcut_verdict(variant_a_data, variant_b_data)
+            if shortcut:
+                logger.info(f"Identical product rankings for URL {url_index}, not submitting it")
+                analyses[url_index] = shortcut
+                continue
+            yield url_index, self.build_gpt_payload(variant_a_data, variant_b_data)
+    
+    def write_batch_files(self, requests_iter):
+        """Write chat completion requests to Batch API input files, starting a new file at the per-file limits"""
+        paths = []
+        f = None
+        count = size = 0
+        try:
+            for url_index, body in requests_iter:
+                line = json_io.dumps({
+                    "custom_id": f"url_{url_index}",
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": body
+                }) + b"\n"
+                
+                if f is None or count >= BATCH_MAX_REQUESTS or size + len(line) > BATCH_MAX_BYTES:
+                    if f:
+                        f.close()
+                    path = config.RESULTS_DIR / f"batch_input_{len(paths) + 1:02d}.jsonl"
+                    f = open(path, 'wb')
+                    paths.append(path)
+                    count = size = 0
+                
+                f.write(line)
+                count += 1
+                size += len(line)
+        finally:
+            if f:
+                f.close()
+        
+        logger.info(f"Wrote {len(paths)} batch input file(s)")
+        return paths
+    
+    def submit_batch(self, input_path):
+        """Upload a batch input file and start a batch job on it, returning the batch id"""
+        headers = {"Authorization": f"Bearer {self.openai_api_key}"}
+        
+        with open(input_path, 'rb') as f:
+            response = requests.post(
+                f"{OPENAI_API_BASE}/files",
+                headers=headers,
+                data={"purpose": "batch"},
+                files={"file": (input_path.name, f, "application/jsonl")},
+                timeout=600
+            )
+        response.raise_for_status()
+        file_id = response.json()['id']
+        
+        response = requests.post(
+            f"{OPENAI_API_BASE}/batches",
+            headers=headers,
+            json={
+                "input_file_id": file_id,
+                "endpoint": "/v1/chat/completions",
+                "completion_window": "24h"
+            },
+            timeout=60
+        )
+        response.raise_for_status()
+        batch_id = response.json()['id']
+        logger.info(f"Submitted batch {batch_id} for {input_path.name}")
+        return batch_id
+    
+    def wait_for_batch(self, batch_id):
+        """Poll a batch job until it reaches a final state and return its description"""
+        headers = {"Authorization": f"Bearer {self.openai_api_key}"}
+        
+        while True:
+            response = requests.get(f"{OPENAI_API_BASE}/batches/{batch_id}", headers=headers, timeout=60)
+            response.raise_for_status()
+            batch = response.json()
+            status = batch.get('status')
+            
+            if status in ('completed', 'failed', 'expired', 'cancelled'):
+                logger.info(f"Batch {batch_id} finished with status {status}: {batch.get('request_counts')}")
+                return batch
+            
+            logger.info(f"Batch {batch_id} {status}: {batch.get('request_counts')}")
+            time.sleep(config.BATCH_POLL_INTERVAL)
+    
+    def read_batch_output(self, file_id):
+        """Stream a batch output file and yield (url_index, analysis) pairs"""
+        headers = {"Authorization": f"Bearer {self.openai_api_key}"}
+        
+        with requests.get(f"{OPENAI_API_BASE}/files/{file_id}/content",
+                          headers=headers, stream=True, timeout=600) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                
+                item = json_io.loads(line)
+                url_index = int(item['custom_id'].split('_', 1)[1])
+                batch_response = item.get('response') or {}
+                
+                if batch_response.get('status_code') != 200:
+                    logger.error(f"Batch request failed for URL {url_index}: {item.get('error') or batch_response}")
+                    continue
+                
+                try:
+                    content = batch_response['body']['choices'][0]['message']['content']
+                    analysis = json_io.loads(content)
+                except (json.JSONDecodeError, KeyError, IndexError) as parse_error:
+                    logger.error(f"Failed to parse batch response for URL {url_index}: {parse_error}")
+                    continue
+                
+                yield url_index, analysis
+    
+    def run_analysis_batch(self, limit=200, start_from=None, skip=None):
+        """Run the enhanced analysis, sending all GPT comparisons through the OpenAI Batch API"""
+        
+        logger.info("Starting enhanced A/B test analysis via the OpenAI Batch API")
+        
+        rows = self.load_urls(limit, start_from, skip)
+        
+        # Scrape everything first; request bodies are streamed straight into the input files
+        pending = {}
+        analyses = {}
+        self.setup_driver()
+        try:
+            input_files = self.write_batch_files(self.capture_for_batch(rows, pending, analyses))
+        finally:
+            self.close_driver()
+        
+        # Submit every file before waiting so the batches run side by side
+        batch_ids = [self.submit_batch(path) for path in input_files]
+        
+        for batch_id in batch_ids:
+            batch = self.wait_for_batch(batch_id)
+            if batch.get('output_file_id'):
+                analyses.update(self.read_batch_output(batch['output_file_id']))
+            else:
+                logger.error(f"Batch {batch_id} produced no output file")
+        
+        # URLs without an analysis are recorded with the failed-analysis defaults
+        for url_index in sorted(pending):
+            url, visits, url_a, url_b, variant_a_data, variant_b_data = pending[url_index]
+            if self.needs_escalation(analyses.get(url_index)):
+                analyses[url_index] = self.escalate(variant_a_data, variant_b_data, analyses[url_index])
+            self.results.append(self.build_result(url, url_index, visits, url_a, url_b,
+                                                  variant_a_data, variant_b_data, analyses.get(url_index)))
+        
+        self.save_results()
+        logger.info(f"Enhanced batch analysis complete: {len(pending)} URLs processed, "
+                    f"{len(analyses)} analysed")
+        
+        self.calculate_enhanced_statistics()
+        
+        return self.results
+    
     def save_results(self):
         """Save enhanced results"""
         results_file = config.RESULTS_DIR / "enhanced_results.json"
-        with open(results_file, 'w', encoding='utf-8') as f:
-            json.dump(self.results, f, ensure_ascii=False, indent=2)
+        json_io.dump_json(results_file, self.results)
         logger.info(f"Enhanced results saved to {results_file}")
     
     def calculate_enhanced_statistics(self):
@@ -443,15 +842,26 @@ class EnhancedABTestAnalyzer:
         wins_b = sum(1 for r in self.results if r['analysis']['winner'] == 'B')
         ties = sum(1 for r in self.results if r['analysis']['winner'] == 'Tie')
         
+        # Counts of -1 mark a failed or identity-shortcut analysis and are left out of the averages
+        def valid(variant, field):
+            return [v for v in (r[variant].get(field, -1) for r in self.results) if v >= 0]
+        
         # Duplicate statistics
-        total_duplicates_a = sum(r['variant_a'].get('duplicates', 0) for r in self.results if r['variant_a'].get('duplicates', -1) >= 0)
-        total_duplicates_b = sum(r['variant_b'].get('duplicates', 0) for r in self.results if r['variant_b'].get('duplicates', -1) >= 0)
-        avg_duplicates_a = total_duplicates_a / len(self.results) if self.results else 0
-        avg_duplicates_b = total_duplicates_b / len(self.results) if self.results else 0
+        duplicates_a = valid('variant_a', 'duplicates')
+        duplicates_b = valid('variant_b', 'duplicates')
+        total_duplicates_a = sum(duplicates_a)
+        total_duplicates_b = sum(duplicates_b)
+        avg_duplicates_a = total_duplicates_a / len(duplicates_a) if duplicates_a else 0
+        avg_duplicates_b = total_duplicates_b / len(duplicates_b) if duplicates_b else 0
         
         # Unique products statistics
-        avg_unique_a = sum(r['variant_a'].get('unique_products', 0) for r in self.results) / len(self.results) if self.results else 0
-        avg_unique_b = sum(r['variant_b'].get('unique_products', 0) for r in self.results) / len(self.results) if self.results else 0
+        unique_a = valid('variant_a', 'unique_products')
+        unique_b = valid('variant_b', 'unique_products')
+        avg_unique_a = sum(unique_a) / len(unique_a) if unique_a else 0
+        avg_unique_b = sum(unique_b) / len(unique_b) if unique_b else 0
+        
+        # Verdicts re-judged by the strong model
+        escalated = sum(1 for r in self.results if r['analysis'].get('escalated'))
         
         stats = {
             "total_urls": len(self.results),
@@ -467,13 +877,14 @@ class EnhancedABTestAnalyzer:
             "average_unique_products_a": round(avg_unique_a, 2),
             "average_unique_products_b": round(avg_unique_b, 2),
             "duplicate_difference": round(avg_duplicates_b - avg_duplicates_a, 2),
+            "escalated_verdicts": escalated,
+            "escalation_rate": round(escalated / len(self.results) * 100, 1),
             "overall_winner": "A (opt_seg=5)" if wins_a > wins_b else "B (opt_seg=6)" if wins_b > wins_a else "Tie"
         }
         
         # Save statistics
         stats_file = config.RESULTS_DIR / "enhanced_statistics.json"
-        with open(stats_file, 'w', encoding='utf-8') as f:
-            json.dump(stats, f, ensure_ascii=False, indent=2)
+        json_io.dump_json(stats_file, stats)
         
         logger.info("=" * 60)
         logger.info("ENHANCED ANALYSIS STATISTICS")
@@ -485,6 +896,7 @@ class EnhancedABTestAnalyzer:
         logger.info(f"Average unique products in A: {stats['average_unique_products_a']}")
         logger.info(f"Average unique products in B: {stats['average_unique_products_b']}")
         logger.info(f"Duplicate difference (B-A): {stats['duplicate_difference']}")
+        logger.info(f"Escalated to {config.OPENAI_MODEL_STRONG}: {escalated} ({stats['escalation_rate']}%)")
         logger.info("=" * 60)
         
         return stats
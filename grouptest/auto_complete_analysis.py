@@ -99,13 +99,16 @@ def calculate_comprehensive_stats(results):
     avg_duplicates_a = sum(duplicates_data_a) / len(duplicates_data_a) if duplicates_data_a else 0
     avg_duplicates_b = sum(duplicates_data_b) / len(duplicates_data_b) if duplicates_data_b else 0
     
+    # Identity-shortcut Ties were never judged by GPT, so their confidence and scores are left out
+    scored = [r for r in results if not r['analysis'].get('shortcut')]
+    
     # Confidence statistics
-    confidences = [r['analysis'].get('confidence', 0.5) for r in results]
+    confidences = [r['analysis'].get('confidence', 0.5) for r in scored]
     avg_confidence = sum(confidences) / len(confidences) if confidences else 0
     
     # Score statistics
-    scores_a = [r['variant_a'].get('score', 0) for r in results]
-    scores_b = [r['variant_b'].get('score', 0) for r in results]
+    scores_a = [r['variant_a'].get('score', 0) for r in scored]
+    scores_b = [r['variant_b'].get('score', 0) for r in scored]
     avg_score_a = sum(scores_a) / len(scores_a) if scores_a else 0
     avg_score_b = sum(scores_b) / len(scores_b) if scores_b else 0
     
@@ -127,7 +130,7 @@ def calculate_comprehensive_stats(results):
         "high_confidence_wins_a": high_conf_a,
         "high_confidence_wins_b": high_conf_b,
         "average_confidence": round(avg_confidence, 3),
-        "confidence_std": round(sum((c - avg_confidence)**2 for c in confidences)**0.5 / len(confidences), 3),
+        "confidence_std": round(sum((c - avg_confidence)**2 for c in confidences)**0.5 / len(confidences), 3) if confidences else 0,
         "average_score_a": round(avg_score_a, 2),
         "average_score_b": round(avg_score_b, 2),
         "score_difference": round(avg_score_b - avg_score_a, 2),
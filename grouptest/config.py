@@ -12,6 +12,7 @@ INPUT_FILE = BASE_DIR.parent / "input" / "groeperen urls aug (1).xlsx"
 SCREENSHOTS_DIR = BASE_DIR / "screenshots"
 RESULTS_DIR = BASE_DIR / "results"
 LOGS_DIR = BASE_DIR / "logs"
+CHECKPOINT_FILENAME = "state.json"  # In RESULTS_DIR; last URL index handled by an interrupted run_analysis
 
 # A/B Test Parameters
 VARIANT_A_PARAM = "5"  # Just the value, not the full parameter string
@@ -19,14 +20,31 @@ VARIANT_B_PARAM = "6"  # Just the value, not the full parameter string
 
 # Selenium Settings
 SELENIUM_TIMEOUT = 30
-SELENIUM_WAIT_TIME = 3  # Time to wait after page load
+SELENIUM_WAIT_TIME = 3  # Longest wait for the H1 once the page has loaded
 WINDOW_WIDTH = 1920
 WINDOW_HEIGHT = 1080
+# Attach to a Chrome already started with --remote-debugging-port=9222 instead of launching one (JAMIE_CHROME_ATTACH=1).
+# Parallel runners fall back to a single worker; the attached browser is left running when the driver closes.
+CHROME_ATTACH = os.getenv("JAMIE_CHROME_ATTACH") == "1"
+CHROME_DEBUGGER_ADDRESS = "127.0.0.1:9222"
+# Requests Chrome never makes: trackers, ads, web fonts and video. Images stay on, GPT compares the product photos
+BLOCKED_URL_PATTERNS = [
+    "*googletagmanager*", "*google-analytics*", "*doubleclick*", "*facebook.net*", "*hotjar*",
+    "*.woff", "*.woff2", "*.ttf", "*.mp4", "*.webm",
+]
 
 # OpenAI Settings
 OPENAI_MODEL = "gpt-5-mini"  # Using GPT-5-mini for duplicate detection analysis
+OPENAI_MODEL_STRONG = "gpt-5"  # Re-judges verdicts OPENAI_MODEL is unsure about
+ESCALATION_CONFIDENCE = 0.7  # Verdicts below this confidence go to OPENAI_MODEL_STRONG (0 disables)
 MAX_RETRIES = 3
 RETRY_DELAY = 2
+OPENAI_RPM = 500  # Requests per minute allowed for OPENAI_MODEL on this account
+OPENAI_TPM = 200000  # Tokens per minute allowed for OPENAI_MODEL on this account
+BATCH_POLL_INTERVAL = 30  # Seconds between OpenAI Batch API status checks
+LLM_BATCH_SIZE = 8  # URL comparisons packed into one GPT request by run_parallel_analysis
+LLM_CACHE_ENABLED = True  # Reuse stored GPT verdicts for identical requests (results/llm_cache)
+ENABLE_IDENTITY_SHORTCUT = True  # Call identical product rankings a Tie without asking GPT
 
 # Report Settings
 REPORT_FILENAME = "ab_test_report"
@@ -38,4 +56,5 @@ BATCH_SIZE = 10  # Process URLs in batches to avoid memory issues
 
 # Screenshot Settings
 SCREENSHOT_FORMAT = "png"
-SCREENSHOT_QUALITY = 85  # For JPEG, not used for PNG
\ No newline at end of file
+SCREENSHOT_QUALITY = 85  # For JPEG, not used for PNG
+EMBED_DPI = 150  # Resolution screenshots are downscaled to before embedding in PDFs
\ No newline at end of file
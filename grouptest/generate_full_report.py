@@ -5,6 +5,7 @@ Includes detailed statistics, charts, and insights
 """
 
 import json
+import hashlib
 import logging
 from pathlib import Path
 from datetime import datetime
@@ -27,12 +28,90 @@ import pandas as pd
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 import config
+import json_io
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def compute_stats(df: pd.DataFrame) -> Dict:
+    """Aggregate winner, score and duplicate statistics from flattened results"""
+    from run_parallel_analysis import generate_recommendation
+    
+    total = len(df)
+    winner_counts = df['analysis_winner'].value_counts()
+    wins_a = int(winner_counts.get('A', 0))
+    wins_b = int(winner_counts.get('B', 0))
+    ties = int(winner_counts.get('Tie', 0))
+    
+    # Duplicates of -1 mark a failed analysis and are excluded
+    dup_a = df['variant_a_duplicates'].fillna(-1)
+    dup_b = df['variant_b_duplicates'].fillna(-1)
+    total_duplicates_a = int(dup_a[dup_a >= 0].sum())
+    total_duplicates_b = int(dup_b[dup_b >= 0].sum())
+    valid_duplicate_count = int((dup_a >= 0).sum())
+    
+    avg_duplicates_a = total_duplicates_a / valid_duplicate_count if valid_duplicate_count else 0
+    avg_duplicates_b = total_duplicates_b / valid_duplicate_count if valid_duplicate_count else 0
+    
+    # Identity-shortcut Ties were never judged by GPT, so their confidence and scores are left out
+    if 'analysis_shortcut' in df:
+        scored = df[df['analysis_shortcut'].fillna(False) != True]
+    else:
+        scored = df
+    avg_confidence = float(scored['analysis_confidence'].fillna(0.5).mean()) if len(scored) else 0.0
+    avg_scores = scored[['variant_a_score', 'variant_b_score']].fillna(0).mean().fillna(0)
+    
+    return {
+        "total_urls_analyzed": total,
+        "variant_a_wins": wins_a,
+        "variant_b_wins": wins_b,
+        "ties": ties,
+        "win_percentage_a": round(wins_a / total * 100, 1),
+        "win_percentage_b": round(wins_b / total * 100, 1),
+        "tie_percentage": round(ties / total * 100, 1),
+        "average_confidence": round(avg_confidence, 3),
+        "average_score_a": round(float(avg_scores['variant_a_score']), 2),
+        "average_score_b": round(float(avg_scores['variant_b_score']), 2),
+        "average_duplicates_a": round(avg_duplicates_a, 2),
+        "average_duplicates_b": round(avg_duplicates_b, 2),
+        "total_duplicates_a": total_duplicates_a,
+        "total_duplicates_b": total_duplicates_b,
+        "duplicate_difference": round(avg_duplicates_b - avg_duplicates_a, 2),
+        "overall_winner": "A (opt_seg=5)" if wins_a > wins_b else "B (opt_seg=6)" if wins_b > wins_a else "Tie",
+        "recommendation": generate_recommendation(wins_a, wins_b, avg_duplicates_a, avg_duplicates_b)
+    }
+
+
+def chart_key(data) -> str:
+    """Short content hash of chart inputs, used to name cached chart PNGs"""
+    return hashlib.blake2b(json_io.dumps(data), digest_size=8).hexdigest()
+
+
+def prune_stale_charts(chart_paths: Dict[str, Path]):
+    """Remove cached chart PNGs drawn from earlier data, keeping the current one of each chart"""
+    for name, current in chart_paths.items():
+        for path in current.parent.glob(f'{name}_*.png'):
+            key = path.stem[len(name) + 1:]
+            if path != current and len(key) == 16 and all(c in '0123456789abcdef' for c in key):
+                path.unlink(missing_ok=True)
+
+
+def render_score_progression_datashader(url_indices: List[int], scores_a: List[float],
+                                        scores_b: List[float], chart_path: Path):
+    """Rasterize the score progression lines with datashader for very large runs"""
+    import datashader as ds
+    import datashader.transfer_functions as tf
+    
+    df = pd.DataFrame({'x': url_indices, 'a': scores_a, 'b': scores_b})
+    cvs = ds.Canvas(plot_width=900, plot_height=450)
+    img_a = tf.shade(cvs.line(df, 'x', 'a'), cmap=['#3498db'])
+    img_b = tf.shade(cvs.line(df, 'x', 'b'), cmap=['#e74c3c'])
+    img = tf.set_background(tf.stack(img_a, img_b), 'white')
+    img.to_pil().save(chart_path)
+
+
 class ChartFlowable(Flowable):
     """Custom flowable for embedding matplotlib charts"""
     
@@ -91,111 +170,124 @@ class ComprehensiveReportGenerator:
             borderColor=colors.HexColor('#bdc3c7')
         ))
     
-    def generate_charts(self, results: List[Dict], stats: Dict) -> Dict[str, str]:
-        """Generate analysis charts"""
-        charts = {}
+    def generate_charts(self, results: List[Dict], stats: Dict, backend: str = 'matplotlib') -> Dict[str, str]:
+        """Generate analysis charts, reusing previously rendered PNGs for unchanged inputs
         
-        # 1. Winner Distribution Pie Chart
-        fig, ax = plt.subplots(figsize=(8, 6))
-        sizes = [stats['variant_a_wins'], stats['variant_b_wins'], stats['ties']]
-        labels = [
-            f"Variant A\n({stats['variant_a_wins']} wins)",
-            f"Variant B\n({stats['variant_b_wins']} wins)",
-            f"Ties\n({stats['ties']})"
-        ]
-        colors_list = ['#3498db', '#e74c3c', '#95a5a6']
-        explode = (0.05, 0.05, 0)
-        
-        ax.pie(sizes, labels=labels, colors=colors_list, autopct='%1.1f%%',
-               shadow=True, explode=explode, startangle=90)
-        ax.set_title('Winner Distribution Across 200 URLs', fontsize=16, fontweight='bold')
+        With backend='datashader' the score progression covers every URL and is
+        rasterized by datashader instead of drawn with matplotlib.
+        """
+        confidences = [r['analysis'].get('confidence', 0.5) for r in results]
+        # matplotlib only plots the first 50 URLs for clarity
+        progression = results if backend == 'datashader' else results[:50]
+        url_indices = [r['url_index'] for r in progression]
+        scores_a = [r['variant_a'].get('score', 0) for r in progression]
+        scores_b = [r['variant_b'].get('score', 0) for r in progression]
+        
+        results_dir = Path(config.RESULTS_DIR)
+        stats_key = chart_key(stats)
+        confidence_key = chart_key([stats['average_confidence'], confidences])
+        score_key = chart_key([backend, url_indices, scores_a, scores_b])
+        chart_paths = {
+            'winner_distribution': results_dir / f'winner_distribution_{stats_key}.png',
+            'duplicate_comparison': results_dir / f'duplicate_comparison_{stats_key}.png',
+            'confidence_distribution': results_dir / f'confidence_distribution_{confidence_key}.png',
+            'score_progression': results_dir / f'score_progression_{score_key}.png',
+        }
         
-        chart_path = config.RESULTS_DIR / 'winner_distribution.png'
-        plt.savefig(chart_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        charts['winner_distribution'] = str(chart_path)
+        # 1. Winner Distribution Pie Chart
+        chart_path = chart_paths['winner_distribution']
+        if not chart_path.exists():
+            fig, ax = plt.subplots(figsize=(8, 6))
+            sizes = [stats['variant_a_wins'], stats['variant_b_wins'], stats['ties']]
+            labels = [
+                f"Variant A\n({stats['variant_a_wins']} wins)",
+                f"Variant B\n({stats['variant_b_wins']} wins)",
+                f"Ties\n({stats['ties']})"
+            ]
+            colors_list = ['#3498db', '#e74c3c', '#95a5a6']
+            explode = (0.05, 0.05, 0)
+            
+            ax.pie(sizes, labels=labels, colors=colors_list, autopct='%1.1f%%',
+                   shadow=True, explode=explode, startangle=90)
+            ax.set_title('Winner Distribution Across 200 URLs', fontsize=16, fontweight='bold')
+            
+            plt.savefig(chart_path, dpi=150, bbox_inches='tight')
+            plt.close()
         
         # 2. Duplicate Comparison Bar Chart
-        fig, ax = plt.subplots(figsize=(10, 6))
-        categories = ['Average Duplicates', 'Total Duplicates']
-        variant_a_values = [stats['average_duplicates_a'], stats['total_duplicates_a']]
-        variant_b_values = [stats['average_duplicates_b'], stats['total_duplicates_b']]
-        
-        x = range(len(categories))
-        width = 0.35
-        
-        bars1 = ax.bar([i - width/2 for i in x], variant_a_values, width, 
-                       label='Variant A (opt_seg=5)', color='#3498db')
-        bars2 = ax.bar([i + width/2 for i in x], variant_b_values, width,
-                       label='Variant B (opt_seg=6)', color='#e74c3c')
-        
-        ax.set_xlabel('Metric', fontsize=12)
-        ax.set_ylabel('Count', fontsize=12)
-        ax.set_title('Duplicate Product Comparison', fontsize=16, fontweight='bold')
-        ax.set_xticks(x)
-        ax.set_xticklabels(categories)
-        ax.legend()
-        
-        # Add value labels on bars
-        for bars in [bars1, bars2]:
-            for bar in bars:
-                height = bar.get_height()
-                ax.annotate(f'{height:.1f}',
-                           xy=(bar.get_x() + bar.get_width() / 2, height),
-                           xytext=(0, 3),
-                           textcoords="offset points",
-                           ha='center', va='bottom')
-        
-        chart_path = config.RESULTS_DIR / 'duplicate_comparison.png'
-        plt.savefig(chart_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        charts['duplicate_comparison'] = str(chart_path)
+        chart_path = chart_paths['duplicate_comparison']
+        if not chart_path.exists():
+            fig, ax = plt.subplots(figsize=(10, 6))
+            categories = ['Average Duplicates', 'Total Duplicates']
+            variant_a_values = [stats['average_duplicates_a'], stats['total_duplicates_a']]
+            variant_b_values = [stats['average_duplicates_b'], stats['total_duplicates_b']]
+            
+            x = range(len(categories))
+            width = 0.35
+            
+            bars1 = ax.bar([i - width/2 for i in x], variant_a_values, width, 
+                           label='Variant A (opt_seg=5)', color='#3498db')
+            bars2 = ax.bar([i + width/2 for i in x], variant_b_values, width,
+                           label='Variant B (opt_seg=6)', color='#e74c3c')
+            
+            ax.set_xlabel('Metric', fontsize=12)
+            ax.set_ylabel('Count', fontsize=12)
+            ax.set_title('Duplicate Product Comparison', fontsize=16, fontweight='bold')
+            ax.set_xticks(x)
+            ax.set_xticklabels(categories)
+            ax.legend()
+            
+            # Add value labels on bars
+            ax.bar_label(bars1, fmt='%.1f', padding=3)
+            ax.bar_label(bars2, fmt='%.1f', padding=3)
+            
+            plt.savefig(chart_path, dpi=150, bbox_inches='tight')
+            plt.close()
         
         # 3. Confidence Distribution Histogram
-        fig, ax = plt.subplots(figsize=(10, 6))
-        confidences = [r['analysis'].get('confidence', 0.5) for r in results]
-        
-        ax.hist(confidences, bins=20, color='#16a085', edgecolor='black', alpha=0.7)
-        ax.axvline(x=stats['average_confidence'], color='red', linestyle='--', 
-                  linewidth=2, label=f'Average: {stats["average_confidence"]:.3f}')
-        ax.set_xlabel('Confidence Score', fontsize=12)
-        ax.set_ylabel('Number of URLs', fontsize=12)
-        ax.set_title('Analysis Confidence Distribution', fontsize=16, fontweight='bold')
-        ax.legend()
-        ax.grid(True, alpha=0.3)
-        
-        chart_path = config.RESULTS_DIR / 'confidence_distribution.png'
-        plt.savefig(chart_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        charts['confidence_distribution'] = str(chart_path)
+        chart_path = chart_paths['confidence_distribution']
+        if not chart_path.exists():
+            fig, ax = plt.subplots(figsize=(10, 6))
+            
+            ax.hist(confidences, bins=20, color='#16a085', edgecolor='black', alpha=0.7)
+            ax.axvline(x=stats['average_confidence'], color='red', linestyle='--', 
+                      linewidth=2, label=f'Average: {stats["average_confidence"]:.3f}')
+            ax.set_xlabel('Confidence Score', fontsize=12)
+            ax.set_ylabel('Number of URLs', fontsize=12)
+            ax.set_title('Analysis Confidence Distribution', fontsize=16, fontweight='bold')
+            ax.legend()
+            ax.grid(True, alpha=0.3)
+            
+            plt.savefig(chart_path, dpi=150, bbox_inches='tight')
+            plt.close()
         
         # 4. Score Comparison Over Time
-        fig, ax = plt.subplots(figsize=(12, 6))
-        url_indices = [r['url_index'] for r in results[:50]]  # First 50 for clarity
-        scores_a = [r['variant_a'].get('score', 0) for r in results[:50]]
-        scores_b = [r['variant_b'].get('score', 0) for r in results[:50]]
-        
-        ax.plot(url_indices, scores_a, 'b-', label='Variant A', linewidth=2, alpha=0.7)
-        ax.plot(url_indices, scores_b, 'r-', label='Variant B', linewidth=2, alpha=0.7)
-        ax.fill_between(url_indices, scores_a, scores_b, 
-                        where=[a > b for a, b in zip(scores_a, scores_b)],
-                        color='blue', alpha=0.3, label='A Better')
-        ax.fill_between(url_indices, scores_a, scores_b,
-                        where=[a <= b for a, b in zip(scores_a, scores_b)],
-                        color='red', alpha=0.3, label='B Better')
-        
-        ax.set_xlabel('URL Index', fontsize=12)
-        ax.set_ylabel('Quality Score (1-10)', fontsize=12)
-        ax.set_title('Quality Score Comparison (First 50 URLs)', fontsize=16, fontweight='bold')
-        ax.legend()
-        ax.grid(True, alpha=0.3)
-        
-        chart_path = config.RESULTS_DIR / 'score_progression.png'
-        plt.savefig(chart_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        charts['score_progression'] = str(chart_path)
-        
-        return charts
+        chart_path = chart_paths['score_progression']
+        if not chart_path.exists() and backend == 'datashader':
+            render_score_progression_datashader(url_indices, scores_a, scores_b, chart_path)
+        elif not chart_path.exists():
+            fig, ax = plt.subplots(figsize=(12, 6))
+            
+            ax.plot(url_indices, scores_a, 'b-', label='Variant A', linewidth=2, alpha=0.7)
+            ax.plot(url_indices, scores_b, 'r-', label='Variant B', linewidth=2, alpha=0.7)
+            ax.fill_between(url_indices, scores_a, scores_b, 
+                            where=[a > b for a, b in zip(scores_a, scores_b)],
+                            color='blue', alpha=0.3, label='A Better')
+            ax.fill_between(url_indices, scores_a, scores_b,
+                            where=[a <= b for a, b in zip(scores_a, scores_b)],
+                            color='red', alpha=0.3, label='B Better')
+            
+            ax.set_xlabel('URL Index', fontsize=12)
+            ax.set_ylabel('Quality Score (1-10)', fontsize=12)
+            ax.set_title('Quality Score Comparison (First 50 URLs)', fontsize=16, fontweight='bold')
+            ax.legend()
+            ax.grid(True, alpha=0.3)
+            
+            plt.savefig(chart_path, dpi=150, bbox_inches='tight')
+            plt.close()
+        
+        prune_stale_charts(chart_paths)
+        return {name: str(path) for name, path in chart_paths.items()}
     
     def generate_executive_summary(self, stats: Dict) -> List:
         """Generate executive summary section"""
@@ -246,7 +338,7 @@ class ComprehensiveReportGenerator:
         
         return elements
     
-    def generate_detailed_insights(self, results: List[Dict], stats: Dict) -> List:
+    def generate_detailed_insights(self, df: pd.DataFrame, stats: Dict) -> List:
         """Generate detailed insights section"""
         elements = []
         
@@ -254,14 +346,13 @@ class ComprehensiveReportGenerator:
         elements.append(Spacer(1, 12))
         
         # High confidence wins
-        high_conf_a = [r for r in results if r['analysis']['winner'] == 'A' 
-                      and r['analysis'].get('confidence', 0) > 0.8]
-        high_conf_b = [r for r in results if r['analysis']['winner'] == 'B'
-                      and r['analysis'].get('confidence', 0) > 0.8]
+        mask_hc = df['analysis_confidence'].fillna(0) > 0.8
+        high_conf_a = int(((df['analysis_winner'] == 'A') & mask_hc).sum())
+        high_conf_b = int(((df['analysis_winner'] == 'B') & mask_hc).sum())
         
         insights = [
-            f"• <b>High Confidence Wins:</b> Variant A had {len(high_conf_a)} high-confidence wins "
-            f"(>80% confidence), while Variant B had {len(high_conf_b)}.",
+            f"• <b>High Confidence Wins:</b> Variant A had {high_conf_a} high-confidence wins "
+            f"(>80% confidence), while Variant B had {high_conf_b}.",
             
             f"• <b>Duplicate Impact:</b> On average, Variant {'A' if stats['average_duplicates_a'] < stats['average_duplicates_b'] else 'B'} "
             f"shows {abs(stats['duplicate_difference']):.2f} fewer duplicate products per page, "
@@ -324,7 +415,8 @@ class ComprehensiveReportGenerator:
                 r['analysis'].get('key_differences', '')[:40] + '...'
             ])
         
-        table = Table(top_data, colWidths=[0.8*inch, 0.8*inch, 1*inch, 0.8*inch, 0.8*inch, 3.3*inch])
+        table = Table(top_data, colWidths=[0.8*inch, 0.8*inch, 1*inch, 0.8*inch, 0.8*inch, 3.3*inch],
+                      repeatRows=1)
         table.setStyle(TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
@@ -340,7 +432,8 @@ class ComprehensiveReportGenerator:
         
         return elements
     
-    def generate_report(self, results_file: str = None, output_file: str = None):
+    def generate_report(self, results_file: str = None, output_file: str = None,
+                        chart_backend: str = 'matplotlib'):
         """Generate the complete PDF report"""
         
         # Load results
@@ -354,21 +447,22 @@ class ComprehensiveReportGenerator:
         with open(results_file, 'r') as f:
             results = json.load(f)
         
+        # Flatten nested result dicts into columns like 'analysis_winner'
+        df = pd.json_normalize(results, sep='_')
+        
         # Load statistics
         stats_file = config.RESULTS_DIR / "parallel_statistics.json"
         if Path(stats_file).exists():
             with open(stats_file, 'r') as f:
                 stats = json.load(f)
         else:
-            # Calculate if not exists
-            from run_parallel_analysis import calculate_final_statistics
-            calculate_final_statistics(results)
-            with open(stats_file, 'r') as f:
-                stats = json.load(f)
+            # Calculate if not exists and cache for the next run
+            stats = compute_stats(df)
+            json_io.dump_json(stats_file, stats)
         
         # Generate charts
         logger.info("Generating analysis charts...")
-        charts = self.generate_charts(results, stats)
+        charts = self.generate_charts(results, stats, backend=chart_backend)
         
         # Setup PDF
         if not output_file:
@@ -437,7 +531,7 @@ class ComprehensiveReportGenerator:
             elements.append(PageBreak())
         
         # Detailed Insights
-        elements.extend(self.generate_detailed_insights(results, stats))
+        elements.extend(self.generate_detailed_insights(df, stats))
         elements.append(PageBreak())
         
         # Top Performers
@@ -457,13 +551,16 @@ def main():
     parser = argparse.ArgumentParser(description='Generate comprehensive PDF report')
     parser.add_argument('--results', help='Path to results JSON file')
     parser.add_argument('--output', help='Output PDF file path')
+    parser.add_argument('--chart-backend', choices=['matplotlib', 'datashader'], default='matplotlib',
+                        help='Renderer for the score progression chart (datashader plots all URLs)')
     
     args = parser.parse_args()
     
     generator = ComprehensiveReportGenerator()
     report_path = generator.generate_report(
         results_file=args.results,
-        output_file=args.output
+        output_file=args.output,
+        chart_backend=args.chart_backend
     )
     
     if report_path:
@@ -3,10 +3,14 @@
 Generate PDF report with A/B screenshots side-by-side for direct comparison
 """
 
-import json
 import logging
+import os
 from pathlib import Path
 from datetime import datetime
+from typing import Dict, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from operator import itemgetter
+from functools import lru_cache
 from PIL import Image
 import io
 
@@ -14,9 +18,10 @@ from reportlab.lib import colors
 from reportlab.lib.pagesizes import landscape, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
 from reportlab.platypus import (
     SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, 
-    PageBreak, Image as RLImage, KeepTogether
+    PageBreak, Image as RLImage, KeepTogether, KeepInFrame, Frame, Flowable
 )
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 from reportlab.pdfgen import canvas
@@ -24,11 +29,107 @@ from reportlab.pdfgen import canvas
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 import config
+import json_io
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Screenshot box on a landscape page (half page width minus margins, room left for text)
+MAX_IMG_WIDTH = 4.8 * inch
+MAX_IMG_HEIGHT = 5.5 * inch
+
+
+def _probe_and_downscale(item):
+    """Open a screenshot, shrink it to fit its box at EMBED_DPI and return (width, height, image_bytes)
+
+    Screenshots are re-encoded as JPEG; PNG is only kept when the image has transparency.
+    """
+    path, max_width, max_height = item
+    target = (int(max_width / inch * config.EMBED_DPI), int(max_height / inch * config.EMBED_DPI))
+    with Image.open(path) as img:
+        # Let libjpeg decode JPEG sources at a reduced scale (no-op for PNG)
+        img.draft('RGB', target)
+        has_alpha = img.mode in ('RGBA', 'LA') or 'transparency' in img.info
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+        img.thumbnail(target, Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        if has_alpha:
+            img.save(buffer, format='PNG', optimize=True)
+        else:
+            img.save(buffer, format='JPEG', quality=config.SCREENSHOT_QUALITY)
+    return img.width, img.height, buffer.getvalue()
+
+
+class SharedImage(RLImage):
+    """RLImage drawn from an already decoded ImageReader instead of re-reading the file"""
+    
+    def __init__(self, reader, width=None, height=None, kind='direct', border_color=None):
+        self._img = reader
+        self.border_color = border_color
+        super().__init__(io.BytesIO(), width=width, height=height, kind=kind)
+    
+    def draw(self):
+        super().draw()
+        if self.border_color is not None:
+            self.canv.saveState()
+            self.canv.setStrokeColor(self.border_color)
+            self.canv.setLineWidth(2)
+            self.canv.rect(getattr(self, '_offs_x', 0), getattr(self, '_offs_y', 0),
+                           self.drawWidth, self.drawHeight, stroke=1, fill=0)
+            self.canv.restoreState()
+
+
+class SideBySide(Flowable):
+    """Two fixed-width columns, each laid out in its own Frame instead of negotiating a Table"""
+    
+    def __init__(self, left, right, col_width, max_height):
+        super().__init__()
+        self.col_width = col_width
+        self.columns = [KeepInFrame(col_width, max_height, content, mode='shrink') for content in (left, right)]
+    
+    def wrap(self, availWidth, availHeight):
+        self.height = max(column.wrapOn(self.canv, self.col_width, availHeight)[1] for column in self.columns)
+        self.width = self.col_width * len(self.columns)
+        return self.width, self.height
+    
+    def draw(self):
+        for i, column in enumerate(self.columns):
+            frame = Frame(i * self.col_width, 0, self.col_width, self.height,
+                          leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0)
+            frame.addFromList([column], self.canv)
+
+
+@lru_cache(maxsize=4096)
+def _category(url):
+    """Category segment of a product URL (second to last path part)"""
+    parts = url.rsplit('/', 2)
+    return parts[-2] if len(parts) >= 2 else 'Unknown'
+
+
+class StoryStream(list):
+    """Story list that pulls the next chunk of flowables from an iterator once it runs empty"""
+    
+    def __init__(self, chunks):
+        super().__init__()
+        self._chunks = iter(chunks)
+    
+    def __len__(self):
+        # The doc template checks len() before handling each flowable
+        while not list.__len__(self):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self.extend(chunk)
+        return list.__len__(self)
+
+
+class StreamingDocTemplate(SimpleDocTemplate):
+    """SimpleDocTemplate that lays out pages as they are generated instead of holding the whole story"""
+    
+    def build(self, chunks, **kwargs):
+        super().build(StoryStream(chunks), **kwargs)
+
 
 class SideBySideReportGenerator:
     """Generate PDF with A/B screenshots side-by-side"""
@@ -36,6 +137,9 @@ class SideBySideReportGenerator:
     def __init__(self):
         self.styles = getSampleStyleSheet()
         self.setup_custom_styles()
+        self.setup_page_templates()
+        # Decoded screenshots keyed by resolved path, shared across pages
+        self._img_cache: Dict[Path, Tuple[int, int, ImageReader]] = {}
         
     def setup_custom_styles(self):
         """Setup custom paragraph styles"""
@@ -81,26 +185,83 @@ class SideBySideReportGenerator:
             rightIndent=10
         ))
     
+    def setup_page_templates(self):
+        """Build the paragraphs and table styles shared by every comparison page"""
+        self._hdr_a = Paragraph("<b>Variant A (opt_seg=5)</b>", self.styles['Heading3'])
+        self._hdr_b = Paragraph("<b>Variant B (opt_seg=6)</b>", self.styles['Heading3'])
+        self._sn_found_a = Paragraph("Screenshot not found", self.styles['Normal'])
+        self._sn_found_b = Paragraph("Screenshot not found", self.styles['Normal'])
+        self._key_diff_label = Paragraph("<b>Key Differences:</b>", self.styles['Normal'])
+        
+        # Winner announcement per winner; any other verdict is shown as a tie
+        self._winner_templates = {
+            'A': "<b>WINNER: Variant A (opt_seg=5)</b> - Score: {sa} vs {sb} - Confidence: {c:.0%}",
+            'B': "<b>WINNER: Variant B (opt_seg=6)</b> - Score: {sb} vs {sa} - Confidence: {c:.0%}",
+            'Tie': "<b>TIE</b> - Both scored {sa} - Confidence: {c:.0%}",
+            'shortcut': "<b>TIE</b> - Identical product rankings, not scored - Confidence: {c:.0%}",
+        }
+        
+        # Screenshot border colors (A, B) per winner, highlighting the winning variant
+        self._border_colors = {
+            'A': (colors.HexColor('#3498db'), colors.grey),
+            'B': (colors.grey, colors.HexColor('#e74c3c')),
+            'Tie': (colors.grey, colors.grey),
+        }
+    
+    def load_image(self, img_path):
+        """Downscale a screenshot once and return its cached (width, height, ImageReader)"""
+        key = Path(img_path).resolve()
+        if key not in self._img_cache:
+            width, height, image_bytes = _probe_and_downscale((key, MAX_IMG_WIDTH, MAX_IMG_HEIGHT))
+            self._img_cache[key] = (width, height, ImageReader(io.BytesIO(image_bytes)))
+        return self._img_cache[key]
+    
+    def preprocess_images(self, results):
+        """Decode and downscale all screenshots for the given results in parallel"""
+        paths = set()
+        for result in results:
+            for variant in ('variant_a', 'variant_b'):
+                path = (config.SCREENSHOTS_DIR / result[variant]['screenshot']).resolve()
+                if path not in self._img_cache and path.is_file():
+                    paths.add(path)
+        if not paths:
+            return
+        
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            futures = {
+                executor.submit(_probe_and_downscale, (path, MAX_IMG_WIDTH, MAX_IMG_HEIGHT)): path
+                for path in paths
+            }
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    width, height, image_bytes = future.result()
+                except Exception as e:
+                    logger.warning(f"Could not preprocess image {path}: {e}")
+                    continue
+                self._img_cache[path] = (width, height, ImageReader(io.BytesIO(image_bytes)))
+        
+        logger.info(f"Preprocessed {len(paths)} screenshots")
+    
     def resize_image_proportional(self, img_path, max_width, max_height):
         """Resize image while maintaining aspect ratio"""
         try:
-            with Image.open(img_path) as img:
-                # Get original dimensions
-                width, height = img.size
-                
-                # Calculate scale to fit within bounds
-                scale = min(max_width / width, max_height / height)
-                
-                # Calculate new dimensions
-                new_width = width * scale
-                new_height = height * scale
-                
-                return new_width, new_height
+            # Get original dimensions
+            width, height, _ = self.load_image(img_path)
+            
+            # Calculate scale to fit within bounds
+            scale = min(max_width / width, max_height / height)
+            
+            # Calculate new dimensions
+            new_width = width * scale
+            new_height = height * scale
+            
+            return new_width, new_height
         except Exception as e:
             logger.warning(f"Could not process image {img_path}: {e}")
             return max_width * 0.8, max_height * 0.8
     
-    def create_comparison_page(self, result, page_elements):
+    def create_comparison_page(self, result):
         """Create a single page comparing A and B side-by-side"""
         elements = []
         
@@ -109,25 +270,21 @@ class SideBySideReportGenerator:
         elements.append(Paragraph(url_text, self.styles['URLHeader']))
         
         # Query/Category from URL
-        url = result['original_url']
-        category = url.split('/')[-2] if '/' in url else 'Unknown'
+        category = _category(result['original_url'])
         elements.append(Paragraph(f"Category: {category}", self.styles['Normal']))
         
         # Winner announcement
         winner = result['analysis']['winner']
         confidence = result['analysis'].get('confidence', 0)
-        score_a = result['variant_a'].get('score', 0)
-        score_b = result['variant_b'].get('score', 0)
-        
-        if winner == 'A':
-            winner_text = f"<b>WINNER: Variant A (opt_seg=5)</b> - Score: {score_a}/10 vs {score_b}/10 - Confidence: {confidence:.0%}"
-            winner_color = colors.HexColor('#3498db')
-        elif winner == 'B':
-            winner_text = f"<b>WINNER: Variant B (opt_seg=6)</b> - Score: {score_b}/10 vs {score_a}/10 - Confidence: {confidence:.0%}"
-            winner_color = colors.HexColor('#e74c3c')
-        else:
-            winner_text = f"<b>TIE</b> - Both scored {score_a}/10 - Confidence: {confidence:.0%}"
-            winner_color = colors.HexColor('#95a5a6')
+        score_a = f"{result['variant_a'].get('score', 0)}/10"
+        score_b = f"{result['variant_b'].get('score', 0)}/10"
+        template_key = winner
+        if result['analysis'].get('shortcut'):
+            score_a = score_b = 'N/A'
+            template_key = 'shortcut'
+        
+        template = self._winner_templates.get(template_key, self._winner_templates['Tie'])
+        winner_text = template.format(sa=score_a, sb=score_b, c=confidence)
         
         winner_para = Paragraph(winner_text, self.styles['WinnerStyle'])
         elements.append(winner_para)
@@ -136,77 +293,54 @@ class SideBySideReportGenerator:
         # Side-by-side screenshots
         screenshot_a = config.SCREENSHOTS_DIR / result['variant_a']['screenshot']
         screenshot_b = config.SCREENSHOTS_DIR / result['variant_b']['screenshot']
+        # Check for the files before any image is opened
+        screenshots_found = screenshot_a.is_file() and screenshot_b.is_file()
         
-        # Calculate image dimensions (side-by-side on landscape)
-        max_img_width = 4.8 * inch  # Half page width minus margins
-        max_img_height = 5.5 * inch  # Leave room for text
-        
-        # Get proportional dimensions
-        width_a, height_a = self.resize_image_proportional(screenshot_a, max_img_width, max_img_height)
-        width_b, height_b = self.resize_image_proportional(screenshot_b, max_img_width, max_img_height)
-        
-        # Use the smaller height to align images
-        final_height = min(height_a, height_b)
-        
-        # Create image table for side-by-side layout
-        img_data = []
+        # Style based on winner
+        border_a, border_b = self._border_colors.get(winner, self._border_colors['Tie'])
         
-        # Headers
-        header_a = Paragraph("<b>Variant A (opt_seg=5)</b>", self.styles['Heading3'])
-        header_b = Paragraph("<b>Variant B (opt_seg=6)</b>", self.styles['Heading3'])
-        img_data.append([header_a, header_b])
+        # Columns: header, screenshot, scores and duplicates
+        column_a = [self._hdr_a]
+        column_b = [self._hdr_b]
         
         # Images
-        if screenshot_a.exists() and screenshot_b.exists():
-            img_a = RLImage(str(screenshot_a), width=width_a, height=final_height, kind='proportional')
-            img_b = RLImage(str(screenshot_b), width=width_b, height=final_height, kind='proportional')
-            img_data.append([img_a, img_b])
+        if screenshots_found:
+            # Get proportional dimensions (side-by-side on landscape)
+            width_a, height_a = self.resize_image_proportional(screenshot_a, MAX_IMG_WIDTH, MAX_IMG_HEIGHT)
+            width_b, height_b = self.resize_image_proportional(screenshot_b, MAX_IMG_WIDTH, MAX_IMG_HEIGHT)
+            
+            # Use the smaller height to align images
+            final_height = min(height_a, height_b)
+            
+            column_a.append(SharedImage(self.load_image(screenshot_a)[2], width=width_a, height=final_height,
+                                        kind='proportional', border_color=border_a))
+            column_b.append(SharedImage(self.load_image(screenshot_b)[2], width=width_b, height=final_height,
+                                        kind='proportional', border_color=border_b))
         else:
-            img_data.append([Paragraph("Screenshot not found", self.styles['Normal']),
-                           Paragraph("Screenshot not found", self.styles['Normal'])])
+            column_a.append(self._sn_found_a)
+            column_b.append(self._sn_found_b)
         
         # Scores and duplicates
         dup_a = result['variant_a'].get('duplicates', -1)
         dup_b = result['variant_b'].get('duplicates', -1)
         
-        score_text_a = f"Score: {score_a}/10 | Duplicates: {dup_a if dup_a >= 0 else 'N/A'}"
-        score_text_b = f"Score: {score_b}/10 | Duplicates: {dup_b if dup_b >= 0 else 'N/A'}"
-        
-        img_data.append([
-            Paragraph(score_text_a, self.styles['Normal']),
-            Paragraph(score_text_b, self.styles['Normal'])
-        ])
-        
-        # Create table with images
-        img_table = Table(img_data, colWidths=[5*inch, 5*inch])
+        score_text_a = f"Score: {score_a} | Duplicates: {dup_a if dup_a >= 0 else 'N/A'}"
+        score_text_b = f"Score: {score_b} | Duplicates: {dup_b if dup_b >= 0 else 'N/A'}"
         
-        # Style based on winner
-        border_color_a = winner_color if winner == 'A' else colors.grey
-        border_color_b = winner_color if winner == 'B' else colors.grey
+        column_a += [Spacer(1, 5), Paragraph(score_text_a, self.styles['Normal'])]
+        column_b += [Spacer(1, 5), Paragraph(score_text_b, self.styles['Normal'])]
         
-        img_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-            ('GRID', (0, 1), (0, 1), 2, border_color_a),  # Border for A
-            ('GRID', (1, 1), (1, 1), 2, border_color_b),  # Border for B
-            ('TOPPADDING', (0, 2), (-1, 2), 5),
-            ('FONTSIZE', (0, 2), (-1, 2), 10),
-        ]))
+        # Fixed-width side-by-side columns
+        img_table = SideBySide(column_a, column_b, 5*inch, MAX_IMG_HEIGHT + inch)
         
         elements.append(img_table)
         elements.append(Spacer(1, 10))
         
-        # Key differences and reasoning
-        key_diff = result['analysis'].get('key_differences', '')
-        reasoning = result['analysis'].get('reasoning', '')
-        
-        if key_diff:
-            elements.append(Paragraph("<b>Key Differences:</b>", self.styles['Normal']))
-            elements.append(Paragraph(key_diff[:200] + "..." if len(key_diff) > 200 else key_diff, 
-                                    self.styles['AnalysisText']))
+        # Key differences
+        short_diff = result['_short_diff']
+        if short_diff:
+            elements.append(self._key_diff_label)
+            elements.append(Paragraph(short_diff, self.styles['AnalysisText']))
         
         # Add page break for next comparison
         elements.append(PageBreak())
@@ -258,6 +392,28 @@ class SideBySideReportGenerator:
         
         return elements
     
+    def iter_story(self, stats, selected_results):
+        """Yield the report content one page at a time"""
+        # Title page
+        yield [
+            Spacer(1, 2*inch),
+            Paragraph("A/B Test Visual Comparison Report", self.styles['CustomTitle']),
+            Paragraph("Side-by-Side Analysis of opt_seg=5 vs opt_seg=6", self.styles['Heading2']),
+            Spacer(1, 0.5*inch),
+            Paragraph(f"Generated: {datetime.now().strftime('%B %d, %Y at %H:%M')}", self.styles['Normal']),
+            PageBreak(),
+        ]
+        
+        # Summary page
+        yield self.generate_summary_page(stats)
+        
+        # Add comparison pages
+        for result in selected_results:
+            try:
+                yield self.create_comparison_page(result)
+            except Exception as e:
+                logger.warning(f"Failed to create page for URL {result.get('url_index')}: {e}")
+    
     def generate_report(self, output_file=None, limit=50):
         """Generate the side-by-side comparison report"""
         
@@ -267,68 +423,46 @@ class SideBySideReportGenerator:
             logger.error(f"Results file not found: {results_file}")
             return None
         
-        with open(results_file, 'r') as f:
-            results = json.load(f)
-        
         # Load statistics
         stats_file = config.RESULTS_DIR / "final_200_statistics.json"
-        with open(stats_file, 'r') as f:
-            stats = json.load(f)
+        stats = json_io.load_json(stats_file)
         
         # Setup PDF
         if not output_file:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             output_file = config.BASE_DIR / f"sidebyside_comparison_report_{timestamp}.pdf"
         
-        doc = SimpleDocTemplate(
+        doc = StreamingDocTemplate(
             str(output_file),
             pagesize=landscape(A4),
             rightMargin=36, leftMargin=36,
             topMargin=36, bottomMargin=36
         )
         
-        # Build content
-        elements = []
-        
-        # Title page
-        elements.append(Spacer(1, 2*inch))
-        elements.append(Paragraph(
-            "A/B Test Visual Comparison Report",
-            self.styles['CustomTitle']
-        ))
-        elements.append(Paragraph(
-            "Side-by-Side Analysis of opt_seg=5 vs opt_seg=6",
-            self.styles['Heading2']
-        ))
-        elements.append(Spacer(1, 0.5*inch))
-        elements.append(Paragraph(
-            f"Generated: {datetime.now().strftime('%B %d, %Y at %H:%M')}",
-            self.styles['Normal']
-        ))
-        elements.append(PageBreak())
-        
-        # Summary page
-        elements.extend(self.generate_summary_page(stats))
-        
         # Filter results to show most interesting comparisons
         # Show: All wins for A, all wins for B (up to limit), and a few ties
-        a_wins = [r for r in results if r['analysis']['winner'] == 'A'][:20]
-        b_wins = [r for r in results if r['analysis']['winner'] == 'B'][:25]
-        ties = [r for r in results if r['analysis']['winner'] == 'Tie'][:5]
-        
-        selected_results = a_wins + b_wins + ties
-        selected_results.sort(key=lambda x: x['url_index'])
-        
-        # Add comparison pages
-        for result in selected_results[:limit]:
-            try:
-                page_elements = self.create_comparison_page(result, elements)
-                elements.extend(page_elements)
-            except Exception as e:
-                logger.warning(f"Failed to create page for URL {result.get('url_index')}: {e}")
-        
-        # Build PDF
-        doc.build(elements)
+        # Results are streamed so unselected entries are never kept in memory
+        buckets = {'A': [], 'B': [], 'Tie': []}
+        caps = {'A': 20, 'B': 25, 'Tie': 5}
+        remaining = sum(caps.values())
+        for r in json_io.iter_items(results_file):
+            winner = r['analysis']['winner']
+            bucket = buckets.get(winner)
+            if bucket is not None and len(bucket) < caps[winner]:
+                # Shorten key differences once here rather than while building pages
+                key_diff = r['analysis'].get('key_differences', '')
+                r['_short_diff'] = key_diff if len(key_diff) <= 200 else key_diff[:200] + "..."
+                bucket.append(r)
+                remaining -= 1
+                if not remaining:
+                    break  # Every quota is filled, skip the rest of the file
+        
+        selected_results = sorted(buckets['A'] + buckets['B'] + buckets['Tie'], key=itemgetter('url_index'))
+        selected_results = selected_results[:limit]
+        self.preprocess_images(selected_results)
+        
+        # Build PDF, laying out each page as it is generated
+        doc.build(self.iter_story(stats, selected_results))
         logger.info(f"Side-by-side report generated: {output_file}")
         
         return str(output_file)
@@ -0,0 +1,63 @@
+"""
+JSON helpers for A/B test results and statistics files
+Uses orjson when it is installed and falls back to the standard library otherwise
+"""
+
+import os
+import json
+import threading
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+def dumps(data, indent=False) -> bytes:
+    """Serialize data to UTF-8 encoded JSON bytes"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option)
+    return json.dumps(data, ensure_ascii=False, indent=2 if indent else None).encode('utf-8')
+
+
+def loads(raw):
+    """Parse JSON from bytes or str"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def load_json(path):
+    """Load a JSON file"""
+    return loads(Path(path).read_bytes())
+
+
+def dump_json(path, data, indent=True):
+    """Write data to a JSON file"""
+    Path(path).write_bytes(dumps(data, indent=indent))
+
+
+def dump_json_atomic(path, data, indent=False):
+    """Write data to a JSON file through a temporary sibling so readers never see a partial file"""
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(dumps(data, indent=indent))
+    os.replace(tmp_path, path)
+
+
+def iter_items(path):
+    """Yield the items of a top-level JSON array, streaming the file when ijson is installed"""
+    if ijson is None:
+        yield from load_json(path)
+        return
+    with open(path, 'rb') as f:
+        yield from ijson.items(f, 'item', use_float=True)
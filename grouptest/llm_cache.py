@@ -0,0 +1,46 @@
+"""
+On-disk cache of LLM responses for A/B test comparisons
+Entries are content-addressed by the model and request messages, so reruns reuse earlier verdicts
+"""
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+import json_io
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(model, messages) -> str:
+    """SHA-256 over the model name and the serialized messages"""
+    raw = json.dumps({"model": model, "messages": messages}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class DiskCache:
+    """Stores one JSON file per key under root/<key[:2]>/<key>.json"""
+    
+    def __init__(self, root):
+        self.root = Path(root)
+    
+    def _path(self, key):
+        return self.root / key[:2] / f"{key}.json"
+    
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        path = self._path(key)
+        try:
+            return json_io.load_json(path)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning(f"Ignoring corrupt cache entry {path.name}: {e}")
+            return None
+    
+    def set(self, key, value):
+        """Store value under key, replacing the file atomically"""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        json_io.dump_json_atomic(path, value)
@@ -2,23 +2,54 @@
 """Monitor progress of enhanced analysis"""
 
 import json
-import time
+import threading
 from pathlib import Path
 from datetime import datetime
 
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+
+
+class ResultsFileHandler(FileSystemEventHandler):
+    """Signal when the enhanced results file is written"""
+    
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.changed = threading.Event()
+    
+    def on_any_event(self, event):
+        if Path(event.src_path).name == self.file_name:
+            self.changed.set()
+
+
+# mtime and result count of the last parse of the results file
+_progress_cache = {'mtime': None, 'count': 0}
+
 def get_progress():
     results_file = Path("results/enhanced_results.json")
-    if results_file.exists():
+    try:
+        mtime = results_file.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+    if mtime != _progress_cache['mtime']:
         with open(results_file, 'r') as f:
             data = json.load(f)
-            return len(data)
-    return 0
+        _progress_cache['mtime'] = mtime
+        _progress_cache['count'] = len(data)
+    return _progress_cache['count']
 
 def main():
     print("=" * 60)
     print("ENHANCED ANALYSIS PROGRESS MONITOR")
     print("=" * 60)
     
+    results_dir = Path("results")
+    results_dir.mkdir(exist_ok=True)
+    handler = ResultsFileHandler("enhanced_results.json")
+    observer = Observer()
+    observer.schedule(handler, str(results_dir), recursive=False)
+    observer.start()
+    
     while True:
         processed = get_progress()
         percentage = (processed / 200) * 100
@@ -29,7 +60,12 @@ def main():
             print("\n\n✅ ANALYSIS COMPLETE!")
             break
         
-        time.sleep(30)  # Check every 30 seconds
+        # Wait for the results file to change, re-checking at least every 30 seconds
+        handler.changed.wait(30)
+        handler.changed.clear()
+    
+    observer.stop()
+    observer.join()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -3,12 +3,77 @@
 Monitor progress of A/B test analysis
 """
 
+import os
 import time
 import json
 import sys
+import threading
 from pathlib import Path
 from datetime import datetime, timedelta
 
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+
+
+def is_result_name(name):
+    """Whether a file name is a per-URL result_*.json file"""
+    return name.startswith("result_") and name.endswith(".json")
+
+
+def result_names(results_dir):
+    """Names of the result_*.json files, from a single directory scan"""
+    with os.scandir(results_dir) as entries:
+        return {entry.name for entry in entries if is_result_name(entry.name)}
+
+
+def latest_pdf(directory="."):
+    """Return (path, mtime) of the newest ab_test_report_*.pdf, or (None, None)"""
+    best, best_mtime = None, None
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.startswith("ab_test_report_") and name.endswith(".pdf"):
+                mtime = entry.stat().st_mtime
+                if best_mtime is None or mtime > best_mtime:
+                    best, best_mtime = entry.path, mtime
+    return best, best_mtime
+
+
+class ProgressEventHandler(FileSystemEventHandler):
+    """Track result files and flag log changes as filesystem events arrive
+    
+    Result files are kept by name, so a rewritten result is not counted twice
+    """
+    
+    def __init__(self, names, log_name):
+        self.names = names
+        self.log_name = log_name
+        self.log_changed = True
+        self.changed = threading.Event()
+    
+    @property
+    def count(self):
+        return len(self.names)
+    
+    def on_created(self, event):
+        name = Path(event.src_path).name
+        if not event.is_directory and is_result_name(name):
+            self.names.add(name)
+        self.on_modified(event)
+    
+    def on_moved(self, event):
+        # json_io.dump_json_atomic writes a temp file and renames it onto result_NNN.json
+        name = Path(event.dest_path).name
+        if not event.is_directory and is_result_name(name):
+            self.names.add(name)
+        self.changed.set()
+    
+    def on_modified(self, event):
+        if Path(event.src_path).name == self.log_name:
+            self.log_changed = True
+        self.changed.set()
+
+
 def monitor_progress():
     """Monitor the analysis progress"""
     
@@ -21,25 +86,38 @@ def monitor_progress():
     
     start_time = datetime.now()
     last_count = 0
+    log_fh = None
+    last_pos = 0
+    
+    # Count existing results once, then let filesystem events keep the count current
+    results_dir.mkdir(exist_ok=True)
+    handler = ProgressEventHandler(result_names(results_dir), log_file.name)
+    observer = Observer()
+    observer.schedule(handler, str(results_dir), recursive=False)
+    observer.schedule(handler, ".", recursive=False)
+    observer.start()
     
     while True:
         try:
-            # Count result files
-            result_files = list(results_dir.glob("result_*.json"))
-            current_count = len(result_files)
+            current_count = handler.count
             
-            # Get latest from log
-            if log_file.exists():
-                with open(log_file, 'r') as f:
-                    lines = f.readlines()
-                    for line in reversed(lines):
-                        if "Processing URL" in line:
-                            latest = line.strip()
-                            break
-                    else:
-                        latest = "No processing info found"
-            else:
+            # Get latest from log, reading only what was appended since the last change
+            if not log_file.exists():
                 latest = "Log file not found"
+            elif handler.log_changed:
+                handler.log_changed = False
+                if log_fh is None:
+                    log_fh = open(log_file, 'r')
+                    latest = "No processing info found"
+                if log_file.stat().st_size < last_pos:
+                    last_pos = 0  # Log was truncated or rewritten
+                log_fh.seek(last_pos)
+                chunk = log_fh.read()
+                last_pos = log_fh.tell()
+                for line in reversed(chunk.splitlines()):
+                    if "Processing URL" in line:
+                        latest = line.strip()
+                        break
             
             # Calculate stats
             elapsed = datetime.now() - start_time
@@ -68,14 +146,15 @@ def monitor_progress():
                 break
             
             # Check for report generation
-            pdf_files = list(Path(".").glob("ab_test_report_*.pdf"))
-            if pdf_files:
-                latest_pdf = max(pdf_files, key=lambda p: p.stat().st_mtime)
-                if (datetime.now() - datetime.fromtimestamp(latest_pdf.stat().st_mtime)).seconds < 60:
-                    print(f"\n\n✓ Report generated: {latest_pdf}")
+            pdf_path, pdf_mtime = latest_pdf()
+            if pdf_path:
+                if (datetime.now() - datetime.fromtimestamp(pdf_mtime)).seconds < 60:
+                    print(f"\n\n✓ Report generated: {pdf_path}")
                     break
             
-            time.sleep(5)
+            # Wake on the next filesystem event, refreshing the display at least every 5s
+            handler.changed.wait(5)
+            handler.changed.clear()
             
         except KeyboardInterrupt:
             print("\n\nMonitoring stopped by user.")
@@ -83,6 +162,11 @@ def monitor_progress():
         except Exception as e:
             print(f"\nError: {e}")
             time.sleep(5)
+    
+    observer.stop()
+    observer.join()
+    if log_fh is not None:
+        log_fh.close()
 
 if __name__ == "__main__":
     monitor_progress()
\ No newline at end of file
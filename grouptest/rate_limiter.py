@@ -0,0 +1,87 @@
+"""
+Client-side rate limiting for OpenAI requests
+A token bucket holding both the requests-per-minute and tokens-per-minute budgets, shared by all callers
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Rough input cost of one high-detail 1920x1080 screenshot (6 tiles of 512px + base)
+IMAGE_TOKENS = 6 * 170 + 85
+
+
+def estimate_tokens(payload) -> int:
+    """Estimate the tokens a chat completion request counts against the TPM limit"""
+    tokens = payload.get('max_completion_tokens', 0)
+    for message in payload.get('messages', ()):
+        content = message['content']
+        if isinstance(content, str):
+            tokens += len(content) // 4
+            continue
+        for part in content:
+            if part['type'] == 'text':
+                tokens += len(part['text']) // 4
+            else:
+                tokens += IMAGE_TOKENS
+    return tokens
+
+
+class TokenBucket:
+    """Request and token budgets that refill continuously over a one-minute window"""
+    
+    def __init__(self, rpm, tpm, min_fraction=0.1):
+        self.rpm = self._base_rpm = float(rpm)
+        self.tpm = self._base_tpm = float(tpm)
+        self.min_fraction = min_fraction
+        self._requests = self.rpm
+        self._tokens = self.tpm
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _take(self, tokens) -> float:
+        """Take one request and the given tokens, or return how long to wait before retrying"""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+            
+            # A request larger than the whole bucket waits for a full bucket instead of forever
+            tokens = min(tokens, self.tpm)
+            if self._requests >= 1 and self._tokens >= tokens:
+                self._requests -= 1
+                self._tokens -= tokens
+                return 0.0
+            
+            wait_requests = max(0.0, 1 - self._requests) * 60 / self.rpm
+            wait_tokens = max(0.0, tokens - self._tokens) * 60 / self.tpm
+            return max(wait_requests, wait_tokens)
+    
+    async def acquire(self, tokens=0):
+        """Wait until a request of the given size fits in the budget"""
+        while True:
+            wait = self._take(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+    
+    def scale(self, factor):
+        """Shrink both budgets after a rate-limit response, down to min_fraction of the configured limits"""
+        with self._lock:
+            self.rpm = max(self.rpm * factor, self._base_rpm * self.min_fraction)
+            self.tpm = max(self.tpm * factor, self._base_tpm * self.min_fraction)
+            self._requests = min(self._requests, self.rpm)
+            self._tokens = min(self._tokens, self.tpm)
+        logger.warning(f"Rate limited: budget reduced to {math.floor(self.rpm)} RPM / {math.floor(self.tpm)} TPM")
+
+
+# Shared by every task and thread in the process
+limiter = TokenBucket(config.OPENAI_RPM, config.OPENAI_TPM)
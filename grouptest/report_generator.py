@@ -3,10 +3,17 @@ PDF Report Generator for A/B Test Ranking Analysis
 Generates comprehensive report comparing product ranking algorithms
 """
 
-import json
+import heapq
+import io
 import logging
+import math
+import os
+import struct
+from functools import lru_cache, partial
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from operator import itemgetter
 import sys
 
 from reportlab.lib.pagesizes import A4, landscape
@@ -14,25 +21,254 @@ from reportlab.platypus import (
     SimpleDocTemplate, Paragraph, Spacer, Image, 
     Table, TableStyle, PageBreak
 )
+from reportlab.pdfgen import canvas
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import inch, cm
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
+import numpy as np
 from PIL import Image as PILImage
+from pypdf import PdfWriter
 
-# Add parent directory to path
-sys.path.append(str(Path(__file__).parent.parent))
+# Add parent directory to path (once; appended so grouptest's own config stays first)
+_ROOT = str(Path(__file__).resolve().parent.parent)
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
 
 import config
+import json_io
 
 logger = logging.getLogger(__name__)
 
+# Results files above this size are streamed instead of parsed in one go
+STREAM_THRESHOLD_BYTES = 32 * 1024 * 1024
+
+# Screenshots are embedded from copies resized to ~150 DPI of their 5 inch slot
+THUMB_SIZE_PX = int(5 * 150)
+
+# Maximum number of detailed pages laid out per worker task
+DETAIL_CHUNK_SIZE = 25
+
+# Shared colour palette
+C_GREEN = colors.HexColor('#27AE60')
+C_RED = colors.HexColor('#E74C3C')
+C_AMBER = colors.HexColor('#F39C12')
+C_GREY = colors.HexColor('#E0E0E0')
+C_DARK = colors.HexColor('#34495E')
+C_NAVY = colors.HexColor('#2C3E50')
+C_BLUE = colors.HexColor('#3498DB')
+C_LIGHT = colors.HexColor('#ECF0F1')
+C_BORDER = colors.HexColor('#95A5A6')
+C_MUTED = colors.HexColor('#7F8C8D')
+C_SLATE = colors.HexColor('#5A6C7D')
+
+# Per-verdict colour, headline and screenshot border colours/widths (A, B)
+_WINNER_DISPATCH = {
+    'A': (C_GREEN, '✓ Winner: Variant A (opt_seg=5)', C_GREEN, C_GREY, 3, 1),
+    'B': (C_RED, '✓ Winner: Variant B (opt_seg=6)', C_GREY, C_RED, 1, 3),
+    'Tie': (C_AMBER, '= Tie: Both variants perform equally', C_AMBER, C_AMBER, 2, 2),
+}
+_WINNER_DEFAULT = (C_MUTED, 'Analysis pending', C_GREY, C_GREY, 1, 1)
+
+# Table styles shared by every detailed comparison page
+_HEADER_STYLE = TableStyle([
+    ('FONTSIZE', (0, 0), (-1, -1), 12),
+    ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('TEXTCOLOR', (1, 0), (1, 0), C_MUTED),
+    ('FONTNAME', (2, 0), (2, 0), 'Helvetica-Oblique'),
+])
+_WINNER_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (0, 0), 16),
+    ('LEADING', (0, 0), (0, 0), 20),
+    ('FONTSIZE', (0, 1), (0, 1), 11),
+])
+_SCREENSHOT_BASE_STYLE = [
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 3),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 3),
+    ('TOPPADDING', (0, 0), (-1, -1), 3),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+]
+_LABEL_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('TEXTCOLOR', (0, 0), (-1, -1), C_MUTED),
+    ('TOPPADDING', (0, 0), (-1, -1), 2),
+])
+_ANALYSIS_STYLE = TableStyle([
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('TEXTCOLOR', (0, 0), (-1, -1), C_SLATE),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+])
+
+# Column widths of the executive summary metrics table
+_METRICS_COLW = (3 * inch, 2 * inch, 2 * inch)
+
+# All-URLs summary table: header row is a Table, body rows are drawn straight onto the canvas
+SUMMARY_HEADER = ('URL #', 'Visits', 'Winner', 'Score A', 'Score B')
+SUMMARY_COL_WIDTH = 1 * inch
+SUMMARY_ROW_HEIGHT = 14
+_SUMMARY_HEADER_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, -1), C_DARK),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 1, C_BORDER),
+])
+
+# Generator (with its styles) owned by each page-rendering worker process
+_worker_generator = None
+
+
+@lru_cache(maxsize=4096)
+def _image_size(path: str) -> tuple:
+    """Return (width, height) of an image, reading only the header for PNG files"""
+    with open(path, 'rb') as f:
+        header = f.read(24)
+    if header[:8] == b'\x89PNG\r\n\x1a\n':
+        return struct.unpack('>II', header[16:24])
+    with PILImage.open(path) as img:
+        return img.size
+
+
+def thumbnail_path(screenshot: Path, mtime_ns: int = None) -> Path:
+    """Location of the resized copy of a screenshot, keyed by file name and mtime
+    
+    mtime_ns saves a stat when the caller already has it from a directory scan
+    """
+    if mtime_ns is None:
+        mtime_ns = screenshot.stat().st_mtime_ns
+    return screenshot.parent / "_thumb" / f"{screenshot.stem}_{mtime_ns}.png"
+
+
+def make_thumbnail(screenshot: Path, mtime_ns: int = None) -> Path:
+    """Create the resized copy of a screenshot unless it is already cached
+    
+    Copies made from earlier versions of the screenshot are removed
+    """
+    thumb = thumbnail_path(screenshot, mtime_ns)
+    if not thumb.exists():
+        thumb.parent.mkdir(exist_ok=True)
+        with PILImage.open(screenshot) as img:
+            img.thumbnail((THUMB_SIZE_PX, THUMB_SIZE_PX), PILImage.Resampling.LANCZOS)
+            img.save(thumb, optimize=True, compress_level=6)
+        prefix = f"{screenshot.stem}_"
+        for stale in thumb.parent.glob(f"{prefix}*.png"):
+            if stale != thumb and stale.stem[len(prefix):].isdigit():
+                stale.unlink(missing_ok=True)
+    return thumb
+
+
+def landscape_doc(target):
+    """Landscape A4 document used for every part of the report"""
+    return SimpleDocTemplate(
+        target,
+        pagesize=landscape(A4),
+        rightMargin=36,
+        leftMargin=36,
+        topMargin=36,
+        bottomMargin=36,
+        pageCompression=1
+    )
+
+
+def render_story(story):
+    """Build a story into an in-memory PDF and return its bytes"""
+    buffer = io.BytesIO()
+    landscape_doc(buffer).build(story)
+    return buffer.getvalue()
+
+
+def render_summary_table(title, rows):
+    """Render the all-URLs summary table and return its PDF bytes, skipping Table layout for the body rows"""
+    buffer = io.BytesIO()
+    page_w, page_h = landscape(A4)
+    c = canvas.Canvas(buffer, pagesize=(page_w, page_h), pageCompression=1)
+    
+    ncols = len(SUMMARY_HEADER)
+    table_w = ncols * SUMMARY_COL_WIDTH
+    x0 = (page_w - table_w) / 2
+    xs = [x0 + i * SUMMARY_COL_WIDTH for i in range(ncols + 1)]
+    centres = [x + SUMMARY_COL_WIDTH / 2 for x in xs[:-1]]
+    top, bottom = page_h - 36, 36
+    
+    header = Table([SUMMARY_HEADER], colWidths=[SUMMARY_COL_WIDTH] * ncols)
+    header.setStyle(_SUMMARY_HEADER_STYLE)
+    
+    def start_page(y):
+        _, h = header.wrapOn(c, table_w, y - bottom)
+        header.drawOn(c, x0, y - h)
+        return y - h
+    
+    def finish_page(ys):
+        # Grid over the body rows drawn on this page
+        if len(ys) > 1:
+            c.setStrokeColor(C_BORDER)
+            c.setLineWidth(1)
+            c.grid(xs, ys)
+    
+    _, h = title.wrapOn(c, page_w - 72, top - bottom)
+    title.drawOn(c, 36, top - h)
+    y = start_page(top - h - title.getSpaceAfter() - 12)
+    ys = [y]
+    
+    for i, row in enumerate(rows):
+        if y - SUMMARY_ROW_HEIGHT < bottom:
+            finish_page(ys)
+            c.showPage()
+            y = start_page(top)
+            ys = [y]
+        y -= SUMMARY_ROW_HEIGHT
+        if i % 2 == 0:
+            c.setFillColor(C_LIGHT)
+            c.rect(x0, y, table_w, SUMMARY_ROW_HEIGHT, stroke=0, fill=1)
+        c.setFillColor(colors.black)
+        c.setFont('Helvetica', 8)
+        for cx, value in zip(centres, row):
+            c.drawCentredString(cx, y + 4, str(value))
+        ys.append(y)
+    
+    finish_page(ys)
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def _init_page_worker():
+    """Create the generator and styles once per worker process"""
+    global _worker_generator
+    _worker_generator = ABTestReportGenerator()
+
+
+def build_detail_pages(results, available=None):
+    """Render a chunk of detailed URL comparisons as a standalone PDF"""
+    story = []
+    for result in results:
+        page = []
+        _worker_generator.create_detailed_comparison(page, result, available)
+        # Page breaks are placed between the chunk's pages here instead
+        if page and isinstance(page[0], PageBreak):
+            page.pop(0)
+        if story:
+            story.append(PageBreak())
+        story.extend(page)
+    return render_story(story)
+
 
 class ABTestReportGenerator:
     """Generate PDF reports for A/B test ranking analysis"""
     
     def __init__(self, results_file=None):
         self.results = []
+        self.summary_rows = []
         self.statistics = {}
         
         # Load results if file provided
@@ -51,7 +287,7 @@ class ABTestReportGenerator:
             name='CustomTitle',
             parent=self.styles['Heading1'],
             fontSize=28,
-            textColor=colors.HexColor('#2C3E50'),
+            textColor=C_NAVY,
             alignment=TA_CENTER,
             spaceAfter=30
         ))
@@ -61,13 +297,13 @@ class ABTestReportGenerator:
             name='SectionHeader',
             parent=self.styles['Heading2'],
             fontSize=18,
-            textColor=colors.HexColor('#34495E'),
+            textColor=C_DARK,
             spaceBefore=20,
             spaceAfter=12,
             borderPadding=5,
             borderWidth=2,
-            borderColor=colors.HexColor('#3498DB'),
-            backColor=colors.HexColor('#ECF0F1')
+            borderColor=C_BLUE,
+            backColor=C_LIGHT
         ))
         
         # Result header style
@@ -75,7 +311,7 @@ class ABTestReportGenerator:
             name='ResultHeader',
             parent=self.styles['Heading3'],
             fontSize=14,
-            textColor=colors.HexColor('#2C3E50'),
+            textColor=C_NAVY,
             spaceBefore=15,
             spaceAfter=8,
             bold=True
@@ -86,6 +322,7 @@ class ABTestReportGenerator:
             name='AnalysisText',
             parent=self.styles['Normal'],
             fontSize=11,
+            leading=18,
             alignment=TA_LEFT,
             spaceBefore=6,
             spaceAfter=6
@@ -96,7 +333,7 @@ class ABTestReportGenerator:
             name='WinnerTextA',
             parent=self.styles['Normal'],
             fontSize=14,
-            textColor=colors.HexColor('#27AE60'),
+            textColor=C_GREEN,
             alignment=TA_CENTER,
             bold=True
         ))
@@ -106,7 +343,7 @@ class ABTestReportGenerator:
             name='WinnerTextB',
             parent=self.styles['Normal'],
             fontSize=14,
-            textColor=colors.HexColor('#E74C3C'),
+            textColor=C_RED,
             alignment=TA_CENTER,
             bold=True
         ))
@@ -116,7 +353,7 @@ class ABTestReportGenerator:
             name='WinnerTextTie',
             parent=self.styles['Normal'],
             fontSize=14,
-            textColor=colors.HexColor('#F39C12'),
+            textColor=C_AMBER,
             alignment=TA_CENTER,
             bold=True
         ))
@@ -126,87 +363,139 @@ class ABTestReportGenerator:
             name='ConfidenceText',
             parent=self.styles['Normal'],
             fontSize=11,
-            textColor=colors.HexColor('#7F8C8D'),
+            textColor=C_MUTED,
             alignment=TA_LEFT
         ))
     
     def load_results(self, results_file):
         """Load analysis results from JSON file"""
         try:
-            with open(results_file, 'r', encoding='utf-8') as f:
-                self.results = json.load(f)
+            if os.path.getsize(results_file) > STREAM_THRESHOLD_BYTES:
+                self.results = list(json_io.iter_items(results_file))
+            else:
+                self.results = json_io.load_json(results_file)
             logger.info(f"Loaded {len(self.results)} results")
             
+            # Rows for the all-URLs summary table: (url #, visits, winner, score A, score B)
+            self.summary_rows = [
+                (r['url_index'], r.get('visits', 0), r['analysis'].get('winner', '?'),
+                 r['variant_a'].get('score', 0), r['variant_b'].get('score', 0))
+                for r in self.results
+            ]
+            
             # Load statistics if available
             stats_file = Path(results_file).parent / "statistics.json"
             if stats_file.exists():
-                with open(stats_file, 'r') as f:
-                    self.statistics = json.load(f)
+                self.statistics = json_io.load_json(stats_file)
                 logger.info("Loaded statistics")
+            self._recompute_stats_if_missing()
         except Exception as e:
             logger.error(f"Failed to load results: {e}")
             raise
     
+    def _recompute_stats_if_missing(self):
+        """Derive summary statistics from the loaded results when statistics.json is absent"""
+        if self.statistics or not self.results:
+            return
+        
+        n = len(self.results)
+        scores_a = np.fromiter((r['variant_a']['score'] for r in self.results), dtype=np.float64, count=n)
+        scores_b = np.fromiter((r['variant_b']['score'] for r in self.results), dtype=np.float64, count=n)
+        visits = np.fromiter((r.get('visits', 1) for r in self.results), dtype=np.float64, count=n)
+        # Identity-shortcut Ties were never judged by GPT and are left out of the score and confidence averages
+        scored = np.fromiter((not r['analysis'].get('shortcut', False) for r in self.results),
+                             dtype=bool, count=n)
+        confidence = np.fromiter((r['analysis'].get('confidence', 0.5) for r in self.results),
+                                 dtype=np.float64, count=n)
+        winners = [r['analysis'].get('winner') for r in self.results]
+        wins_a, wins_b, ties = winners.count('A'), winners.count('B'), winners.count('Tie')
+        
+        scores_a, scores_b, visits, confidence = scores_a[scored], scores_b[scored], visits[scored], confidence[scored]
+        has_scores = scores_a.size > 0
+        
+        # Fall back to unweighted means if no URL carries any traffic
+        weights = visits if visits.sum() > 0 else None
+        
+        self.statistics = {
+            "total_urls": n,
+            "variant_a_wins": wins_a,
+            "variant_b_wins": wins_b,
+            "ties": ties,
+            "unknown": n - wins_a - wins_b - ties,
+            "average_score_a": round(float(scores_a.mean()), 2) if has_scores else 0,
+            "average_score_b": round(float(scores_b.mean()), 2) if has_scores else 0,
+            "average_confidence": round(float(confidence.mean()), 2) if has_scores else 0,
+            "weighted_score_a": round(float(np.average(scores_a, weights=weights)), 2) if has_scores else 0,
+            "weighted_score_b": round(float(np.average(scores_b, weights=weights)), 2) if has_scores else 0,
+            "overall_winner": "A (opt_seg=5)" if wins_a > wins_b else "B (opt_seg=6)" if wins_b > wins_a else "Tie",
+            "win_percentage_a": round(wins_a / n * 100, 1),
+            "win_percentage_b": round(wins_b / n * 100, 1),
+            "tie_percentage": round(ties / n * 100, 1)
+        }
+        logger.info("Computed statistics from results")
+    
     def create_summary_section(self, story):
         """Create executive summary section"""
         
         story.append(Paragraph("Executive Summary - Product Ranking Algorithm Comparison", self.styles['CustomTitle']))
         story.append(Spacer(1, 20))
         
+        s = self.statistics
+        avg_a, avg_b = s.get('average_score_a', 0), s.get('average_score_b', 0)
+        w_a, w_b = s.get('weighted_score_a', 0), s.get('weighted_score_b', 0)
+        total_urls = s.get('total_urls', 0)
+        wins_a, wins_b = s.get('variant_a_wins', 0), s.get('variant_b_wins', 0)
+        pct_a, pct_b = s.get('win_percentage_a', 0), s.get('win_percentage_b', 0)
+        
         # Overall winner announcement with visual emphasis
-        overall_winner = self.statistics.get('overall_winner', 'Unknown')
-        confidence_avg = self.statistics.get('average_confidence', 0.5)
+        overall_winner = s.get('overall_winner', 'Unknown')
+        confidence_avg = s.get('average_confidence', 0.5)
         
         if 'A' in overall_winner:
-            winner_color = colors.HexColor('#27AE60')
-            winner_icon = "🏆"
+            winner_color, winner_icon = C_GREEN, "🏆"
         elif 'B' in overall_winner:
-            winner_color = colors.HexColor('#E74C3C')
-            winner_icon = "🏆"
+            winner_color, winner_icon = C_RED, "🏆"
         else:
-            winner_color = colors.HexColor('#F39C12')
-            winner_icon = "🤝"
-        
-        winner_text = f"""
-        <para align="center">
-        <font size="20" color="#{winner_color.hexval()[2:]}"><b>{winner_icon} Overall Winner: {overall_winner}</b></font>
-        </para>
-        """
-        story.append(Paragraph(winner_text, self.styles['Normal']))
-        
-        # Average confidence indicator
-        confidence_text = f"""
-        <para align="center">
-        <font size="12" color="#7F8C8D">Average Confidence: <b>{int(confidence_avg * 100)}%</b></font>
-        </para>
-        """
-        story.append(Paragraph(confidence_text, self.styles['Normal']))
+            winner_color, winner_icon = C_AMBER, "🤝"
+        
+        # Winner line with the average confidence indicator below it
+        headline_table = Table([
+            [f"{winner_icon} Overall Winner: {overall_winner}"],
+            [f"Average Confidence: {int(confidence_avg * 100)}%"]
+        ])
+        headline_table.setStyle(TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (0, 0), 20),
+            ('LEADING', (0, 0), (0, 0), 24),
+            ('TEXTCOLOR', (0, 0), (0, 0), winner_color),
+            ('FONTSIZE', (0, 1), (0, 1), 12),
+            ('TEXTCOLOR', (0, 1), (0, 1), C_MUTED),
+        ]))
+        story.append(headline_table)
         story.append(Spacer(1, 20))
         
         # Key metrics table
-        metrics_data = [
-            ['Metric', 'Variant A (opt_seg=5)', 'Variant B (opt_seg=6)'],
-            ['URLs Won', f"{self.statistics.get('variant_a_wins', 0)} ({self.statistics.get('win_percentage_a', 0)}%)",
-             f"{self.statistics.get('variant_b_wins', 0)} ({self.statistics.get('win_percentage_b', 0)}%)"],
-            ['Average Relevance Score', f"{self.statistics.get('average_score_a', 0)}/10",
-             f"{self.statistics.get('average_score_b', 0)}/10"],
-            ['Traffic-Weighted Score', f"{self.statistics.get('weighted_score_a', 0)}/10",
-             f"{self.statistics.get('weighted_score_b', 0)}/10"],
-            ['Total URLs Analyzed', str(self.statistics.get('total_urls', 0)), '']
-        ]
+        metrics_data = (
+            ('Metric', 'Variant A (opt_seg=5)', 'Variant B (opt_seg=6)'),
+            ('URLs Won', f"{wins_a} ({pct_a}%)", f"{wins_b} ({pct_b}%)"),
+            ('Average Relevance Score', f"{avg_a}/10", f"{avg_b}/10"),
+            ('Traffic-Weighted Score', f"{w_a}/10", f"{w_b}/10"),
+            ('Total URLs Analyzed', str(total_urls), ''),
+        )
         
-        metrics_table = Table(metrics_data, colWidths=[3*inch, 2*inch, 2*inch])
+        metrics_table = Table(metrics_data, colWidths=_METRICS_COLW)
         metrics_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495E')),
+            ('BACKGROUND', (0, 0), (-1, 0), C_DARK),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
             ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
             ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
             ('FONTSIZE', (0, 0), (-1, 0), 12),
             ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#ECF0F1')),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#95A5A6')),
+            ('BACKGROUND', (0, 1), (-1, -1), C_LIGHT),
+            ('GRID', (0, 0), (-1, -1), 1, C_BORDER),
             ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#ECF0F1'), colors.white])
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [C_LIGHT, colors.white])
         ]))
         
         story.append(metrics_table)
@@ -217,24 +506,27 @@ class ABTestReportGenerator:
         
         insights = []
         
-        if self.statistics.get('average_score_a', 0) > self.statistics.get('average_score_b', 0):
+        if avg_a > avg_b:
             insights.append("• Algorithm A (opt_seg=5) consistently produces more relevant product rankings")
         else:
             insights.append("• Algorithm B (opt_seg=6) consistently produces more relevant product rankings")
         
-        if abs(self.statistics.get('weighted_score_a', 0) - self.statistics.get('weighted_score_b', 0)) > 0.5:
+        if abs(w_a - w_b) > 0.5:
             insights.append("• The difference is particularly pronounced on high-traffic pages")
         
-        insights.append(f"• Analysis based on {self.statistics.get('total_urls', 0)} product listing pages")
+        insights.append(f"• Analysis based on {total_urls} product listing pages")
         insights.append("• Rankings evaluated for relevance to user search intent (H1 titles)")
         
-        for insight in insights:
-            story.append(Paragraph(insight, self.styles['AnalysisText']))
+        story.append(Paragraph('<br/>'.join(insights), self.styles['AnalysisText']))
         
         story.append(PageBreak())
     
-    def create_detailed_comparison(self, story, result):
-        """Create detailed comparison for a single URL - one per page"""
+    def create_detailed_comparison(self, story, result, available=None):
+        """Create detailed comparison for a single URL - one per page
+        
+        available: optional mapping of the file names in the screenshots directory to their
+        mtime_ns, checked instead of stat-ing each screenshot
+        """
         
         # Start fresh page for each URL
         if result['url_index'] > 1:
@@ -243,8 +535,10 @@ class ABTestReportGenerator:
         # Clean header section
         winner = result['analysis'].get('winner', 'Unknown')
         confidence = result['analysis'].get('confidence', 0.5)
-        winner_score_a = result['variant_a'].get('score', 0)
-        winner_score_b = result['variant_b'].get('score', 0)
+        winner_score_a = f"{result['variant_a'].get('score', 0)}/10"
+        winner_score_b = f"{result['variant_b'].get('score', 0)}/10"
+        if result['analysis'].get('shortcut'):
+            winner_score_a = winner_score_b = "N/A (identical ranking)"
         h1_title = result['variant_a'].get('h1_title', 'Unknown')
         
         # Top section with URL info
@@ -253,45 +547,13 @@ class ABTestReportGenerator:
         ]
         
         header_table = Table(header_table_data, colWidths=[2*inch, 2*inch, 6*inch])
-        header_table.setStyle(TableStyle([
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('TEXTCOLOR', (1, 0), (1, 0), colors.HexColor('#7F8C8D')),
-            ('FONTNAME', (2, 0), (2, 0), 'Helvetica-Oblique'),
-        ]))
+        header_table.setStyle(_HEADER_STYLE)
         story.append(header_table)
         story.append(Spacer(1, 20))
         
         # Winner announcement - clean and prominent
-        if winner == 'A':
-            winner_color = '#27AE60'
-            winner_text = f"✓ Winner: Variant A (opt_seg=5)"
-            border_color_a = colors.HexColor('#27AE60')
-            border_color_b = colors.HexColor('#E0E0E0')
-            border_width_a = 3
-            border_width_b = 1
-        elif winner == 'B':
-            winner_color = '#E74C3C'
-            winner_text = f"✓ Winner: Variant B (opt_seg=6)"
-            border_color_a = colors.HexColor('#E0E0E0')
-            border_color_b = colors.HexColor('#E74C3C')
-            border_width_a = 1
-            border_width_b = 3
-        elif winner == 'Tie':
-            winner_color = '#F39C12'
-            winner_text = f"= Tie: Both variants perform equally"
-            border_color_a = colors.HexColor('#F39C12')
-            border_color_b = colors.HexColor('#F39C12')
-            border_width_a = 2
-            border_width_b = 2
-        else:
-            winner_color = '#7F8C8D'
-            winner_text = "Analysis pending"
-            border_color_a = colors.HexColor('#E0E0E0')
-            border_color_b = colors.HexColor('#E0E0E0')
-            border_width_a = 1
-            border_width_b = 1
+        (winner_color, winner_text, border_color_a, border_color_b,
+         border_width_a, border_width_b) = _WINNER_DISPATCH.get(winner, _WINNER_DEFAULT)
         
         # Winner summary if available
         winner_summary = result['analysis'].get('winner_summary', '')
@@ -301,17 +563,13 @@ class ABTestReportGenerator:
         # Create winner section with scores
         confidence_percent = int(confidence * 100)
         winner_data = [
-            [Paragraph(f"<font size='16' color='{winner_color}'><b>{winner_text}</b></font>", self.styles['Normal'])],
-            [Paragraph(f"<font size='11'>Confidence: <b>{confidence_percent}%</b> | Score A: <b>{winner_score_a}/10</b> | Score B: <b>{winner_score_b}/10</b></font>", self.styles['Normal'])]
+            [winner_text],
+            [f"Confidence: {confidence_percent}% | Score A: {winner_score_a} | Score B: {winner_score_b}"]
         ]
         
         winner_table = Table(winner_data, colWidths=[10*inch])
-        winner_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
+        winner_table.setStyle(_WINNER_TABLE_STYLE)
+        winner_table.setStyle(TableStyle([('TEXTCOLOR', (0, 0), (0, 0), winner_color)]))
         story.append(winner_table)
         story.append(Spacer(1, 15))
         
@@ -319,14 +577,25 @@ class ABTestReportGenerator:
         screenshot_a = config.SCREENSHOTS_DIR / result['variant_a']['screenshot']
         screenshot_b = config.SCREENSHOTS_DIR / result['variant_b']['screenshot']
         
-        if screenshot_a.exists() and screenshot_b.exists():
+        if available is not None:
+            screenshots_found = screenshot_a.name in available and screenshot_b.name in available
+        else:
+            screenshots_found = screenshot_a.exists() and screenshot_b.exists()
+        
+        if screenshots_found:
             try:
-                # Use PIL to get original dimensions for aspect ratio
-                from PIL import Image as PILImage
-                pil_img_a = PILImage.open(str(screenshot_a))
-                orig_width_a, orig_height_a = pil_img_a.size
+                # Embed the resized copies when they have been prepared
+                if available is not None:
+                    thumb_a = thumbnail_path(screenshot_a, available[screenshot_a.name])
+                    thumb_b = thumbnail_path(screenshot_b, available[screenshot_b.name])
+                else:
+                    thumb_a, thumb_b = thumbnail_path(screenshot_a), thumbnail_path(screenshot_b)
+                if thumb_a.exists() and thumb_b.exists():
+                    screenshot_a, screenshot_b = thumb_a, thumb_b
+                
+                # Original dimensions for aspect ratio
+                orig_width_a, orig_height_a = _image_size(str(screenshot_a))
                 aspect_ratio_a = orig_width_a / orig_height_a
-                pil_img_a.close()
                 
                 # Calculate dimensions maintaining aspect ratio
                 # Maximum width for each image (side by side)
@@ -359,44 +628,17 @@ class ABTestReportGenerator:
                 screenshot_table = Table(screenshot_data, colWidths=[col_width, col_width])
                 
                 # Apply border styling based on winner
-                table_style = [
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                    ('LEFTPADDING', (0, 0), (-1, -1), 3),
-                    ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-                    ('TOPPADDING', (0, 0), (-1, -1), 3),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+                table_style = _SCREENSHOT_BASE_STYLE + [
+                    ('BOX', (0, 0), (0, 0), border_width_a, border_color_a),
+                    ('BOX', (1, 0), (1, 0), border_width_b, border_color_b),
                 ]
-                
-                # Add colored borders for winner
-                if winner == 'A':
-                    table_style.extend([
-                        ('BOX', (0, 0), (0, 0), border_width_a, border_color_a),
-                        ('BOX', (1, 0), (1, 0), border_width_b, border_color_b),
-                    ])
-                elif winner == 'B':
-                    table_style.extend([
-                        ('BOX', (0, 0), (0, 0), border_width_a, border_color_a),
-                        ('BOX', (1, 0), (1, 0), border_width_b, border_color_b),
-                    ])
-                else:  # Tie or unknown
-                    table_style.extend([
-                        ('BOX', (0, 0), (0, 0), border_width_a, border_color_a),
-                        ('BOX', (1, 0), (1, 0), border_width_b, border_color_b),
-                    ])
-                
                 screenshot_table.setStyle(TableStyle(table_style))
                 story.append(screenshot_table)
                 
                 # Add labels below screenshots
                 label_data = [[header_a, header_b]]
                 label_table = Table(label_data, colWidths=[col_width, col_width])
-                label_table.setStyle(TableStyle([
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 10),
-                    ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#7F8C8D')),
-                    ('TOPPADDING', (0, 0), (-1, -1), 2),
-                ]))
+                label_table.setStyle(_LABEL_STYLE)
                 story.append(label_table)
                 
             except Exception as e:
@@ -407,13 +649,25 @@ class ABTestReportGenerator:
         reasoning = result['analysis'].get('reasoning', '')
         if reasoning:
             analysis_table = Table([[reasoning]], colWidths=[10*inch])
-            analysis_table.setStyle(TableStyle([
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#5A6C7D')),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ]))
+            analysis_table.setStyle(_ANALYSIS_STYLE)
             story.append(analysis_table)
     
+    def prepare_thumbnails(self, results, available):
+        """Resize the screenshots of the given results in parallel (libpng releases the GIL)"""
+        screenshots = set()
+        for result in results:
+            for variant in ('variant_a', 'variant_b'):
+                screenshot = config.SCREENSHOTS_DIR / result[variant]['screenshot']
+                if screenshot.name in available:
+                    screenshots.add(screenshot)
+        
+        with ThreadPoolExecutor() as executor:
+            futures = {executor.submit(make_thumbnail, screenshot, available[screenshot.name]): screenshot
+                       for screenshot in screenshots}
+        for future, screenshot in futures.items():
+            if future.exception():
+                logger.warning(f"Could not resize screenshot {screenshot}: {future.exception()}")
+    
     def generate_report(self, output_file=None):
         """Generate the complete PDF report"""
         
@@ -426,17 +680,7 @@ class ABTestReportGenerator:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             output_file = config.BASE_DIR / f"{config.REPORT_FILENAME}_{timestamp}.pdf"
         
-        # Create document in landscape orientation
-        doc = SimpleDocTemplate(
-            str(output_file),
-            pagesize=landscape(A4),
-            rightMargin=36,
-            leftMargin=36,
-            topMargin=36,
-            bottomMargin=36
-        )
-        
-        # Build story
+        # Title page, executive summary and detailed section header
         story = []
         
         # Add title page
@@ -454,49 +698,43 @@ class ABTestReportGenerator:
         story.append(Paragraph("Detailed URL Analysis", self.styles['SectionHeader']))
         story.append(Spacer(1, 20))
         
-        # Sort results by visits (highest first) if available
-        sorted_results = sorted(self.results, key=lambda x: x.get('visits', 0), reverse=True)
-        
-        # Add detailed comparisons - one per page
-        max_detailed = min(20, len(sorted_results))  # Show top 20 most visited URLs in detail
-        
-        for i, result in enumerate(sorted_results[:max_detailed]):
-            # Each URL gets its own page
-            self.create_detailed_comparison(story, result)
-        
-        # Add summary table for all URLs
-        if len(sorted_results) > max_detailed:
-            story.append(PageBreak())
-            story.append(Paragraph("Summary Table - All URLs", self.styles['SectionHeader']))
-            story.append(Spacer(1, 12))
-            
-            summary_data = [['URL #', 'Visits', 'Winner', 'Score A', 'Score B']]
-            
-            for result in sorted_results:
-                summary_data.append([
-                    str(result['url_index']),
-                    str(result.get('visits', 0)),
-                    result['analysis'].get('winner', '?'),
-                    str(result['variant_a'].get('score', 0)),
-                    str(result['variant_b'].get('score', 0))
-                ])
-            
-            summary_table = Table(summary_data, colWidths=[1*inch, 1*inch, 1*inch, 1*inch, 1*inch])
-            summary_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495E')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 8),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#95A5A6')),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#ECF0F1'), colors.white])
-            ]))
+        # Most visited URLs get a detailed comparison page each
+        n = len(self.results)
+        max_detailed = min(20, n)  # Show top 20 most visited URLs in detail
+        summary_title = None
+        if n <= max_detailed:
+            # Every URL gets a detailed page, so no summary table is needed
+            detailed = sorted(self.results, key=lambda x: x.get('visits', 0), reverse=True)
+        else:
+            detailed = heapq.nlargest(max_detailed, self.results, key=lambda x: x.get('visits', 0))
             
-            story.append(summary_table)
+            # Add summary table for all URLs, sorted by visits (highest first)
+            summary_title = Paragraph("Summary Table - All URLs", self.styles['SectionHeader'])
+            self.summary_rows.sort(key=itemgetter(1), reverse=True)
         
-        # Build PDF
+        # Build PDF: detailed pages are rendered in parallel and merged between
+        # the opening section and the summary table
         try:
-            doc.build(story)
+            parts = [render_story(story)]
+            # One directory read instead of a stat per screenshot: file name -> mtime_ns
+            available = {}
+            if config.SCREENSHOTS_DIR.is_dir():
+                with os.scandir(config.SCREENSHOTS_DIR) as entries:
+                    available = {entry.name: entry.stat().st_mtime_ns for entry in entries if entry.is_file()}
+            self.prepare_thumbnails(detailed, available)
+            # Spread the pages over the workers, never laying out more than DETAIL_CHUNK_SIZE at once
+            chunk_size = min(DETAIL_CHUNK_SIZE, max(1, math.ceil(len(detailed) / (os.cpu_count() or 1))))
+            chunks = [detailed[i:i + chunk_size] for i in range(0, len(detailed), chunk_size)]
+            with ProcessPoolExecutor(initializer=_init_page_worker) as executor:
+                parts.extend(executor.map(partial(build_detail_pages, available=available), chunks))
+            if summary_title is not None:
+                parts.append(render_summary_table(summary_title, self.summary_rows))
+            
+            writer = PdfWriter()
+            for part in parts:
+                writer.append(io.BytesIO(part))
+            with open(output_file, 'wb', buffering=1 << 20) as f:
+                writer.write(f)
             logger.info(f"Report generated: {output_file}")
             return str(output_file)
         except Exception as e:
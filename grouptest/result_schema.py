@@ -0,0 +1,38 @@
+"""
+Typed view of the A/B test result records used by the statistics scripts
+Only the fields the statistics read are decoded; everything else in a record is skipped
+"""
+
+from pathlib import Path
+from typing import List, Optional
+
+import msgspec
+
+
+class Analysis(msgspec.Struct):
+    """GPT verdict of a result"""
+    winner: Optional[str] = None
+    confidence: float = 0.5
+    shortcut: bool = False
+
+
+class Variant(msgspec.Struct):
+    """Ranking quality of one variant"""
+    score: float = 0
+    duplicates: int = -1
+
+
+class Result(msgspec.Struct):
+    """One analysed URL"""
+    url_index: int
+    variant_a: Variant
+    variant_b: Variant
+    analysis: Analysis
+
+
+_RESULTS_DECODER = msgspec.json.Decoder(List[Result])
+
+
+def load_results(path) -> List[Result]:
+    """Decode a results JSON array into Result structs"""
+    return _RESULTS_DECODER.decode(Path(path).read_bytes())
@@ -0,0 +1,50 @@
+"""
+SQLite store for A/B test results, one row per URL index
+Writers replace a URL's row in place, so reruns deduplicate themselves and readers get results in URL order
+"""
+
+import sqlite3
+from pathlib import Path
+
+import json_io
+
+RESULTS_DB_NAME = "results.db"
+
+
+class ResultStore:
+    """Results keyed by url_index, stored as serialized JSON payloads"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        # Autocommit; every put is its own transaction
+        self.conn = sqlite3.connect(str(self.path), isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS results (url_index INTEGER PRIMARY KEY, payload BLOB NOT NULL)")
+
+    def put(self, url_index, payload: bytes):
+        """Store the serialized result of a URL, replacing any earlier one"""
+        self.conn.execute("INSERT OR REPLACE INTO results (url_index, payload) VALUES (?, ?)",
+                          (url_index, payload))
+
+    def put_result(self, result):
+        """Serialize and store a result record"""
+        self.put(result['url_index'], json_io.dumps(result))
+
+    def indices(self):
+        """Set of URL indices that have a result"""
+        return {row[0] for row in self.conn.execute("SELECT url_index FROM results")}
+
+    def results(self):
+        """Yield the stored results in URL order"""
+        for (payload,) in self.conn.execute("SELECT payload FROM results ORDER BY url_index"):
+            yield json_io.loads(payload)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -6,10 +6,11 @@ import sys
 import logging
 from pathlib import Path
 from datetime import datetime
-import json
 
-# Add parent directory to path
-sys.path.append(str(Path(__file__).parent.parent))
+# Add parent directory to path (once; appended so grouptest's own config stays first)
+_ROOT = str(Path(__file__).resolve().parent.parent)
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
 
 from ab_test_analyzer import ABTestAnalyzer
 from report_generator import ABTestReportGenerator
@@ -75,12 +76,9 @@ def run_complete_analysis(limit=None, skip_analysis=False, start_from=None):
         logger.info("=" * 60)
         logger.info(f"Report generated: {report_path}")
         
-        # Load and display summary statistics
-        stats_file = config.RESULTS_DIR / "statistics.json"
-        if stats_file.exists():
-            with open(stats_file, 'r') as f:
-                stats = json.load(f)
-            
+        # Display summary statistics (already loaded by the generator from statistics.json)
+        stats = generator.statistics
+        if stats:
             logger.info("")
             logger.info("SUMMARY STATISTICS:")
             logger.info("-" * 40)
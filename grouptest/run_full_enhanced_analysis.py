@@ -7,71 +7,123 @@ Processes all 200 URLs with duplicate detection using GPT-5-mini
 import sys
 import logging
 import time
-import json
 from pathlib import Path
 from datetime import datetime
 
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from ab_test_analyzer_enhanced import EnhancedABTestAnalyzer
 from report_generator import ABTestReportGenerator
 import config
+import json_io
+from result_schema import load_results
 
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler(config.LOGS_DIR / f"full_enhanced_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"),
+        logging.StreamHandler()
+    ]
 )
 logger = logging.getLogger(__name__)
 
 
-def get_processed_count():
-    """Get the number of already processed URLs"""
+def load_processed_results():
+    """Load the results saved by earlier runs
+    
+    Per-URL result files missing from enhanced_results.json, left by a run stopped between
+    intermediate saves, are added in URL order
+    """
     results_file = config.RESULTS_DIR / "enhanced_results.json"
-    if results_file.exists():
-        with open(results_file, 'r') as f:
-            data = json.load(f)
-            return len(data)
-    return 0
+    results = list(json_io.iter_items(results_file)) if results_file.exists() else []
+    
+    saved = {r['url_index'] for r in results}
+    for result_file in sorted(config.RESULTS_DIR.glob("enhanced_result_*.json")):
+        try:
+            result = json_io.load_json(result_file)
+        except Exception as e:
+            logger.warning(f"Skipping unreadable {result_file.name}: {e}")
+            continue
+        if result['url_index'] not in saved:
+            results.append(result)
+    return results
+
+
+def read_checkpoint():
+    """Last URL index handled by an earlier run, or None without a checkpoint"""
+    state_file = config.RESULTS_DIR / config.CHECKPOINT_FILENAME
+    if not state_file.exists():
+        return None
+    try:
+        return json_io.load_json(state_file)['last_done']
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable checkpoint {state_file.name}: {e}")
+        return None
 
 
 def run_with_resumption(total_urls=200, batch_size=10):
-    """Run analysis with automatic resumption"""
+    """Run analysis in batches of run_analysis calls with automatic resumption
+    
+    Not used by main(), which sends everything through run_batch_analysis instead; kept for
+    runs without the Batch API. Only this path reads the state.json checkpoint.
+    """
+    from ab_test_analyzer_enhanced import EnhancedABTestAnalyzer
+    
+    # Read the results file once; each batch adds to it in memory
+    done = load_processed_results()
+    processed = len(done)
+    
+    # run_analysis removes its checkpoint once all its rows are handled, so one left behind
+    # belongs to an interrupted run; it is ignored when the results it refers to are gone
+    last_done = read_checkpoint() if done else None
+    if last_done is None:
+        last_done = max((r['url_index'] for r in done), default=0)
     
     while True:
-        processed = get_processed_count()
+        next_url = last_done + 1
         
-        if processed >= total_urls:
+        if next_url > total_urls:
             logger.info(f"All {total_urls} URLs have been processed!")
             break
             
-        remaining = total_urls - processed
+        remaining = total_urls - next_url + 1
         next_batch = min(batch_size, remaining)
-        start_from = processed + 1 if processed > 0 else None
         
         logger.info("=" * 80)
         logger.info(f"RESUMING ANALYSIS: {processed}/{total_urls} completed")
-        logger.info(f"Processing next {next_batch} URLs (starting from URL {start_from or 1})")
+        logger.info(f"Processing next {next_batch} URLs (starting from URL {next_url})")
         logger.info("=" * 80)
         
+        analyzer = None
         try:
             analyzer = EnhancedABTestAnalyzer()
+            # Keep earlier results so enhanced_results.json stays complete
+            analyzer.results = done
             
             # Run analysis for the next batch
-            results = analyzer.run_analysis(
-                limit=next_batch if start_from else next_batch,
-                start_from=start_from
-            )
+            done = analyzer.run_analysis(limit=next_batch, start_from=next_url)
             
-            logger.info(f"Batch completed successfully: {len(results)} URLs processed")
+            logger.info(f"Batch completed successfully: {len(done) - processed} URLs processed")
+            processed = len(done)
+            
+            if analyzer.last_done is None:
+                logger.info(f"No URLs left after URL {last_done}")
+                break
             
         except Exception as e:
             logger.error(f"Batch failed with error: {e}")
+            # URLs finished before the failure were appended to done
+            processed = len(done)
             logger.info("Waiting 30 seconds before retrying...")
             time.sleep(30)
             continue
         
+        finally:
+            if analyzer is not None and analyzer.last_done is not None:
+                last_done = analyzer.last_done
+        
         # Small delay between batches to avoid overwhelming the API
         if remaining > next_batch:
             logger.info("Waiting 10 seconds before next batch...")
@@ -80,6 +132,38 @@ def run_with_resumption(total_urls=200, batch_size=10):
     return True
 
 
+def run_batch_analysis(total_urls=200):
+    """Run every remaining URL through a single OpenAI Batch API sweep"""
+    
+    # URLs are skipped by url_index, so per-URL result files, failed URLs and blank Excel rows
+    # never cause a finished URL to be submitted again
+    done = load_processed_results()
+    done_indices = {r['url_index'] for r in done}
+    remaining = total_urls - len(done_indices)
+    if remaining <= 0:
+        logger.info(f"All {total_urls} URLs have been processed!")
+        return True
+    
+    # Selenium and friends are only loaded once there is work left
+    from ab_test_analyzer_enhanced import EnhancedABTestAnalyzer
+    
+    logger.info(f"Submitting {remaining} URLs to the Batch API ({len(done_indices)} already completed)")
+    
+    try:
+        analyzer = EnhancedABTestAnalyzer()
+        
+        # Keep earlier results so enhanced_results.json stays complete
+        analyzer.results = done
+        
+        results = analyzer.run_analysis_batch(limit=remaining, skip=done_indices)
+        logger.info(f"Batch analysis completed: {len(results)} URLs in results")
+    except Exception as e:
+        logger.error(f"Batch analysis failed with error: {e}")
+        return False
+    
+    return True
+
+
 def generate_enhanced_report():
     """Generate the enhanced PDF report with duplicate analysis"""
     
@@ -96,10 +180,6 @@ def generate_enhanced_report():
         return False
     
     try:
-        # Load results
-        with open(results_file, 'r') as f:
-            results = json.load(f)
-        
         # Generate report using existing report generator
         generator = ABTestReportGenerator(results_file)
         output_file = config.BASE_DIR / f"enhanced_ab_test_report_{timestamp}.pdf"
@@ -119,12 +199,8 @@ def analyze_results():
     results_file = config.RESULTS_DIR / "enhanced_results.json"
     stats_file = config.RESULTS_DIR / "enhanced_statistics.json"
     
-    with open(results_file, 'r') as f:
-        results = json.load(f)
-    
     if stats_file.exists():
-        with open(stats_file, 'r') as f:
-            stats = json.load(f)
+        stats = json_io.load_json(stats_file)
     else:
         stats = {}
     
@@ -132,11 +208,55 @@ def analyze_results():
     logger.info("COMPREHENSIVE ANALYSIS RESULTS")
     logger.info("=" * 80)
     
-    # Overall statistics
+    # Decode only the fields used below into structs, then gather the statistics in a single pass
+    results = load_results(results_file)
     total_urls = len(results)
-    wins_a = sum(1 for r in results if r['analysis']['winner'] == 'A')
-    wins_b = sum(1 for r in results if r['analysis']['winner'] == 'B')
-    ties = sum(1 for r in results if r['analysis']['winner'] == 'Tie')
+    wins_a = wins_b = ties = 0
+    urls_with_duplicates_a = urls_with_duplicates_b = 0
+    total_duplicates_a = total_duplicates_b = 0
+    total_score_a = total_score_b = scored = 0
+    duplicate_wins = high_confidence = 0
+    duplicate_win_examples = []
+    high_confidence_examples = []
+    
+    for r in results:
+        winner = r.analysis.winner
+        duplicates_a = r.variant_a.duplicates
+        duplicates_b = r.variant_b.duplicates
+        
+        if winner == 'A':
+            wins_a += 1
+        elif winner == 'B':
+            wins_b += 1
+        elif winner == 'Tie':
+            ties += 1
+        
+        if duplicates_a > 0:
+            urls_with_duplicates_a += 1
+        if duplicates_b > 0:
+            urls_with_duplicates_b += 1
+        if duplicates_a >= 0:
+            total_duplicates_a += duplicates_a
+        if duplicates_b >= 0:
+            total_duplicates_b += duplicates_b
+        
+        # URLs where A reduces duplicates
+        if duplicates_a < duplicates_b and duplicates_b > 0:
+            duplicate_wins += 1
+            if len(duplicate_win_examples) < 3:
+                duplicate_win_examples.append(r)
+        
+        # High confidence winners
+        if r.analysis.confidence >= 0.9 and winner != 'Tie':
+            high_confidence += 1
+            if len(high_confidence_examples) < 3:
+                high_confidence_examples.append(r)
+        
+        # Identity-shortcut Ties were never scored by GPT
+        if not r.analysis.shortcut:
+            scored += 1
+            total_score_a += r.variant_a.score
+            total_score_b += r.variant_b.score
     
     logger.info(f"\nOVERALL WINNER DISTRIBUTION:")
     logger.info(f"  Total URLs Analyzed: {total_urls}")
@@ -145,12 +265,6 @@ def analyze_results():
     logger.info(f"  Ties: {ties} ({ties/total_urls*100:.1f}%)")
     
     # Duplicate analysis
-    urls_with_duplicates_a = sum(1 for r in results if r['variant_a']['duplicates'] > 0)
-    urls_with_duplicates_b = sum(1 for r in results if r['variant_b']['duplicates'] > 0)
-    
-    total_duplicates_a = sum(r['variant_a']['duplicates'] for r in results if r['variant_a']['duplicates'] >= 0)
-    total_duplicates_b = sum(r['variant_b']['duplicates'] for r in results if r['variant_b']['duplicates'] >= 0)
-    
     logger.info(f"\nDUPLICATE PRODUCT ANALYSIS:")
     logger.info(f"  URLs with duplicates in A: {urls_with_duplicates_a} ({urls_with_duplicates_a/total_urls*100:.1f}%)")
     logger.info(f"  URLs with duplicates in B: {urls_with_duplicates_b} ({urls_with_duplicates_b/total_urls*100:.1f}%)")
@@ -164,26 +278,19 @@ def analyze_results():
     # Find interesting cases
     logger.info(f"\nINTERESTING CASES:")
     
-    # URLs where A reduces duplicates
-    duplicate_wins = [r for r in results 
-                     if r['variant_a']['duplicates'] < r['variant_b']['duplicates'] 
-                     and r['variant_b']['duplicates'] > 0]
-    
     if duplicate_wins:
-        logger.info(f"\n  URLs where opt_seg=5 reduces duplicates: {len(duplicate_wins)}")
-        for r in duplicate_wins[:3]:  # Show first 3 examples
-            logger.info(f"    - URL {r['url_index']}: {r['variant_a']['duplicates']} vs {r['variant_b']['duplicates']} duplicates")
+        logger.info(f"\n  URLs where opt_seg=5 reduces duplicates: {duplicate_wins}")
+        for r in duplicate_win_examples:  # Show first 3 examples
+            logger.info(f"    - URL {r.url_index}: {r.variant_a.duplicates} vs {r.variant_b.duplicates} duplicates")
     
-    # High confidence winners
-    high_confidence = [r for r in results if r['analysis']['confidence'] >= 0.9 and r['analysis']['winner'] != 'Tie']
     if high_confidence:
-        logger.info(f"\n  High confidence winners (≥90%): {len(high_confidence)}")
-        for r in high_confidence[:3]:
-            logger.info(f"    - URL {r['url_index']}: {r['analysis']['winner']} wins ({r['analysis']['confidence']*100:.0f}%)")
+        logger.info(f"\n  High confidence winners (≥90%): {high_confidence}")
+        for r in high_confidence_examples:
+            logger.info(f"    - URL {r.url_index}: {r.analysis.winner} wins ({r.analysis.confidence*100:.0f}%)")
     
     # Average scores
-    avg_score_a = sum(r['variant_a']['score'] for r in results) / len(results) if results else 0
-    avg_score_b = sum(r['variant_b']['score'] for r in results) / len(results) if results else 0
+    avg_score_a = total_score_a / scored if scored else 0
+    avg_score_b = total_score_b / scored if scored else 0
     
     logger.info(f"\nAVERAGE RANKING QUALITY SCORES:")
     logger.info(f"  Variant A: {avg_score_a:.2f}/10")
@@ -191,22 +298,22 @@ def analyze_results():
     
     logger.info("\n" + "=" * 80)
     
-    return results
+    return total_urls
 
 
 def main():
     """Main execution function"""
     
     logger.info("=" * 80)
-    logger.info("STARTING FULL ENHANCED ANALYSIS WITH AUTOMATIC RESUMPTION")
+    logger.info("STARTING FULL ENHANCED ANALYSIS")
     logger.info("=" * 80)
     logger.info(f"Target: 200 URLs")
     logger.info(f"Model: {config.OPENAI_MODEL}")
-    logger.info(f"Batch size: 10 URLs")
+    logger.info(f"Mode: OpenAI Batch API")
     logger.info("=" * 80)
     
-    # Step 1: Run analysis with resumption
-    success = run_with_resumption(total_urls=200, batch_size=10)
+    # Step 1: Capture all URLs, then run the GPT comparisons as a batch job
+    success = run_batch_analysis(total_urls=200)
     
     if not success:
         logger.error("Analysis failed to complete")
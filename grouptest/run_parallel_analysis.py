@@ -6,26 +6,34 @@ Processes 200 URLs using concurrent workers for massive speedup
 
 import os
 import sys
-import json
-import time
+import asyncio
 import logging
 import threading
+import multiprocessing.util
 from pathlib import Path
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, List, Optional, Tuple
-import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import numpy as np
 
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from ab_test_analyzer_enhanced import EnhancedABTestAnalyzer
+from llm_cache import cache_key
+from rate_limiter import estimate_tokens, limiter
+from result_store import RESULTS_DB_NAME, ResultStore
 import config
+import json_io
+from url_loader import load_url_rows
+
+# Selenium and the OpenAI SDK are imported where they are used, so a run with nothing left to do stays fast
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, RateLimitError
 
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - [Worker-%(thread)d] - %(levelname)s - %(message)s',
+    format='%(asctime)s - [Worker-%(process)d] - %(levelname)s - %(message)s',
     handlers=[
         logging.FileHandler(config.LOGS_DIR / f"parallel_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"),
         logging.StreamHandler()
@@ -33,13 +41,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Thread-safe counters
-progress_lock = threading.Lock()
+# Progress counters, only updated from the event loop
 results_lock = threading.Lock()
 completed_urls = 0
 failed_urls = []
 all_results = []
 
+# Results database every run writes to, opened on first use
+_result_store = None
+
+# Scraping worker of the current pool process, created by _proc_init; its driver lives as long as the process
+_proc_worker = None
+
 
 class ParallelWorker:
     """Worker class for parallel URL processing"""
@@ -49,107 +62,351 @@ class ParallelWorker:
         self.analyzer = None
         
     def setup(self):
-        """Setup worker with its own analyzer instance"""
-        self.analyzer = EnhancedABTestAnalyzer()
+        """Setup worker with its own analyzer instance and Chrome driver"""
+        if self.analyzer is None:
+            from ab_test_analyzer_enhanced import EnhancedABTestAnalyzer
+            self.analyzer = EnhancedABTestAnalyzer()
+        
         self.analyzer.setup_driver()
         logger.info(f"Worker {self.worker_id} initialized")
-        
-    def cleanup(self):
-        """Cleanup worker resources"""
-        if self.analyzer:
+    
+    def close(self):
+        """Quit the worker's Chrome driver"""
+        if self.analyzer is not None:
             self.analyzer.close_driver()
-            logger.info(f"Worker {self.worker_id} cleaned up")
     
-    def process_url(self, url: str, url_index: int, visits: int) -> Optional[Dict]:
-        """Process a single URL"""
+    def scrape_url(self, url: str, url_index: int) -> Optional[Tuple]:
+        """Capture both variants of a URL and prepare the GPT request body"""
+        logger.info(f"Worker {self.worker_id} scraping URL {url_index}")
+        
+        # The driver carries state between URLs; start every URL without cookies
+        self.analyzer.driver.delete_all_cookies()
+        
+        url_a = self.analyzer.modify_url_with_param(url, config.VARIANT_A_PARAM)
+        url_b = self.analyzer.modify_url_with_param(url, config.VARIANT_B_PARAM)
+        variant_a_data = self.analyzer.capture_screenshot(url_a, "variant_A", url_index)
+        variant_b_data = self.analyzer.capture_screenshot(url_b, "variant_B", url_index)
+        
+        if not variant_a_data or not variant_b_data:
+            logger.warning(f"Worker {self.worker_id} failed URL {url_index}")
+            return None
+        
+        images = self.analyzer.image_parts(variant_a_data, variant_b_data)
+        return url_a, url_b, variant_a_data, variant_b_data, images
+    
+    def cache_key_for(self, scraped: Tuple) -> Optional[str]:
+        """Response cache key of the single-URL request for a scraped URL"""
+        if self.analyzer.response_cache is None:
+            return None
+        url_a, url_b, variant_a_data, variant_b_data, images = scraped
+        payload = self.analyzer.build_gpt_payload(variant_a_data, variant_b_data, images)
+        return cache_key(payload['model'], payload['messages'])
+    
+    async def request_analysis(self, client: 'AsyncOpenAI', semaphore: asyncio.Semaphore,
+                               url_index: int, scraped: Tuple, model: Optional[str] = None) -> Optional[Dict]:
+        """Run the single-URL GPT comparison for a scraped URL, with config.OPENAI_MODEL unless model is given"""
+        url_a, url_b, variant_a_data, variant_b_data, images = scraped
+        payload = self.analyzer.build_gpt_payload(variant_a_data, variant_b_data, images, model=model)
+        cache = self.analyzer.response_cache
+        key = cache_key(payload['model'], payload['messages']) if cache is not None else None
+        cached = cache.get(key) if key else None
+        if cached is not None:
+            logger.info(f"Using cached {payload['model']} analysis for URL {url_index}")
+            return cached
+        
+        try:
+            async with semaphore:
+                response = await create_completion(client, payload)
+            analysis = json_io.loads(response.choices[0].message.content)
+            logger.info(f"GPT analysis completed for URL {url_index}: Winner={analysis.get('winner')}")
+        except Exception as e:
+            logger.error(f"GPT analysis failed for URL {url_index}: {e}")
+            return None
+        
+        if key:
+            cache.set(key, analysis)
+        return analysis
+    
+    def save_result(self, url: str, url_index: int, visits: int, scraped: Tuple,
+                    analysis: Optional[Dict]) -> Optional[Dict]:
+        """Compile the result for a URL and store it in the results database"""
+        url_a, url_b, variant_a_data, variant_b_data, images = scraped
         try:
-            logger.info(f"Worker {self.worker_id} processing URL {url_index}")
-            result = self.analyzer.process_url(url, url_index, visits)
+            result = self.analyzer.build_result(url, url_index, visits, url_a, url_b,
+                                                 variant_a_data, variant_b_data, analysis, save=False)
+            append_result(result)
             
-            if result:
-                # Save individual result file
-                result_file = config.RESULTS_DIR / f"parallel_result_{url_index:03d}.json"
-                with open(result_file, 'w', encoding='utf-8') as f:
-                    json.dump(result, f, ensure_ascii=False, indent=2)
-                
-                logger.info(f"Worker {self.worker_id} completed URL {url_index}")
-                return result
-            else:
-                logger.warning(f"Worker {self.worker_id} failed URL {url_index}")
-                return None
-                
+            logger.info(f"Completed URL {url_index}")
+            return result
         except Exception as e:
-            logger.error(f"Worker {self.worker_id} error on URL {url_index}: {e}")
+            logger.error(f"Error saving URL {url_index}: {e}")
             return None
 
 
-def process_url_batch(worker_id: int, url_batch: List[Tuple[str, int, int]]) -> List[Dict]:
-    """Process a batch of URLs with a single worker"""
-    worker = ParallelWorker(worker_id)
-    batch_results = []
+async def analyze_chunk(client: 'AsyncOpenAI', semaphore: asyncio.Semaphore, worker: ParallelWorker,
+                        chunk: List[Tuple]) -> List[Optional[Dict]]:
+    """Judge a chunk of scraped URLs with one GPT request and save their results
+    
+    chunk: (url, url_index, visits, scraped) tuples. Cached verdicts are reused, and URLs
+    the batched response does not cover fall back to single-URL requests.
+    """
+    analyzer = worker.analyzer
+    cache = analyzer.response_cache
+    verdicts = {}
+    keys = {}
+    to_ask = []
+    
+    for url, url_index, visits, scraped in chunk:
+        shortcut = analyzer.shortcut_verdict(scraped[2], scraped[3])
+        if shortcut:
+            logger.info(f"Identical product rankings for URL {url_index}, skipping GPT analysis")
+            verdicts[url_index] = shortcut
+            continue
+        key = worker.cache_key_for(scraped)
+        cached = cache.get(key) if key else None
+        if cached is not None:
+            logger.info(f"Using cached GPT analysis for URL {url_index}")
+            verdicts[url_index] = cached
+        else:
+            keys[url_index] = key
+            to_ask.append((url_index, scraped[2].get('h1_title'), scraped[4]))
     
+    if len(to_ask) > 1:
+        payload = analyzer.build_batch_payload(to_ask)
+        try:
+            async with semaphore:
+                response = await create_completion(client, payload)
+            batch_verdicts = analyzer.parse_batch_verdicts(response.choices[0].message.content,
+                                                           [case[0] for case in to_ask])
+            logger.info(f"Batched GPT analysis completed: {len(batch_verdicts)}/{len(to_ask)} verdicts")
+            for url_index, analysis in batch_verdicts.items():
+                if keys[url_index]:
+                    cache.set(keys[url_index], analysis)
+            verdicts.update(batch_verdicts)
+        except Exception as e:
+            logger.error(f"Batched GPT analysis failed: {e}")
+    
+    # Anything still without a verdict is asked on its own
+    missing = [item for item in chunk if item[1] not in verdicts]
+    analyses = await asyncio.gather(*(
+        worker.request_analysis(client, semaphore, url_index, scraped)
+        for url, url_index, visits, scraped in missing
+    ))
+    for (url, url_index, visits, scraped), analysis in zip(missing, analyses):
+        verdicts[url_index] = analysis
+    
+    # Unsure verdicts are asked again with the strong model
+    unsure = [item for item in chunk if analyzer.needs_escalation(verdicts[item[1]])]
+    escalated = await asyncio.gather(*(
+        worker.request_analysis(client, semaphore, url_index, scraped, model=config.OPENAI_MODEL_STRONG)
+        for url, url_index, visits, scraped in unsure
+    ))
+    for (url, url_index, visits, scraped), analysis in zip(unsure, escalated):
+        if analysis:
+            logger.info(f"Escalated URL {url_index} to {config.OPENAI_MODEL_STRONG}: Winner={analysis.get('winner')}")
+            verdicts[url_index] = {**analysis, "escalated": True}
+    
+    return [
+        worker.save_result(url, url_index, visits, scraped, verdicts[url_index])
+        for url, url_index, visits, scraped in chunk
+    ]
+
+
+def retry_after_seconds(error: 'RateLimitError', attempt: int) -> float:
+    """Delay requested by a rate-limit response, or exponential backoff when it gives none"""
+    headers = error.response.headers if error.response is not None else {}
     try:
-        worker.setup()
-        
-        for url, url_index, visits in url_batch:
-            result = worker.process_url(url, url_index, visits)
-            
-            if result:
-                # Update global progress
-                with progress_lock:
-                    global completed_urls
-                    completed_urls += 1
-                    batch_results.append(result)
+        if 'retry-after-ms' in headers:
+            return float(headers['retry-after-ms']) / 1000
+        if 'retry-after' in headers:
+            return float(headers['retry-after'])
+    except ValueError:
+        pass
+    return config.RETRY_DELAY * 2 ** attempt
+
+
+async def create_completion(client: 'AsyncOpenAI', payload: Dict):
+    """Send a chat completion through the shared rate limiter, backing off on 429 and transient errors"""
+    from openai import APIConnectionError, InternalServerError, RateLimitError
+    
+    tokens = estimate_tokens(payload)
+    for attempt in range(config.MAX_RETRIES + 1):
+        await limiter.acquire(tokens)
+        try:
+            return await client.chat.completions.create(**payload)
+        except RateLimitError as e:
+            if attempt == config.MAX_RETRIES:
+                raise
+            limiter.scale(0.8)
+            delay = retry_after_seconds(e, attempt)
+            logger.warning(f"OpenAI rate limit hit, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        except (APIConnectionError, InternalServerError) as e:
+            if attempt == config.MAX_RETRIES:
+                raise
+            logger.warning(f"OpenAI request failed ({e}), retrying")
+            await asyncio.sleep(config.RETRY_DELAY * 2 ** attempt)
+
+
+def append_result(result: Dict):
+    """Store a result in the results database, replacing an earlier one for the same URL"""
+    global _result_store
+    with results_lock:
+        if _result_store is None:
+            _result_store = ResultStore(config.RESULTS_DIR / RESULTS_DB_NAME)
+        _result_store.put_result(result)
+
+
+def close_result_store():
+    """Close the results database if it was opened"""
+    global _result_store
+    with results_lock:
+        if _result_store is not None:
+            _result_store.close()
+            _result_store = None
+
+
+def _proc_init():
+    """Give each scraping process its own worker and Chrome driver"""
+    global _proc_worker
+    _proc_worker = ParallelWorker(os.getpid())
+    # Pool processes skip atexit handlers but run multiprocessing finalizers on exit
+    multiprocessing.util.Finalize(None, _proc_worker.close, exitpriority=10)
+    try:
+        _proc_worker.setup()
+    except Exception as e:
+        logger.error(f"Worker {_proc_worker.worker_id} setup failed: {e}")
+
+
+def _do_scrape(url: str, url_index: int, visits: int) -> Optional[Tuple]:
+    """Scrape a URL in a pool process and return the picklable scraped data"""
+    worker = _proc_worker
+    try:
+        if worker.analyzer is None or worker.analyzer.driver is None:
+            worker.setup()
+        return worker.scrape_url(url, url_index)
+    except Exception as e:
+        logger.error(f"Worker {worker.worker_id} error on URL {url_index}: {e}")
+        return None
+
+
+async def process_urls(urls_to_process: List[Tuple[str, int, int]], num_workers: int,
+                       llm_concurrency: int, llm_batch_size: int) -> List[Dict]:
+    """Scrape in num_workers Selenium processes while GPT calls overlap on the event loop
+    
+    Scraped URLs are grouped into chunks of llm_batch_size and judged with one request per chunk.
+    The scraped queue is bounded, so scraping pauses while the GPT side is llm_concurrency chunks behind.
+    """
+    from openai import AsyncOpenAI
+    from ab_test_analyzer_enhanced import EnhancedABTestAnalyzer
+    
+    global completed_urls
+    completed_urls = 0
+    failed_urls.clear()
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(llm_concurrency)
+    # Retries are handled by create_completion so the shared limiter sees every 429
+    client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    start_time = datetime.now()
+    executor = ProcessPoolExecutor(max_workers=num_workers, initializer=_proc_init)
+    # Requests, caching and result files are handled here; only scraping runs in the pool
+    coordinator = ParallelWorker(0)
+    coordinator.analyzer = EnhancedABTestAnalyzer()
+    scraped_queue = asyncio.Queue(maxsize=num_workers * 2)
+    chunks_in_flight = asyncio.Semaphore(llm_concurrency)
+    pending_urls = iter(urls_to_process)
+    
+    def record(url_index: int, result: Optional[Dict]):
+        global completed_urls
+        if result:
+            completed_urls += 1
+        else:
+            failed_urls.append(url_index)
+        show_progress(completed_urls, len(failed_urls), len(urls_to_process), start_time)
+    
+    async def scraper():
+        # One per pool process; each takes the next URL once its previous one is queued
+        for url, url_index, visits in pending_urls:
+            scraped = await loop.run_in_executor(executor, _do_scrape, url, url_index, visits)
+            if scraped:
+                await scraped_queue.put((url, url_index, visits, scraped))
             else:
-                with progress_lock:
-                    failed_urls.append(url_index)
-                    
+                record(url_index, None)
+    
+    async def scrape_all():
+        await asyncio.gather(*(scraper() for _ in range(num_workers)))
+        await scraped_queue.put(None)
+    
+    async def analyze(chunk: List[Tuple]) -> List[Optional[Dict]]:
+        try:
+            results = await analyze_chunk(client, semaphore, coordinator, chunk)
+        finally:
+            chunks_in_flight.release()
+        for item, result in zip(chunk, results):
+            record(item[1], result)
+        return results
+    
+    async def batch_scraped() -> List[Optional[Dict]]:
+        tasks = []
+        chunk = []
+        while True:
+            item = await scraped_queue.get()
+            if item is None:
+                break
+            chunk.append(item)
+            if len(chunk) >= llm_batch_size:
+                await chunks_in_flight.acquire()
+                tasks.append(asyncio.create_task(analyze(chunk)))
+                chunk = []
+        if chunk:
+            await chunks_in_flight.acquire()
+            tasks.append(asyncio.create_task(analyze(chunk)))
+        chunk_results = await asyncio.gather(*tasks)
+        return [result for results in chunk_results for result in results]
+    
+    try:
+        _, results = await asyncio.gather(scrape_all(), batch_scraped())
     finally:
-        worker.cleanup()
+        executor.shutdown(wait=True)
+        close_result_store()
+        await client.close()
+        print()  # New line after the progress bar
     
-    return batch_results
+    return [result for result in results if result]
 
 
-def update_progress_display(total_urls: int, start_time: datetime):
-    """Display progress in real-time"""
-    while completed_urls < total_urls:
-        with progress_lock:
-            current = completed_urls
-            failed = len(failed_urls)
-        
-        if current > 0:
-            elapsed = (datetime.now() - start_time).total_seconds()
-            rate = current / elapsed
-            remaining = (total_urls - current) / rate if rate > 0 else 0
-            eta = timedelta(seconds=int(remaining))
-            
-            # Progress bar
-            progress = current / total_urls
-            bar_length = 40
-            filled = int(bar_length * progress)
-            bar = '#' * filled + '-' * (bar_length - filled)
-            
-            print(f"\r[{bar}] {current}/{total_urls} URLs ({progress*100:.1f}%) | "
-                  f"Failed: {failed} | ETA: {eta} | Rate: {rate*60:.1f} URLs/min", 
-                  end='', flush=True)
-        
-        time.sleep(1)
-    
-    print()  # New line after completion
+def show_progress(current: int, failed: int, total_urls: int, start_time: datetime):
+    """Redraw the progress bar; called each time a URL completes or fails"""
+    done = current + failed
+    elapsed = (datetime.now() - start_time).total_seconds()
+    rate = current / elapsed if elapsed > 0 else 0
+    remaining = (total_urls - done) / rate if rate > 0 else 0
+    eta = timedelta(seconds=int(remaining))
+    
+    # Progress bar
+    progress = done / total_urls
+    bar_length = 40
+    filled = int(bar_length * progress)
+    bar = '#' * filled + '-' * (bar_length - filled)
+    
+    print(f"\r[{bar}] {current}/{total_urls} URLs ({progress*100:.1f}%) | "
+          f"Failed: {failed} | ETA: {eta} | Rate: {rate*60:.1f} URLs/min", 
+          end='', flush=True)
 
 
 def load_urls_for_processing():
     """Load URLs and determine which ones need processing"""
     # Load all URLs from Excel
-    df = pd.read_excel(config.INPUT_FILE)
-    total_urls = len(df)
+    rows = load_url_rows(config.INPUT_FILE)
+    total_urls = len(rows)
     logger.info(f"Loaded {total_urls} URLs from Excel")
     
     # Check existing results
-    existing_results = set()
     results_dir = Path(config.RESULTS_DIR)
+    with ResultStore(results_dir / RESULTS_DB_NAME) as store:
+        existing_results = store.indices()
     
-    # Check both enhanced and parallel result files
+    # Per-URL result files written by earlier versions still count
     for pattern in ['enhanced_result_*.json', 'parallel_result_*.json']:
         for result_file in results_dir.glob(pattern):
             try:
@@ -161,26 +418,30 @@ def load_urls_for_processing():
     logger.info(f"Found {len(existing_results)} already processed URLs")
     
     # Prepare URLs for processing
-    urls_to_process = []
-    for index, row in df.iterrows():
-        url_index = index + 1
-        if url_index not in existing_results:
-            urls_to_process.append((
-                row['url'],
-                url_index,
-                row.get('visits', 0)
-            ))
+    urls_to_process = [
+        (url, url_index, visits)
+        for url_index, url, visits in rows
+        if url_index not in existing_results
+    ]
     
     logger.info(f"Will process {len(urls_to_process)} remaining URLs")
     return urls_to_process, total_urls
 
 
-def run_parallel_analysis(num_workers: int = 6):
+def run_parallel_analysis(num_workers: int = 6, llm_concurrency: int = 50,
+                          llm_batch_size: int = config.LLM_BATCH_SIZE):
     """Main parallel analysis function"""
     
+    # An attached Chrome is a single browser, so its pages are loaded one at a time
+    if config.CHROME_ATTACH and num_workers > 1:
+        logger.info("Attached to a running Chrome, using a single worker")
+        num_workers = 1
+    
     logger.info("=" * 80)
     logger.info("STARTING PARALLEL A/B TEST ANALYSIS")
     logger.info(f"Number of workers: {num_workers}")
+    logger.info(f"Concurrent GPT requests: {llm_concurrency}")
+    logger.info(f"URLs per GPT request: {llm_batch_size}")
     logger.info("=" * 80)
     
     # Load URLs
@@ -190,43 +451,12 @@ def run_parallel_analysis(num_workers: int = 6):
         logger.info("All URLs have been processed!")
         return
     
-    # Split URLs into batches for workers
-    batch_size = len(urls_to_process) // num_workers + 1
-    url_batches = [
-        urls_to_process[i:i + batch_size] 
-        for i in range(0, len(urls_to_process), batch_size)
-    ]
-    
-    logger.info(f"Created {len(url_batches)} batches for processing")
-    
-    # Start progress display thread
     start_time = datetime.now()
-    progress_thread = threading.Thread(
-        target=update_progress_display, 
-        args=(len(urls_to_process), start_time)
-    )
-    progress_thread.daemon = True
-    progress_thread.start()
-    
-    # Process URLs in parallel
-    with ThreadPoolExecutor(max_workers=num_workers) as executor:
-        futures = {
-            executor.submit(process_url_batch, i+1, batch): i 
-            for i, batch in enumerate(url_batches)
-        }
-        
-        for future in as_completed(futures):
-            worker_id = futures[future]
-            try:
-                batch_results = future.result()
-                with results_lock:
-                    all_results.extend(batch_results)
-                logger.info(f"Worker batch {worker_id + 1} completed with {len(batch_results)} results")
-            except Exception as e:
-                logger.error(f"Worker batch {worker_id + 1} failed: {e}")
     
-    # Wait for progress display to finish
-    time.sleep(2)
+    # Scrape with the Selenium workers; GPT calls run concurrently on the event loop
+    results = asyncio.run(process_urls(urls_to_process, num_workers, llm_concurrency, llm_batch_size))
+    with results_lock:
+        all_results.extend(results)
     
     # Compile final results
     compile_final_results()
@@ -249,26 +479,28 @@ def compile_final_results():
     """Compile all results into final files"""
     logger.info("Compiling final results...")
     
-    # Load all individual result files
-    final_results = []
+    # Individual result files from earlier versions, superseded by the results database
+    results_by_index = {}
     results_dir = Path(config.RESULTS_DIR)
     
     for pattern in ['enhanced_result_*.json', 'parallel_result_*.json']:
         for result_file in sorted(results_dir.glob(pattern)):
             try:
-                with open(result_file, 'r') as f:
-                    result = json.load(f)
-                    final_results.append(result)
+                result = json_io.load_json(result_file)
+                results_by_index[result['url_index']] = result
             except Exception as e:
                 logger.error(f"Failed to load {result_file}: {e}")
     
+    with ResultStore(results_dir / RESULTS_DB_NAME) as store:
+        for result in store.results():
+            results_by_index[result['url_index']] = result
+    
     # Sort by URL index
-    final_results.sort(key=lambda x: x['url_index'])
+    final_results = [results_by_index[idx] for idx in sorted(results_by_index)]
     
     # Save compiled results
     compiled_file = results_dir / "all_parallel_results.json"
-    with open(compiled_file, 'w', encoding='utf-8') as f:
-        json.dump(final_results, f, ensure_ascii=False, indent=2)
+    json_io.dump_json(compiled_file, final_results)
     
     logger.info(f"Compiled {len(final_results)} results to {compiled_file}")
     
@@ -276,6 +508,39 @@ def compile_final_results():
     calculate_final_statistics(final_results)
 
 
+# Column layout of the per-result arrays the statistics are computed from
+_SOA_DTYPE = np.dtype([
+    ('winner', 'U8'),
+    ('conf', 'f8'),
+    ('score_a', 'f8'),
+    ('score_b', 'f8'),
+    ('dup_a', 'i4'),
+    ('dup_b', 'i4'),
+    ('escalated', '?'),
+    ('shortcut', '?'),
+])
+
+
+def _to_soa(results: List[Dict]) -> np.ndarray:
+    """Copy the fields used by the statistics into one structured array (one pass over the dicts)"""
+    soa = np.empty(len(results), dtype=_SOA_DTYPE)
+    for i, r in enumerate(results):
+        analysis = r['analysis']
+        variant_a = r['variant_a']
+        variant_b = r['variant_b']
+        soa[i] = (
+            analysis['winner'] or '',
+            analysis.get('confidence', 0.5),
+            variant_a.get('score', 0),
+            variant_b.get('score', 0),
+            variant_a.get('duplicates', -1),
+            variant_b.get('duplicates', -1),
+            analysis.get('escalated', False),
+            analysis.get('shortcut', False),
+        )
+    return soa
+
+
 def calculate_final_statistics(results: List[Dict]):
     """Calculate comprehensive statistics"""
     
@@ -283,46 +548,30 @@ def calculate_final_statistics(results: List[Dict]):
         logger.warning("No results to calculate statistics")
         return
     
-    # Basic winner statistics
-    wins_a = sum(1 for r in results if r['analysis']['winner'] == 'A')
-    wins_b = sum(1 for r in results if r['analysis']['winner'] == 'B')
-    ties = sum(1 for r in results if r['analysis']['winner'] == 'Tie')
-    
-    # Duplicate statistics
-    total_duplicates_a = sum(
-        r['variant_a'].get('duplicates', 0) 
-        for r in results 
-        if r['variant_a'].get('duplicates', -1) >= 0
-    )
-    total_duplicates_b = sum(
-        r['variant_b'].get('duplicates', 0) 
-        for r in results 
-        if r['variant_b'].get('duplicates', -1) >= 0
-    )
-    
-    valid_duplicate_count = len([
-        r for r in results 
-        if r['variant_a'].get('duplicates', -1) >= 0
-    ])
+    soa = _to_soa(results)
+    winners = soa['winner']
+    dup_a = soa['dup_a']
+    dup_b = soa['dup_b']
+    
+    wins_a = int(np.count_nonzero(winners == 'A'))
+    wins_b = int(np.count_nonzero(winners == 'B'))
+    ties = int(np.count_nonzero(winners == 'Tie'))
+    
+    # Duplicate counts of -1 mark a failed analysis
+    valid_a = dup_a >= 0
+    total_duplicates_a = int(dup_a[valid_a].sum())
+    total_duplicates_b = int(dup_b[dup_b >= 0].sum())
+    valid_duplicate_count = int(np.count_nonzero(valid_a))
     
     avg_duplicates_a = total_duplicates_a / valid_duplicate_count if valid_duplicate_count else 0
     avg_duplicates_b = total_duplicates_b / valid_duplicate_count if valid_duplicate_count else 0
     
-    # Confidence statistics
-    avg_confidence = sum(
-        r['analysis'].get('confidence', 0.5) 
-        for r in results
-    ) / len(results)
-    
-    # Score statistics
-    avg_score_a = sum(
-        r['variant_a'].get('score', 0) 
-        for r in results
-    ) / len(results)
-    avg_score_b = sum(
-        r['variant_b'].get('score', 0) 
-        for r in results
-    ) / len(results)
+    # Identity-shortcut Ties were never judged by GPT, so their confidence and scores are left out
+    scored = ~soa['shortcut']
+    avg_confidence = float(soa['conf'][scored].mean()) if scored.any() else 0.0
+    avg_score_a = float(soa['score_a'][scored].mean()) if scored.any() else 0.0
+    avg_score_b = float(soa['score_b'][scored].mean()) if scored.any() else 0.0
+    escalated = int(np.count_nonzero(soa['escalated']))
     
     stats = {
         "total_urls_analyzed": len(results),
@@ -333,6 +582,8 @@ def calculate_final_statistics(results: List[Dict]):
         "win_percentage_b": round(wins_b / len(results) * 100, 1),
         "tie_percentage": round(ties / len(results) * 100, 1),
         "average_confidence": round(avg_confidence, 3),
+        "escalated_verdicts": escalated,
+        "escalation_rate": round(escalated / len(results) * 100, 1),
         "average_score_a": round(avg_score_a, 2),
         "average_score_b": round(avg_score_b, 2),
         "average_duplicates_a": round(avg_duplicates_a, 2),
@@ -346,8 +597,7 @@ def calculate_final_statistics(results: List[Dict]):
     
     # Save statistics
     stats_file = config.RESULTS_DIR / "parallel_statistics.json"
-    with open(stats_file, 'w', encoding='utf-8') as f:
-        json.dump(stats, f, ensure_ascii=False, indent=2)
+    json_io.dump_json(stats_file, stats)
     
     # Print summary
     print("\n" + "=" * 80)
@@ -364,6 +614,7 @@ def calculate_final_statistics(results: List[Dict]):
     print(f"  Average Score A: {stats['average_score_a']}/10")
     print(f"  Average Score B: {stats['average_score_b']}/10")
     print(f"  Average Confidence: {stats['average_confidence']}")
+    print(f"  Escalated to {config.OPENAI_MODEL_STRONG}: {escalated} ({stats['escalation_rate']}%)")
     print(f"")
     print(f"DUPLICATE ANALYSIS:")
     print(f"  Average Duplicates in A: {stats['average_duplicates_a']}")
@@ -406,6 +657,10 @@ def main():
     
     parser = argparse.ArgumentParser(description='Parallel A/B test analysis')
     parser.add_argument('--workers', type=int, default=6, help='Number of parallel workers (default: 6)')
+    parser.add_argument('--llm-concurrency', type=int, default=50,
+                        help='Maximum concurrent GPT requests (default: 50)')
+    parser.add_argument('--llm-batch-size', type=int, default=config.LLM_BATCH_SIZE,
+                        help=f'URLs judged per GPT request (default: {config.LLM_BATCH_SIZE}, 1 disables batching)')
     parser.add_argument('--retry-failed', action='store_true', help='Retry only failed URLs')
     
     args = parser.parse_args()
@@ -416,7 +671,8 @@ def main():
     config.LOGS_DIR.mkdir(exist_ok=True, parents=True)
     
     # Run analysis
-    run_parallel_analysis(num_workers=args.workers)
+    run_parallel_analysis(num_workers=args.workers, llm_concurrency=args.llm_concurrency,
+                          llm_batch_size=max(1, args.llm_batch_size))
 
 
 if __name__ == "__main__":
@@ -4,16 +4,16 @@ Run a representative sample analysis of 20 URLs
 """
 
 import sys
+import queue
 import logging
-import json
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.append(str(Path(__file__).parent.parent))
 
-from ab_test_analyzer_enhanced import EnhancedABTestAnalyzer
-from report_generator import ABTestReportGenerator
 import config
+import json_io
 
 logging.basicConfig(
     level=logging.INFO,
@@ -22,7 +22,38 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def main():
+def analyze_in_parallel(rows, workers):
+    """Process (url_index, url, visits) rows on a pool of analyzers, each driving its own Chrome"""
+    from ab_test_analyzer_enhanced import EnhancedABTestAnalyzer
+    
+    # An attached Chrome is a single browser, so its pages are loaded one at a time
+    if config.CHROME_ATTACH:
+        workers = 1
+    
+    analyzers = queue.Queue()
+    try:
+        for _ in range(max(1, min(workers, len(rows)))):
+            analyzer = EnhancedABTestAnalyzer()
+            analyzer.setup_driver()
+            analyzers.put(analyzer)
+        
+        def process(row):
+            url_index, url, visits = row
+            analyzer = analyzers.get()
+            try:
+                logger.info(f"Processing URL {url_index}")
+                return analyzer.process_url(url, url_index, visits)
+            finally:
+                analyzers.put(analyzer)
+        
+        with ThreadPoolExecutor(max_workers=analyzers.qsize()) as executor:
+            return [result for result in executor.map(process, rows) if result]
+    finally:
+        while not analyzers.empty():
+            analyzers.get().close_driver()
+
+
+def main(workers=4):
     """Run analysis on 20 URLs"""
     
     logger.info("=" * 80)
@@ -32,27 +63,31 @@ def main():
     # Get current progress
     results_file = config.RESULTS_DIR / "enhanced_results.json"
     if results_file.exists():
-        with open(results_file, 'r') as f:
-            current_results = json.load(f)
+        current_results = json_io.load_json(results_file)
         start_from = len(current_results) + 1
     else:
+        current_results = []
         start_from = 1
     
     logger.info(f"Starting from URL {start_from}")
     
-    # Run analysis
-    analyzer = EnhancedABTestAnalyzer()
-    
     # Calculate how many more we need to reach 20
     target = 20
     if start_from <= target:
+        # Selenium and the analyzer are only loaded when there is something to capture
+        from ab_test_analyzer_enhanced import EnhancedABTestAnalyzer
+        analyzer = EnhancedABTestAnalyzer()
+        
         to_process = target - start_from + 1
         logger.info(f"Processing {to_process} URLs to reach target of {target}")
         
-        results = analyzer.run_analysis(
-            limit=to_process,
-            start_from=start_from
-        )
+        rows = analyzer.load_urls(to_process, start_from)
+        results = analyze_in_parallel(rows, workers)
+        
+        # Keep the earlier results so enhanced_results.json stays complete
+        analyzer.results = current_results + results
+        analyzer.save_results()
+        analyzer.calculate_enhanced_statistics()
         
         logger.info(f"Sample analysis complete: {len(results)} new URLs processed")
     else:
@@ -62,37 +97,52 @@ def main():
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
     logger.info("Generating PDF report...")
+    from report_generator import ABTestReportGenerator
     generator = ABTestReportGenerator(results_file)
     output_file = config.BASE_DIR / f"sample_ab_test_report_{timestamp}.pdf"
     report_path = generator.generate_report(output_file)
     
     logger.info(f"Report generated: {report_path}")
     
-    # Analyze results
-    with open(results_file, 'r') as f:
-        all_results = json.load(f)
-    
     logger.info("\n" + "=" * 80)
     logger.info("SAMPLE ANALYSIS SUMMARY")
     logger.info("=" * 80)
     
-    total = len(all_results)
-    wins_a = sum(1 for r in all_results if r['analysis']['winner'] == 'A')
-    wins_b = sum(1 for r in all_results if r['analysis']['winner'] == 'B')
-    ties = sum(1 for r in all_results if r['analysis']['winner'] == 'Tie')
+    # Analyze results in one streaming pass, keeping only the counters
+    total = wins_a = wins_b = ties = 0
+    dup_sum_a = dup_count_a = dup_sum_b = dup_count_b = 0
+    for r in json_io.iter_items(results_file):
+        total += 1
+        winner = r['analysis']['winner']
+        if winner == 'A':
+            wins_a += 1
+        elif winner == 'B':
+            wins_b += 1
+        elif winner == 'Tie':
+            ties += 1
+        
+        dup_a = r['variant_a']['duplicates']
+        if dup_a >= 0:
+            dup_sum_a += dup_a
+            dup_count_a += 1
+        dup_b = r['variant_b']['duplicates']
+        if dup_b >= 0:
+            dup_sum_b += dup_b
+            dup_count_b += 1
     
     logger.info(f"Total URLs analyzed: {total}")
+    if not total:
+        logger.warning("No results to summarize")
+        return report_path
+    
     logger.info(f"Variant A wins: {wins_a} ({wins_a/total*100:.1f}%)")
     logger.info(f"Variant B wins: {wins_b} ({wins_b/total*100:.1f}%)")
     logger.info(f"Ties: {ties} ({ties/total*100:.1f}%)")
     
     # Duplicate analysis
-    duplicates_a = [r['variant_a']['duplicates'] for r in all_results if r['variant_a']['duplicates'] >= 0]
-    duplicates_b = [r['variant_b']['duplicates'] for r in all_results if r['variant_b']['duplicates'] >= 0]
-    
-    if duplicates_a and duplicates_b:
-        avg_dup_a = sum(duplicates_a) / len(duplicates_a)
-        avg_dup_b = sum(duplicates_b) / len(duplicates_b)
+    if dup_count_a and dup_count_b:
+        avg_dup_a = dup_sum_a / dup_count_a
+        avg_dup_b = dup_sum_b / dup_count_b
         
         logger.info(f"\nAverage duplicates in A: {avg_dup_a:.2f}")
         logger.info(f"Average duplicates in B: {avg_dup_b:.2f}")
@@ -108,4 +158,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Sample A/B test analysis')
+    parser.add_argument('--workers', type=int, default=4, help='Number of concurrent Chrome drivers (default: 4)')
+    main(workers=parser.parse_args().workers)
\ No newline at end of file
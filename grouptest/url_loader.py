@@ -0,0 +1,30 @@
+"""
+URL list loading for A/B test runs
+Reads the input Excel file with openpyxl in read-only mode instead of going through pandas
+"""
+
+from openpyxl import load_workbook
+
+
+def load_url_rows(path):
+    """Return (url_index, url, visits) tuples for every URL in the first sheet
+    
+    url_index is the 1-based data row number, matching the numbering used in result files
+    """
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, ())
+        url_col = header.index('url')
+        visits_col = header.index('visits') if 'visits' in header else None
+        
+        url_rows = []
+        for url_index, row in enumerate(rows, start=1):
+            url = row[url_col] if url_col < len(row) else None
+            if not url:
+                continue
+            visits = row[visits_col] if visits_col is not None and visits_col < len(row) else 0
+            url_rows.append((url_index, url, visits or 0))
+        return url_rows
+    finally:
+        wb.close()
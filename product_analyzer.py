@@ -1,30 +1,205 @@
 import os
 import time
 import json
+import asyncio
 from pathlib import Path
 from urllib.parse import urlparse
 import re
 from datetime import datetime
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import aiohttp
 import dotenv
 import base64
 import io
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
+from selenium.common.exceptions import TimeoutException
+import lxml.html
 from reportlab.lib.pagesizes import letter, A4, landscape
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle, PageBreak, KeepTogether
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from PIL import Image as PILImage
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Load environment variables from .env file
 dotenv.load_dotenv()
 
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+
+# One keep-alive connection pool for all OpenAI calls, sized for the Chrome worker threads;
+# rate limits and connection failures are retried with backoff. Server errors and read timeouts
+# are not, as the billed request may already have been processed
+_OPENAI_SESSION = requests.Session()
+_OPENAI_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(
+        total=3,
+        read=0,
+        backoff_factor=0.5,
+        status_forcelist=[429],
+        allowed_methods=frozenset(["POST"]),
+        raise_on_status=False
+    )
+))
+
+# Seconds to wait for the product title, then for the shop offers, before screenshotting what has loaded
+PAGE_LOAD_TIMEOUT = 10
+OFFERS_TIMEOUT = 3
+
+# Bounding box (pixels) of the JPEG copy of a screenshot embedded in the PDF report; 2x its 700pt width
+REPORT_IMAGE_SIZE = (1400, 1400)
+
+# Titles asked about in one bulk size-check request
+TITLE_BULK_SIZE = 50
+
+# Number of products between fsyncs of the results log
+RESULTS_FSYNC_EVERY = 25
+
+# Chrome drivers started by analyze_products unless max_workers is given
+DEFAULT_WORKERS = 4
+
+# Attach to a Chrome already started with --remote-debugging-port=9222 instead of launching one
+CHROME_ATTACH = os.getenv("JAMIE_CHROME_ATTACH") == "1"
+CHROME_DEBUGGER_ADDRESS = "127.0.0.1:9222"
+
+# Requests Chrome never makes: trackers, ads, web fonts and video that neither the screenshot nor the DOM analysis need
+BLOCKED_URL_PATTERNS = [
+    "*googletagmanager*",
+    "*google-analytics*",
+    "*doubleclick*",
+    "*facebook.net*",
+    "*hotjar*",
+    "*.woff",
+    "*.woff2",
+    "*.ttf",
+    "*.mp4",
+    "*.webm",
+]
+
+def _load_json(path):
+    """Load a JSON file, with orjson when it is installed."""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _dump_json(path, data):
+    """Write data to a pretty-printed JSON file, with orjson when it is installed."""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        return
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def _json_line(data):
+    """Serialize data to a single JSON line."""
+    if orjson is not None:
+        return orjson.dumps(data).decode('utf-8') + "\n"
+    return json.dumps(data) + "\n"
+
+
+# Regex fallback for detecting a shoe size in a product title
+_SIZE_RE = re.compile(r'\b(?:maat|mt|size)\s*\d+\b|\b\d{2}(?:\.5)?\b', re.IGNORECASE)
+
+
+def _size_check_payload(title):
+    """Build the chat completion request asking whether a title contains a shoe size."""
+    return {
+        "model": "gpt-5-mini",
+        "messages": [
+            {
+                "role": "system", 
+                "content": "You are a product analyzer that determines if a product title contains shoe size information. Respond with only 'true' or 'false'."
+            },
+            {
+                "role": "user", 
+                "content": f"Does this product title contain a shoe size? Title: \"{title}\"\nRespond with only 'true' or 'false'."
+            }
+        ],
+        "temperature": 0.1,
+        "max_tokens": 5
+    }
+
+
+def _bulk_size_check_payload(titles):
+    """Build one chat completion request asking, for each of several titles, whether it contains a shoe size."""
+    numbered = "\n".join(f"{i}. {title}" for i, title in enumerate(titles, 1))
+    return {
+        "model": "gpt-5-mini",
+        "messages": [
+            {
+                "role": "system", 
+                "content": "You are a product analyzer that determines if product titles contain shoe size information. Respond in JSON format."
+            },
+            {
+                "role": "user", 
+                "content": f"For each numbered title, answer true/false on whether it contains a shoe size:\n{numbered}\n"
+                           f"Return a JSON object {{\"results\": [...]}} with one true/false per title, in order."
+            }
+        ],
+        "temperature": 0.1,
+        "max_tokens": 20 + 4 * len(titles),
+        "response_format": {"type": "json_object"}
+    }
+
+
+def _gpt_size_check(title, api_key):
+    """
+    Ask GPT-5-mini whether a title contains a shoe size.
+    
+    Raises on API errors so failures are not cached by the caller.
+    """
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}"
+    }
+    
+    response = _OPENAI_SESSION.post(
+        OPENAI_CHAT_URL,
+        headers=headers,
+        json=_size_check_payload(title),
+        timeout=10
+    )
+    
+    if response.status_code != 200:
+        raise RuntimeError(f"API error: {response.status_code} - {response.text}")
+    result = response.json()
+    return result["choices"][0]["message"]["content"].strip().lower() == "true"
+
+
+# Style of the summary table at the top of the PDF report
+SUMMARY_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.whitesmoke, colors.lightgrey]),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('PADDING', (0, 0), (-1, -1), 6),
+])
+
 class ProductAnalyzer:
     """Class to analyze product pages, take screenshots, and generate reports."""
     
@@ -45,18 +220,39 @@ class ProductAnalyzer:
         # Results storage
         self.analysis_results = []
         
+        # Product IDs whose size-in-title flag the screenshot analysis did not provide
+        self.unchecked_titles = set()
+        
+        # Screenshots are written to disk in the background while the next page loads
+        self._io_pool = ThreadPoolExecutor(max_workers=2)
+        self._pending_writes = set()
+        
+        # Report JPEGs of this run by path, so the PDF is built from memory
+        self.report_images = {}
+        
+        # GPT title size checks from earlier runs: title -> bool. Kept next to the output directory,
+        # as analyze_and_report gives every run its own directory under a shared one
+        self.title_cache_file = self.output_dir.parent / "gpt_title_cache.json"
+        self.title_size_cache = {}
+        if self.title_cache_file.exists():
+            try:
+                self.title_size_cache = _load_json(self.title_cache_file)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable title cache: {str(e)}")
+        
         # OpenAI API key
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         if not self.openai_api_key:
             print("WARNING: OPENAI_API_KEY not found in environment variables. Image analysis will not work.")
     
-    def analyze_image_with_gpt4o(self, image_path, prompt):
+    def analyze_image_with_gpt4o(self, image_path, prompt, image_bytes=None):
         """
         Use GPT-4o to analyze a screenshot and detect features.
         
         Args:
             image_path: Path to the screenshot image
             prompt: The prompt to send to GPT-4o
+            image_bytes: The screenshot itself, if already in memory; image_path is not read then
             
         Returns:
             Dictionary with analysis results
@@ -67,8 +263,10 @@ class ProductAnalyzer:
         
         try:
             # Convert image to base64
-            with open(image_path, "rb") as image_file:
-                image_data = base64.b64encode(image_file.read()).decode('utf-8')
+            if image_bytes is None:
+                with open(image_path, "rb") as image_file:
+                    image_bytes = image_file.read()
+            image_data = base64.b64encode(image_bytes).decode('utf-8')
             
             headers = {
                 "Content-Type": "application/json",
@@ -94,8 +292,8 @@ class ProductAnalyzer:
             }
             
             print("Sending screenshot to GPT-5-mini for analysis...")
-            response = requests.post(
-                "https://api.openai.com/v1/chat/completions",
+            response = _OPENAI_SESSION.post(
+                OPENAI_CHAT_URL,
                 headers=headers,
                 json=payload
             )
@@ -123,80 +321,204 @@ class ProductAnalyzer:
         Returns:
             Boolean indicating if the title contains size information
         """
+        # No size-like token means no size; GPT only has to rule out years, product codes and the like
+        if not _SIZE_RE.search(title):
+            return False
+        
         if not self.openai_api_key:
-            # Fallback to regex if API key is not available
-            size_pattern = r'\b(maat|mt|size)\s*\d+\b|\b\d{2}(\.5)?\b'
-            return bool(re.search(size_pattern, title.lower()))
+            # Fallback to the regex match if API key is not available
+            return True
+        
+        if title in self.title_size_cache:
+            return self.title_size_cache[title]
         
         try:
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.openai_api_key}"
-            }
-            
-            payload = {
-                "model": "gpt-5-mini",
-                "messages": [
-                    {
-                        "role": "system", 
-                        "content": "You are a product analyzer that determines if a product title contains shoe size information. Respond with only 'true' or 'false'."
-                    },
-                    {
-                        "role": "user", 
-                        "content": f"Does this product title contain a shoe size? Title: \"{title}\"\nRespond with only 'true' or 'false'."
-                    }
-                ],
-                "temperature": 0.1,
-                "max_tokens": 5
-            }
-            
-            response = requests.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=payload
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                ai_response = result["choices"][0]["message"]["content"].strip().lower()
-                return ai_response == "true"
-            else:
-                print(f"Error calling OpenAI API: {response.status_code} - {response.text}")
-                # Fallback to regex
-                size_pattern = r'\b(maat|mt|size)\s*\d+\b|\b\d{2}(\.5)?\b'
-                return bool(re.search(size_pattern, title.lower()))
+            has_size = _gpt_size_check(title, self.openai_api_key)
+            self.title_size_cache[title] = has_size
+            return has_size
                 
         except Exception as e:
             print(f"Error using GPT to check title: {str(e)}")
             # Fallback to regex
-            size_pattern = r'\b(maat|mt|size)\s*\d+\b|\b\d{2}(\.5)?\b'
-            return bool(re.search(size_pattern, title.lower()))
+            return bool(_SIZE_RE.search(title))
+    
+    async def _check_size_batch_async(self, titles):
+        """
+        Check many titles for size information with concurrent GPT-5-mini requests.
+        
+        Args:
+            titles: The product titles to check
+            
+        Returns:
+            List of booleans in title order; failed requests fall back to the regex
+        """
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.openai_api_key}"
+        }
+        
+        async with aiohttp.ClientSession(headers=headers, connector=aiohttp.TCPConnector(limit=20)) as session:
+            async def check(title):
+                async with session.post(OPENAI_CHAT_URL, json=_size_check_payload(title)) as response:
+                    if response.status != 200:
+                        raise RuntimeError(f"API error: {response.status} - {await response.text()}")
+                    result = await response.json()
+                    return result["choices"][0]["message"]["content"].strip().lower() == "true"
+            
+            answers = await asyncio.gather(*(check(title) for title in titles), return_exceptions=True)
+        
+        checks = []
+        for title, answer in zip(titles, answers):
+            if isinstance(answer, Exception):
+                print(f"Error using GPT to check title: {str(answer)}")
+                answer = bool(_SIZE_RE.search(title))
+            else:
+                self.title_size_cache[title] = answer
+            checks.append(answer)
+        return checks
+    
+    def check_sizes_in_titles_bulk(self, titles):
+        """
+        Check several titles for size information with a single GPT-5-mini request.
+        
+        Args:
+            titles: The product titles to check
+            
+        Returns:
+            List of booleans in title order
+            
+        Raises:
+            RuntimeError: If the request fails or the answer does not cover every title
+        """
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.openai_api_key}"
+        }
+        
+        response = _OPENAI_SESSION.post(
+            OPENAI_CHAT_URL,
+            headers=headers,
+            json=_bulk_size_check_payload(titles),
+            timeout=30
+        )
+        
+        if response.status_code != 200:
+            raise RuntimeError(f"API error: {response.status_code} - {response.text}")
+        answers = json.loads(response.json()["choices"][0]["message"]["content"]).get("results")
+        if not isinstance(answers, list) or len(answers) != len(titles):
+            raise RuntimeError(f"Expected {len(titles)} answers, got {answers!r}")
+        
+        checks = [answer is True or str(answer).strip().lower() == "true" for answer in answers]
+        self.title_size_cache.update(zip(titles, checks))
+        return checks
+    
+    def check_sizes_in_titles(self, titles):
+        """
+        Check a batch of product titles for size information, TITLE_BULK_SIZE titles per GPT request.
+        
+        Args:
+            titles: The product titles to check
+            
+        Returns:
+            List of booleans in title order
+        """
+        if not titles:
+            return []
+        if not self.openai_api_key:
+            return [self.check_size_in_title_with_gpt(title) for title in titles]
+        
+        # Only titles with a size-like token go to GPT, once per distinct title no earlier check answered
+        candidates = [bool(_SIZE_RE.search(title)) for title in titles]
+        unknown = list(dict.fromkeys(t for t, c in zip(titles, candidates) if c and t not in self.title_size_cache))
+        checks = dict(self.title_size_cache)
+        for start in range(0, len(unknown), TITLE_BULK_SIZE):
+            chunk = unknown[start:start + TITLE_BULK_SIZE]
+            try:
+                checks.update(zip(chunk, self.check_sizes_in_titles_bulk(chunk)))
+            except Exception as e:
+                print(f"Error checking titles in bulk, asking one title per request: {str(e)}")
+                checks.update(zip(chunk, asyncio.run(self._check_size_batch_async(chunk))))
+        return [c and checks[title] for title, c in zip(titles, candidates)]
+    
+    def save_title_cache(self):
+        """Persist the GPT title size checks for the next run."""
+        try:
+            _dump_json(self.title_cache_file, self.title_size_cache)
+        except OSError as e:
+            print(f"Error saving title cache: {str(e)}")
     
     def setup_webdriver(self):
-        """Set up the Chrome webdriver with appropriate options."""
+        """Set up the Chrome webdriver used when no driver is passed explicitly."""
+        self.driver = self.create_webdriver()
+    
+    def create_webdriver(self):
+        """Create a headless Chrome webdriver with appropriate options."""
         chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        
-        print("Setting up Chrome webdriver...")
-        self.driver = webdriver.Chrome(options=chrome_options)
+        if CHROME_ATTACH:
+            chrome_options.add_experimental_option("debuggerAddress", CHROME_DEBUGGER_ADDRESS)
+            print(f"Attaching to Chrome at {CHROME_DEBUGGER_ADDRESS}...")
+        else:
+            chrome_options.add_argument("--headless")
+            chrome_options.add_argument("--window-size=1920,1080")
+            chrome_options.add_argument("--disable-gpu")
+            chrome_options.add_argument("--no-sandbox")
+            chrome_options.add_argument("--disable-dev-shm-usage")
+            chrome_options.add_experimental_option("prefs", {"profile.default_content_setting_values.notifications": 2})
+            print("Setting up Chrome webdriver...")
+        
+        driver = webdriver.Chrome(options=chrome_options)
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        return driver
+    
+    def write_in_background(self, path, data):
+        """Write bytes to a file on the I/O thread; wait_for_writes() waits until it is on disk."""
+        future = self._io_pool.submit(Path(path).write_bytes, data)
+        self._pending_writes.add(future)
+        
+        def done(f):
+            self._pending_writes.discard(f)
+            if f.exception():
+                print(f"Error writing {path}: {str(f.exception())}")
+        
+        future.add_done_callback(done)
+    
+    def wait_for_writes(self):
+        """Block until all background file writes have finished."""
+        wait(list(self._pending_writes))
     
-    def take_screenshot(self, url, product_id):
+    def take_screenshot(self, url, product_id, driver=None):
         """
         Take a screenshot of the given URL and save it to the screenshots directory.
         
+        The file is written in the background; call wait_for_writes() before reading it.
+        
         Args:
             url: The URL to take a screenshot of
             product_id: The product ID to use in the filename
+            driver: Webdriver to use; defaults to the analyzer's own driver
             
         Returns:
             Path to the screenshot file
         """
-        if self.driver is None:
-            self.setup_webdriver()
+        return self.capture_screenshot(url, product_id, driver)[0]
+    
+    def capture_screenshot(self, url, product_id, driver=None):
+        """
+        Take a screenshot of the given URL, keeping the PNG in memory while it is written to disk.
+        
+        Args:
+            url: The URL to take a screenshot of
+            product_id: The product ID to use in the filename
+            driver: Webdriver to use; defaults to the analyzer's own driver
+            
+        Returns:
+            Tuple of the screenshot path and the PNG bytes, or (None, None) on failure
+        """
+        if driver is None:
+            if self.driver is None:
+                self.setup_webdriver()
+            driver = self.driver
         
         # Clean URL for filename
         parsed_url = urlparse(url)
@@ -206,33 +528,66 @@ class ProductAnalyzer:
         
         try:
             print(f"Taking screenshot of {url}...")
-            self.driver.get(url)
+            driver.get(url)
             
-            # Wait for page to load
-            time.sleep(3)
+            # Wait until the title and the shop offers are on the page; the offers get a short
+            # wait of their own, as a product without shops never shows any
+            try:
+                WebDriverWait(driver, PAGE_LOAD_TIMEOUT).until(
+                    EC.presence_of_element_located((By.TAG_NAME, "h1")))
+                WebDriverWait(driver, OFFERS_TIMEOUT).until(
+                    EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.comparison--Ws_f6")))
+            except TimeoutException:
+                print(f"Timed out waiting for {url} to load, taking screenshot of partial page")
             
-            # Scroll down to make sure all elements are loaded
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
-            time.sleep(1)
-            self.driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(1)
+            # Scroll down and pause there so lazy-loaded elements are triggered
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
+            time.sleep(0.2)
+            driver.execute_script("window.scrollTo(0, 0);")
             
             # Take screenshot
-            self.driver.save_screenshot(str(screenshot_path))
+            png = driver.get_screenshot_as_png()
+            self.write_in_background(screenshot_path, png)
             print(f"Screenshot saved to {screenshot_path}")
             
-            return screenshot_path
+            return screenshot_path, png
         
         except Exception as e:
             print(f"Error taking screenshot of {url}: {str(e)}")
+            return None, None
+    
+    def make_report_image(self, screenshot_path, png=None):
+        """
+        Save a downscaled JPEG copy of a screenshot for embedding in the PDF report.
+        
+        The full-size PNG is kept for the GPT analysis.
+        
+        Args:
+            screenshot_path: Path to the PNG screenshot
+            png: The screenshot's PNG bytes, if already in memory
+            
+        Returns:
+            Path to the JPEG copy, or None if it could not be made
+        """
+        report_image_path = Path(screenshot_path).with_suffix(".jpg")
+        try:
+            with PILImage.open(io.BytesIO(png) if png is not None else screenshot_path) as img:
+                img.thumbnail(REPORT_IMAGE_SIZE)
+                jpeg = io.BytesIO()
+                img.convert("RGB").save(jpeg, "JPEG", quality=80, optimize=True)
+            self.report_images[str(report_image_path)] = jpeg.getvalue()
+            self.write_in_background(report_image_path, jpeg.getvalue())
+            return str(report_image_path)
+        except Exception as e:
+            print(f"Error making report image of {screenshot_path}: {str(e)}")
             return None
     
-    def count_shop_sizes(self, soup):
+    def count_shop_sizes(self, tree):
         """
         Count the number of available sizes for each shop.
         
         Args:
-            soup: BeautifulSoup object representing the page
+            tree: lxml element holding the shop comparison sections
             
         Returns:
             Dictionary with shop names as keys and size counts as values,
@@ -242,22 +597,21 @@ class ProductAnalyzer:
         has_shop_with_many_sizes = False
         
         # Find all shop comparison sections
-        comparisons = soup.find_all('div', class_='comparison--Ws_f6')
+        comparisons = tree.cssselect("div.comparison--Ws_f6")
         
         for comparison in comparisons:
-            shop_name_div = comparison.find('div', class_='comparison__shopname--ellipsis--t4Q5X')
-            if not shop_name_div:
+            shop_name_divs = comparison.cssselect("div.comparison__shopname--ellipsis--t4Q5X")
+            if not shop_name_divs:
                 continue
                 
-            shop_name = shop_name_div.get_text(strip=True)
+            shop_name = "".join(s.strip() for s in shop_name_divs[0].itertext())
             
             # Find size badges within this shop section
-            size_section = comparison.find('div', class_='fashionSize--BhXK5')
-            if not size_section:
+            size_sections = comparison.cssselect("div.fashionSize--BhXK5")
+            if not size_sections:
                 continue
                 
-            size_badges = size_section.find_all('div', class_='fashionSizeBadge--WkUdh')
-            size_count = len(size_badges)
+            size_count = len(size_sections[0].cssselect("div.fashionSizeBadge--WkUdh"))
             
             shop_size_counts[shop_name] = size_count
             
@@ -266,24 +620,30 @@ class ProductAnalyzer:
         
         return shop_size_counts, has_shop_with_many_sizes
     
-    def analyze_product_page(self, url, product_id):
+    def analyze_product_page(self, url, product_id, driver=None, release_driver=None):
         """
         Analyze a product page for the requested information.
         
         Args:
             url: The product URL to analyze
             product_id: The ID of the product
+            driver: Webdriver to use; defaults to the analyzer's own driver
+            release_driver: Called once the page itself is no longer needed, before the
+                            screenshot goes to GPT, so the driver can load the next page
             
         Returns:
             Dictionary with analysis results
         """
-        if self.driver is None:
-            self.setup_webdriver()
+        if driver is None:
+            if self.driver is None:
+                self.setup_webdriver()
+            driver = self.driver
         
         result = {
             "product_id": product_id,
             "url": url,
             "screenshot_path": None,
+            "report_image_path": None,
             "title": None,
             "has_multiple_images": False,
             "has_size_in_title": False,
@@ -296,24 +656,25 @@ class ProductAnalyzer:
         
         try:
             # Take screenshot
-            screenshot_path = self.take_screenshot(url, product_id)
+            screenshot_path, png = self.capture_screenshot(url, product_id, driver)
             result["screenshot_path"] = str(screenshot_path) if screenshot_path else None
-            
-            # Get page source for analysis
-            page_source = self.driver.page_source
-            soup = BeautifulSoup(page_source, 'html.parser')
+            if screenshot_path:
+                result["report_image_path"] = self.make_report_image(screenshot_path, png)
             
             # Extract title (h1)
-            h1_tag = soup.find('h1')
-            if h1_tag:
-                title = h1_tag.get_text(strip=True)
+            h1_tags = driver.find_elements(By.TAG_NAME, "h1")
+            if h1_tags:
+                title = h1_tags[0].text.strip()
                 result["title"] = title
                 
                 # This will be handled by GPT-4o in the image analysis now
                 result["has_size_in_title"] = False
             
-            # Count available sizes from shops for fallback
-            shop_size_counts, has_shop_with_many_sizes = self.count_shop_sizes(soup)
+            # Count available sizes from shops for fallback; only the shop sections are parsed
+            comparisons = driver.find_elements(By.CSS_SELECTOR, "div.comparison--Ws_f6")
+            shop_html = "".join(c.get_attribute("outerHTML") for c in comparisons)
+            shop_tree = lxml.html.fromstring(shop_html) if shop_html else lxml.html.Element("div")
+            shop_size_counts, has_shop_with_many_sizes = self.count_shop_sizes(shop_tree)
             result["shop_size_counts"] = shop_size_counts
             
             # Set has_shop_with_many_sizes based on the actual counts
@@ -321,10 +682,14 @@ class ProductAnalyzer:
             result["has_shop_with_many_sizes"] = any(count >= 5 for count in shop_size_counts.values())
             
             # Check for multiple images
-            thumb_images = soup.find_all('img', class_='thumb__image--rkNhS')
+            thumb_images = driver.find_elements(By.CSS_SELECTOR, "img.thumb__image--rkNhS")
             result["has_multiple_images"] = len(thumb_images) > 1
             
+            if release_driver:
+                release_driver()
+            
             # Use GPT-4o to analyze the screenshot for reviews and sizes
+            size_checked = False
             if screenshot_path and self.openai_api_key:
                 prompt = """
                 Please analyze this product page screenshot from an e-commerce site and answer the following questions about the product. Focus specifically on:
@@ -344,7 +709,7 @@ class ProductAnalyzer:
                 - "has_size_in_title": true/false - whether the product title contains size information
                 """
                 
-                analysis_result = self.analyze_image_with_gpt4o(screenshot_path, prompt)
+                analysis_result = self.analyze_image_with_gpt4o(screenshot_path, prompt, png)
                 
                 if not isinstance(analysis_result, dict) or "error" in analysis_result:
                     print(f"Error in GPT-4o analysis, using fallback methods")
@@ -355,12 +720,17 @@ class ProductAnalyzer:
                     
                     # Extract size information from GPT-4o
                     result["has_size_in_title"] = analysis_result.get("has_size_in_title", False)
+                    size_checked = True
                     
                     # NOTE: We don't update has_shop_with_many_sizes here anymore
                     # It's now exclusively determined by the shop size counts
             else:
                 print("Skipping GPT-4o analysis due to missing screenshot or API key")
             
+            if result["title"] and not size_checked:
+                # Checked from the title text once the whole batch is loaded
+                self.unchecked_titles.add(product_id)
+            
             print(f"Analyzed {url}")
             print(f"  Title: {result['title']}")
             print(f"  Multiple images: {result['has_multiple_images']}")
@@ -369,11 +739,6 @@ class ProductAnalyzer:
             print(f"  Shop size counts: {result['shop_size_counts']}")
             print(f"  Has shop with 5+ sizes: {result['has_shop_with_many_sizes']}")
             
-            # Save individual result
-            result_file = self.results_dir / f"{product_id}_analysis.json"
-            with open(result_file, 'w') as f:
-                json.dump(result, f, indent=2)
-            
             return result
         
         except Exception as e:
@@ -381,20 +746,39 @@ class ProductAnalyzer:
             result["error"] = str(e)
             return result
     
-    def analyze_products(self, products_data):
+    def fill_sizes_in_titles(self):
+        """Check the titles the screenshot analysis left open, all in a single concurrent batch."""
+        pending = [r for r in self.analysis_results
+                   if r["product_id"] in self.unchecked_titles and "error" not in r]
+        if not pending:
+            return
+        
+        print(f"Checking {len(pending)} product titles for size information...")
+        checks = self.check_sizes_in_titles([r["title"] for r in pending])
+        for result, has_size in zip(pending, checks):
+            result["has_size_in_title"] = has_size
+        self.unchecked_titles.clear()
+    
+    def analyze_products(self, products_data, max_workers=None):
         """
-        Analyze a list of products.
+        Analyze a list of products on a pool of Chrome drivers.
         
         Args:
             products_data: List of dictionaries with product information
                            Each should have at least 'pim3puntnull' and 'product_url' keys
+            max_workers: Number of pages loaded concurrently, each with its own driver.
+                         Defaults to DEFAULT_WORKERS.
         
         Returns:
-            List of analysis results
+            List of analysis results, in input order
         """
+        drivers = queue.Queue()
         try:
             self.analysis_results = []
+            self.unchecked_titles = set()
+            self.report_images = {}
             
+            jobs = []
             for i, product in enumerate(products_data):
                 product_id = product.get('pim3puntnull', f"unknown_{i}")
                 product_url = product.get('product_url')
@@ -402,21 +786,109 @@ class ProductAnalyzer:
                 if not product_url:
                     print(f"Skipping product {product_id} as it has no URL")
                     continue
+                jobs.append((i, product_id, product_url))
+            
+            # An attached Chrome is a single browser, so its pages are loaded one at a time
+            if max_workers is None:
+                max_workers = DEFAULT_WORKERS
+            workers = 1 if CHROME_ATTACH else max(1, min(max_workers, len(jobs)))
+            for _ in range(workers):
+                drivers.put(self.create_webdriver())
+            
+            def analyze(job):
+                i, product_id, product_url = job
+                driver = drivers.get()
+                released = []
+                
+                def release():
+                    if not released:
+                        released.append(True)
+                        drivers.put(driver)
                 
-                print(f"Analyzing product {i+1}/{len(products_data)}: {product_id}")
-                result = self.analyze_product_page(product_url, product_id)
-                self.analysis_results.append(result)
+                try:
+                    print(f"Analyzing product {i+1}/{len(products_data)}: {product_id}")
+                    return i, self.analyze_product_page(product_url, product_id, driver, release)
+                finally:
+                    release()
+            
+            # Results are written to a JSON-lines log as they finish, so a crash keeps what was done;
+            # each run gets its own log, so an earlier run's records are never overwritten or mixed in
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            results_log = self.output_dir / f"analysis_results_{timestamp}.jsonl"
+            finished = []
+            try:
+                # Twice as many threads as drivers: while one thread waits on GPT for a screenshot,
+                # another already loads the next page on the driver it released
+                with ThreadPoolExecutor(max_workers=workers * 2) as executor, open(results_log, 'w') as log:
+                    futures = [executor.submit(analyze, job) for job in jobs]
+                    for count, future in enumerate(as_completed(futures), 1):
+                        i, result = future.result()
+                        finished.append((i, result))
+                        log.write(_json_line(result))
+                        if count % RESULTS_FSYNC_EVERY == 0:
+                            log.flush()
+                            os.fsync(log.fileno())
+            finally:
+                # Back to input order for the report, also when a product failed
+                finished.sort(key=lambda item: item[0])
+                self.analysis_results[:] = [result for _, result in finished]
+            
+            self.fill_sizes_in_titles()
+            self.wait_for_writes()
             
             # Save all results to a single file
             all_results_file = self.output_dir / "all_analysis_results.json"
-            with open(all_results_file, 'w') as f:
-                json.dump(self.analysis_results, f, indent=2)
+            _dump_json(all_results_file, self.analysis_results)
             
             return self.analysis_results
         
         except Exception as e:
             print(f"Error during product analysis: {str(e)}")
             return self.analysis_results
+        
+        finally:
+            while not drivers.empty():
+                self.release_webdriver(drivers.get())
+    
+    def _analysis_text(self, result, original_data):
+        """
+        Format the analysis section of a product page in the PDF report.
+        
+        Args:
+            result: The product's analysis result
+            original_data: The product's original data, which holds the shop URLs
+            
+        Returns:
+            Paragraph markup with the analysis flags and shop size counts
+        """
+        review_count = result.get('review_count', 0)
+        lines = [
+            f"<b>Multiple Images:</b> {'Yes' if result.get('has_multiple_images') else 'No'}",
+            f"<b>Size in Title:</b> {'Yes' if result.get('has_size_in_title') else 'No'}",
+            f"<b>Has Reviews:</b> {'Yes' if result.get('has_reviews') else 'No'} {f'({review_count} reviews)' if review_count > 0 else ''}",
+            f"<b>Min 1 offer met >5 maten:</b> {'Yes' if result.get('has_shop_with_many_sizes', False) else 'No'}",
+        ]
+        
+        # Add shop size counts if available with clickable links
+        shop_data = result.get('shop_size_counts', {})
+        if shop_data:
+            lines.append("")
+            lines.append("<b>Shop Size Counts:</b>")
+            
+            for i, (shop_name, size_count) in enumerate(shop_data.items()):
+                # Use the corresponding URL from the original data
+                shop_url = original_data.get(f"url{i+1}", "#")
+                
+                # Clearly format the shop name, properly escaping HTML entities
+                safe_shop_name = shop_name.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+                
+                if shop_url and shop_url != "#":
+                    # Format with proper HTML link styling for better visibility in PDF
+                    lines.append(f'• <a href="{shop_url}" color="#0000FF"><u>{safe_shop_name}</u></a>: {size_count} sizes')
+                else:
+                    lines.append(f"• {safe_shop_name}: {size_count} sizes")
+        
+        return "<br/>".join(lines) + "<br/>"
     
     def generate_pdf_report(self, output_file=None):
         """
@@ -507,10 +979,13 @@ class ProductAnalyzer:
             
             # Calculate summary statistics
             total_products = len(self.analysis_results)
-            products_with_multiple_images = sum(1 for r in self.analysis_results if r.get('has_multiple_images', False))
-            products_with_size_in_title = sum(1 for r in self.analysis_results if r.get('has_size_in_title', False))
-            products_with_reviews = sum(1 for r in self.analysis_results if r.get('has_reviews', False))
-            products_with_many_sizes = sum(1 for r in self.analysis_results if r.get('has_shop_with_many_sizes', False))
+            products_with_multiple_images = products_with_size_in_title = 0
+            products_with_reviews = products_with_many_sizes = 0
+            for r in self.analysis_results:
+                products_with_multiple_images += bool(r.get('has_multiple_images', False))
+                products_with_size_in_title += bool(r.get('has_size_in_title', False))
+                products_with_reviews += bool(r.get('has_reviews', False))
+                products_with_many_sizes += bool(r.get('has_shop_with_many_sizes', False))
             
             # Create summary table - adjusted width for landscape
             summary_data = [
@@ -524,19 +999,7 @@ class ProductAnalyzer:
             
             # Wider table for landscape mode
             summary_table = Table(summary_data, colWidths=[300, 130, 130])
-            summary_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.whitesmoke, colors.lightgrey]),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('PADDING', (0, 0), (-1, -1), 6),
-            ]))
+            summary_table.setStyle(SUMMARY_TABLE_STYLE)
             
             elements.append(summary_table)
             elements.append(Spacer(1, 20))
@@ -548,32 +1011,24 @@ class ProductAnalyzer:
             elements.append(Spacer(1, 5))
             elements.append(PageBreak())
             
+            # Original product data, for the shop URLs; loaded once for all products
+            original_products = {}
+            try:
+                data_file = Path("data/latest_result.json")
+                if data_file.exists():
+                    for product in _load_json(data_file):
+                        original_products.setdefault(product.get("pim3puntnull"), product)
+            except Exception as e:
+                print(f"Error loading original product data: {str(e)}")
+            
             # Individual product sections - one per page
-            for result in self.analysis_results:
+            last_index = len(self.analysis_results) - 1
+            for index, result in enumerate(self.analysis_results):
                 # Product title
                 product_id = result.get('product_id', 'Unknown')
                 title = result.get('title', f'Product {product_id}')
                 url = result.get('url', '')
                 
-                # Get shop URLs from the original data
-                original_data = {}
-                from pathlib import Path
-                import json
-                
-                try:
-                    data_file = Path("data/latest_result.json")
-                    if data_file.exists():
-                        with open(data_file, 'r') as f:
-                            all_products = json.load(f)
-                            
-                        # Find this product in the data
-                        for product in all_products:
-                            if product.get("pim3puntnull") == product_id:
-                                original_data = product
-                                break
-                except Exception as e:
-                    print(f"Error loading original product data: {str(e)}")
-                
                 elements.append(Paragraph(title, heading3_style))
                 
                 # Add URL below the title and make it clickable
@@ -581,79 +1036,26 @@ class ProductAnalyzer:
                     url_text = f'<a href="{url}">{url}</a>'
                     elements.append(Paragraph(url_text, url_style))
                 
-                # Create a table for product details
-                screenshot_path = result.get('screenshot_path')
-                has_shop_with_many_sizes = result.get('has_shop_with_many_sizes', False)
-                
-                # Format the analysis text with better styling
-                analysis_text = f"""
-                <b>Multiple Images:</b> {'Yes' if result.get('has_multiple_images') else 'No'}<br/>
-                <b>Size in Title:</b> {'Yes' if result.get('has_size_in_title') else 'No'}<br/>
-                <b>Has Reviews:</b> {'Yes' if result.get('has_reviews') else 'No'} {f"({result.get('review_count')} reviews)" if result.get('review_count', 0) > 0 else ""}<br/>
-                <b>Min 1 offer met >5 maten:</b> {'Yes' if has_shop_with_many_sizes else 'No'}<br/>
-                """
-                
-                # Add shop size counts if available with clickable links
-                shop_data = result.get('shop_size_counts', {})
-                if shop_data:
-                    analysis_text += "<br/><b>Shop Size Counts:</b><br/>"
-                    
-                    # Get shop names in a consistent order
-                    shop_names = list(shop_data.keys())
-                    
-                    for i, shop_name in enumerate(shop_names):
-                        size_count = shop_data[shop_name]
-                        # Use the corresponding URL from the original data
-                        shop_url = original_data.get(f"url{i+1}", "#")
-                        
-                        # Clearly format the shop name, properly escaping HTML entities
-                        safe_shop_name = shop_name.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-                        
-                        if shop_url and shop_url != "#":
-                            # Format with proper HTML link styling for better visibility in PDF
-                            analysis_text += f'• <a href="{shop_url}" color="#0000FF"><u>{safe_shop_name}</u></a>: {size_count} sizes<br/>'
-                        else:
-                            analysis_text += f"• {safe_shop_name}: {size_count} sizes<br/>"
-                
-                # Check if screenshot exists
-                if screenshot_path and os.path.exists(screenshot_path):
-                    # Adjust image size to ensure it fits on one page with analysis
-                    img = Image(screenshot_path, width=700, height=280)
-                    
-                    # Create a table with the screenshot and analysis
-                    # Use a simpler structure to ensure everything stays on one page
-                    analysis_paragraph = Paragraph(analysis_text, normal_style)
-                    
-                    # Create a KeepTogether flowable to ensure all content stays on one page
-                    from reportlab.platypus import KeepTogether
-                    
-                    # Create a single content block with the screenshot, header, and analysis
-                    content_elements = []
-                    content_elements.append(Paragraph("Screenshot", heading3_style))
-                    content_elements.append(img)
-                    content_elements.append(Spacer(1, 10))
-                    content_elements.append(Paragraph("Analysis", heading3_style))
-                    content_elements.append(analysis_paragraph)
-                    
-                    # Wrap everything in a KeepTogether to ensure it stays on one page
-                    product_content = KeepTogether(content_elements)
-                    elements.append(product_content)
+                # Check if screenshot exists; the image is sized to fit on one page with the analysis
+                screenshot_path = result.get('report_image_path') or result.get('screenshot_path')
+                if screenshot_path in self.report_images:
+                    screenshot = Image(io.BytesIO(self.report_images[screenshot_path]), width=700, height=280)
+                elif screenshot_path and os.path.exists(screenshot_path):
+                    screenshot = Image(screenshot_path, width=700, height=280)
                 else:
-                    # Create a KeepTogether flowable for products without screenshots
-                    from reportlab.platypus import KeepTogether
-                    
-                    content_elements = []
-                    content_elements.append(Paragraph("Screenshot", heading3_style))
-                    content_elements.append(Paragraph("Not available", normal_style))
-                    content_elements.append(Spacer(1, 10))
-                    content_elements.append(Paragraph("Analysis", heading3_style))
-                    content_elements.append(Paragraph(analysis_text, normal_style))
-                    
-                    product_content = KeepTogether(content_elements)
-                    elements.append(product_content)
+                    screenshot = Paragraph("Not available", normal_style)
+                
+                # Keep the screenshot, header, and analysis together on one page
+                elements.append(KeepTogether([
+                    Paragraph("Screenshot", heading3_style),
+                    screenshot,
+                    Spacer(1, 10),
+                    Paragraph("Analysis", heading3_style),
+                    Paragraph(self._analysis_text(result, original_products.get(product_id, {})), normal_style),
+                ]))
                 
                 # Add a page break after each product (except the last one)
-                if result != self.analysis_results[-1]:
+                if index != last_index:
                     elements.append(PageBreak())
             
             # Add page numbers
@@ -681,32 +1083,41 @@ class ProductAnalyzer:
     
     def close(self):
         """Close the webdriver and clean up."""
+        self._io_pool.shutdown(wait=True)
+        self.save_title_cache()
         if self.driver:
-            self.driver.quit()
+            self.release_webdriver(self.driver)
             self.driver = None
+    
+    def release_webdriver(self, driver):
+        """Quit a webdriver, or only end its session when it is attached to a shared Chrome."""
+        if CHROME_ATTACH:
+            driver.service.stop()
+        else:
+            driver.quit()
 
 
-def analyze_products_from_file(input_file, output_dir="analysis"):
+def analyze_products_from_file(input_file, output_dir="analysis", max_workers=None):
     """
     Analyze products from a JSON file and generate a report.
     
     Args:
         input_file: Path to the JSON file containing product data
         output_dir: Directory to store analysis output
+        max_workers: Number of products analyzed concurrently; defaults to DEFAULT_WORKERS
         
     Returns:
         Path to the generated PDF report
     """
     try:
         # Load product data
-        with open(input_file, 'r') as f:
-            products_data = json.load(f)
+        products_data = _load_json(input_file)
         
         # Initialize analyzer
         analyzer = ProductAnalyzer(output_dir)
         
         # Analyze products
-        analyzer.analyze_products(products_data)
+        analyzer.analyze_products(products_data, max_workers)
         
         # Generate report
         pdf_path = analyzer.generate_pdf_report()
@@ -727,10 +1138,11 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Analyze product pages and generate a report')
     parser.add_argument('--input', type=str, required=True, help='Input JSON file with product data')
     parser.add_argument('--output-dir', type=str, default='analysis', help='Output directory for analysis results')
+    parser.add_argument('--workers', type=int, default=None, help=f'Number of concurrent Chrome drivers (default: {DEFAULT_WORKERS})')
     
     args = parser.parse_args()
     
-    pdf_path = analyze_products_from_file(args.input, args.output_dir)
+    pdf_path = analyze_products_from_file(args.input, args.output_dir, args.workers)
     if pdf_path:
         print(f"Analysis complete. PDF report saved to: {pdf_path}")
     else: